@@ -0,0 +1,152 @@
+# batched.py
+"""
+Silnik wsadowy: K replik (albo K zestawow parametrow) trzymanych w jednej
+tablicy (K, H, W) i liczonych wspolnymi operacjami wektorowymi.
+
+Reguly i ruch (movement.py) sa te same co w pojedynczym silniku, ale kazda
+replika ma wlasne SimulationParams (infection_probability, noise_strength,
+wind_vector, ...). Predkosci ruchu i search_range musza byc
+wspolne, bo wyznaczaja ksztalt tablicy kandydatow i pola celow.
+
+Przyklad - przeglad 64 wartosci prawdopodobienstwa infekcji:
+    base = SimulationParams.from_config()
+    params = [base.replace(infection_probability=p) for p in np.linspace(0, 1, 64)]
+    engine = BatchedEngine.replicate(grid, params=params, rng=np.random.default_rng(1))
+    engine.run(500)
+"""
+import numpy as np
+
+from config import CellState
+from grid import Grid, DYNAMIC_STATES
+from movement import MovementTables, move_agents
+from terrain_field import TerrainField
+from params import SimulationParams
+
+
+class BatchedEngine:
+    """
+    K siatek o tych samych wymiarach liczonych razem jako tablice (K, H, W).
+    params - lista K obiektow SimulationParams (po jednym na replike),
+    None - wszystkie repliki z SimulationParams.from_config().
+    """
+    def __init__(self, grids, params=None, rng=None):
+        grids = list(grids)
+        if not grids:
+            raise ValueError("BatchedEngine wymaga co najmniej jednej siatki")
+        if params is None:
+            params = [SimulationParams.from_config()] * len(grids)
+        params = list(params)
+        if len(params) != len(grids):
+            raise ValueError(f"Liczba zestawow parametrow ({len(params)}) != liczba siatek ({len(grids)})")
+        shared = {(p.base_human_speed, p.base_zombie_speed, p.search_range) for p in params}
+        if len(shared) != 1:
+            raise ValueError("Predkosci ruchu i search_range musza byc wspolne dla wszystkich replik")
+
+        self.replicas = len(grids)
+        self.height = grids[0].height
+        self.width = grids[0].width
+        self.state = np.stack([g.state for g in grids])
+        self.terrain = np.stack([g.terrain for g in grids])
+        self.incubation_counter = np.stack([g.incubation_counter for g in grids])
+        self.compost_counter = np.stack([g.compost_counter for g in grids])
+
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.step_count = 0
+        self.total_deaths = np.zeros(self.replicas, dtype=np.int64)
+        self.params = params
+        self._build_param_tables(params)
+
+    @classmethod
+    def replicate(cls, grid, replicas=None, params=None, rng=None):
+        """K kopii jednej siatki startowej (K = replicas albo len(params))."""
+        if replicas is None:
+            replicas = len(params) if params is not None else 1
+        grids = [grid.copy() for _ in range(replicas)]
+        return cls(grids, params=params, rng=rng)
+
+    def _build_param_tables(self, params):
+        """Tablice parametrow indeksowane numerem repliki (z tablic pochodnych SimulationParams)."""
+        self.infection_probability = np.array([p.infection_probability for p in params], dtype=np.float64)
+        self.zombie_death_threshold = np.array([p.zombie_death_threshold for p in params], dtype=np.int64)
+        self.incubation_time = np.array([p.incubation_time for p in params], dtype=np.int64)
+        self.compost_time = np.array([p.compost_time for p in params], dtype=np.int64)
+        self.infection_range_lut = np.stack([p.infection_range_lut for p in params])
+        self.movement = MovementTables(params)
+        self.terrain_field = TerrainField(self.terrain, self.movement.modifier_lut)
+
+    def replica_grid(self, k):
+        """Widok repliki k jako Grid (tablice wspoldzielone, bez kopiowania)."""
+        return Grid.from_arrays(self.state[k], self.terrain[k],
+                                self.incubation_counter[k], self.compost_counter[k])
+
+    def count_states(self):
+        """Tablica (K, 5): liczba komorek w stanach DYNAMIC_STATES dla kazdej repliki."""
+        bins = len(DYNAMIC_STATES)
+        dynamic = np.minimum(self.state, bins).astype(np.int64).reshape(self.replicas, -1)
+        dynamic += (np.arange(self.replicas) * (bins + 1))[:, None]
+        counts = np.bincount(dynamic.reshape(-1), minlength=self.replicas * (bins + 1))
+        return counts.reshape(self.replicas, bins + 1)[:, :bins]
+
+    def step(self):
+        """Jeden krok wszystkich replik; zwraca tablice (K,) zgonow w tym kroku."""
+        deaths = self._apply_rules()
+        self._move_agents()
+        self.step_count += 1
+        self.total_deaths += deaths
+        return deaths
+
+    def run(self, steps):
+        """Wykonuje podana liczbe krokow; zwraca tablice (K,) zgonow w nich."""
+        deaths = np.zeros(self.replicas, dtype=np.int64)
+        for _ in range(steps):
+            deaths += self.step()
+        return deaths
+
+    def _apply_rules(self):
+        """ETAP A dla wszystkich replik: infekcja, smierc, inkubacja, kompost (w miejscu)."""
+        state = self.state
+        cells = self.height * self.width
+        replica = np.arange(self.replicas)[:, None, None]
+
+        zombies = (state == CellState.ZOMBIE.value).astype(np.uint8)
+        rows = zombies + np.roll(zombies, 1, axis=1) + np.roll(zombies, -1, axis=1)
+        zombie_neighbors_count = rows + np.roll(rows, 1, axis=2) + np.roll(rows, -1, axis=2) - zombies
+
+        # Wszystkie maski liczone ze stanu przed zmianami
+        humans = state == CellState.HUMAN.value
+        dies = humans & (zombie_neighbors_count >= self.zombie_death_threshold[:, None, None])
+        exposed = humans & ~dies & self.infection_range_lut[replica, zombie_neighbors_count]
+        exposed_idx = np.flatnonzero(exposed)
+        rolls = self.rng.random(exposed_idx.size)
+        infected_idx = exposed_idx[rolls < self.infection_probability[exposed_idx // cells]]
+
+        infected = state == CellState.INFECTED.value
+        turns = infected & (self.incubation_counter <= 1)
+        dead = state == CellState.DEAD.value
+        composts = dead & (self.compost_counter + 1 >= self.compost_time[:, None, None])
+
+        self.incubation_counter[infected] -= 1
+        self.compost_counter[dead] += 1
+
+        state[dies] = CellState.DEAD.value
+        self.compost_counter[dies] = 0
+        self.incubation_counter[dies] = 0
+
+        state.reshape(-1)[infected_idx] = CellState.INFECTED.value
+        self.incubation_counter.reshape(-1)[infected_idx] = self.incubation_time[infected_idx // cells]
+        self.compost_counter.reshape(-1)[infected_idx] = 0
+
+        state[turns] = CellState.ZOMBIE.value
+        self.incubation_counter[turns] = 0
+
+        state[composts] = CellState.GROUND.value
+        self.terrain[composts] = CellState.GROUND.value
+        self.terrain_field.invalidate_mask(composts)
+        self.compost_counter[composts] = 0
+
+        return dies.sum(axis=(1, 2))
+
+    def _move_agents(self):
+        """ETAP B dla wszystkich replik: wybor ruchow i rozwiazanie kolizji (movement.py)."""
+        move_agents(self.state, self.terrain_field.modifier, self.incubation_counter, self.compost_counter,
+                    self.movement, self.rng)
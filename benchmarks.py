@@ -0,0 +1,360 @@
+# benchmarks.py
+"""
+Benchmarki kroku symulacji, wyszukiwania celow, ruchu, wczytywania mapy i rysowania.
+
+Przyklady:
+    python benchmarks.py --quick                          # male siatki, szybki przeglad
+    python benchmarks.py --save bench.json                # pelny zestaw -> nowy baseline
+    python benchmarks.py --baseline bench.json --tolerance 0.2
+
+Kazdy przypadek to (benchmark, rozmiar siatki, gestosc agentow, mieszanka terenu)
+ze stalym ziarnem. Wynik to czas jednego wywolania (dla funkcji punktowych -
+jednego zapytania). Po pomiarach wypisywany jest wykladnik skalowania
+(nachylenie log(czas) od log(liczby komorek) i log(liczby agentow)),
+a przy --baseline - przypadki wolniejsze niz baseline o wiecej niz tolerance
+(kod wyjscia 1).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import timeit
+
+import numpy as np
+
+from config import CellState, MAPA_TERENU_PLIK
+from grid import Grid
+from map_loader import load_map_from_image
+from population import populate
+from params import SimulationParams
+from renderer import build_palette, color_index, ppm_bytes, rasterize
+from rules import build_target_fields, calculate_movement, HUMAN_TARGET_STATES, ZOMBIE_TARGET_STATES
+from simulation import run_simulation_step
+
+SIZES = ((120, 90), (240, 180), (500, 375), (1000, 750), (2000, 1500))
+QUICK_SIZES = SIZES[:3]
+DENSITIES = (0.002, 0.01, 0.05)
+TERRAIN_MIXES = {
+    "ground": {CellState.GROUND: 1.0},
+    "urban": {CellState.GROUND: 0.45, CellState.STREET: 0.25, CellState.BUILDING: 0.15,
+              CellState.GREEN_AREA: 0.10, CellState.WATER: 0.05},
+}
+ZOMBIE_SHARE = 0.1          # udzial zombie wsrod agentow startowych
+QUERY_COUNT = 200           # zapytan na jeden pomiar funkcji punktowych
+SEED = 12345
+# Staly rozmiar komorki w draw - liczba pikseli rosnie z liczba komorek, wiec
+# wykladnik skalowania "cells" jest miarodajny (2000x1500 -> obraz 4000x3000)
+DRAW_CELL_SIZE = 2
+
+
+# --- Dane wejsciowe ---
+
+def make_terrain(width, height, mix, seed=SEED):
+    """Losowa mapa terenu o zadanych udzialach typow (stale ziarno)."""
+    rng = np.random.default_rng(seed)
+    values = np.array([state.value for state in mix], dtype=np.uint8)
+    weights = np.array(list(mix.values()), dtype=np.float64)
+    return rng.choice(values, size=(height, width), p=weights / weights.sum())
+
+
+def make_grid(width, height, density, mix_name, seed=SEED):
+    agents = int(round(density * width * height))
+    zombies = max(1, int(agents * ZOMBIE_SHARE))
+    random.seed(seed)
+    return Grid(width, height, initial_humans=agents - zombies, initial_zombies=zombies,
+                terrain_map=make_terrain(width, height, TERRAIN_MIXES[mix_name], seed))
+
+
+def sample_agents(grid, count, seed=SEED):
+    """Pozycje count losowych agentow (z powtorzeniami, gdy agentow jest malo)."""
+    rows, cols = np.nonzero((grid.state == CellState.HUMAN.value) | (grid.state == CellState.ZOMBIE.value))
+    picks = np.random.default_rng(seed).integers(0, len(rows), count)
+    return list(zip(rows[picks].tolist(), cols[picks].tolist()))
+
+
+# --- Benchmarki: kazdy zwraca (funkcja do pomiaru, liczba operacji na wywolanie) ---
+
+def bench_step(case):
+    grid = make_grid(case["width"], case["height"], case["density"], case["terrain"])
+    rng = np.random.default_rng(SEED)
+    params = SimulationParams.from_config()
+    return (lambda: run_simulation_step(grid, rng, params)), 1
+
+
+def bench_find_nearest_agent(case):
+    grid = make_grid(case["width"], case["height"], case["density"], case["terrain"])
+    queries = sample_agents(grid, QUERY_COUNT)
+    targets = [HUMAN_TARGET_STATES if grid.state[r, c] == CellState.HUMAN.value else ZOMBIE_TARGET_STATES
+               for r, c in queries]
+
+    def run():
+        for (r, c), target_states in zip(queries, targets):
+            grid.find_nearest_agent(r, c, target_states)
+    return run, QUERY_COUNT
+
+
+def bench_get_neighbors(case):
+    grid = make_grid(case["width"], case["height"], case["density"], case["terrain"])
+    rng = np.random.default_rng(SEED)
+    queries = list(zip(rng.integers(0, grid.height, QUERY_COUNT).tolist(),
+                       rng.integers(0, grid.width, QUERY_COUNT).tolist()))
+
+    def run():
+        for r, c in queries:
+            grid.get_neighbors(r, c)
+    return run, QUERY_COUNT
+
+
+def bench_calculate_movement(case):
+    grid = make_grid(case["width"], case["height"], case["density"], case["terrain"])
+    params = SimulationParams.from_config()
+    fields = build_target_fields(grid, params.search_range)
+    queries = sample_agents(grid, QUERY_COUNT)
+
+    def run():
+        for r, c in queries:
+            calculate_movement(grid, r, c, fields, params)
+    return run, QUERY_COUNT
+
+
+def bench_load_map_from_image(case):
+    width, height = case["width"], case["height"]
+    if case["terrain"] == "cold":
+        return (lambda: load_map_from_image(MAPA_TERENU_PLIK, width, height, cache_dir=None)), 1
+    cache_dir = os.path.join(tempfile.gettempdir(), "zombie_bench_terrain")
+    load_map_from_image(MAPA_TERENU_PLIK, width, height, cache_dir=cache_dir)
+    return (lambda: load_map_from_image(MAPA_TERENU_PLIK, width, height, cache_dir=cache_dir)), 1
+
+
+def bench_populate(case):
+    """Rozmieszczenie calej populacji startowej (population.populate) na pustej siatce."""
+    width, height = case["width"], case["height"]
+    agents = int(round(case["density"] * width * height))
+    zombies = max(1, int(agents * ZOMBIE_SHARE))
+    terrain_map = make_terrain(width, height, TERRAIN_MIXES[case["terrain"]])
+
+    def run():
+        grid = Grid(width, height, initial_humans=0, initial_zombies=0, terrain_map=terrain_map)
+        populate(grid, agents - zombies, zombies, seed=SEED)
+    return run, 1
+
+
+# Jeden ukryty korzen Tk na proces (False - brak ekranu) i plotno ostatniego przypadku
+_tk_root = None
+_tk_canvas = None
+
+
+def _draw_root():
+    global _tk_root
+    if _tk_root is None:
+        try:
+            import tkinter as tk
+            _tk_root = tk.Tk()
+            _tk_root.withdraw()
+        except Exception:
+            _tk_root = False
+    return _tk_root
+
+
+def bench_draw(case):
+    """
+    Pelne przerysowanie siatki tak jak ZombieCA_GUI.draw (GridRenderer).
+    Bez ekranu (brak Tk) mierzony jest sam raster: indeksy -> RGB -> PPM.
+    """
+    global _tk_canvas
+    grid = make_grid(case["width"], case["height"], case["density"], case["terrain"])
+    cell_size = DRAW_CELL_SIZE
+    root = _draw_root()
+    if not root:
+        palette = build_palette()
+        return (lambda: ppm_bytes(rasterize(palette, color_index(grid), cell_size))), 1
+
+    import tkinter as tk
+    from renderer import GridRenderer
+    # Plotno poprzedniego przypadku jest juz zmierzone
+    if _tk_canvas is not None:
+        _tk_canvas.destroy()
+    _tk_canvas = canvas = tk.Canvas(root, width=grid.width * cell_size, height=grid.height * cell_size)
+    renderer = GridRenderer(canvas, grid.width, grid.height, cell_size)
+
+    def run():
+        renderer.invalidate()
+        renderer.draw(grid)
+        root.update_idletasks()
+    return run, 1
+
+
+BENCHMARKS = {
+    "step": bench_step,
+    "find_nearest_agent": bench_find_nearest_agent,
+    "get_neighbors": bench_get_neighbors,
+    "calculate_movement": bench_calculate_movement,
+    "load_map_from_image": bench_load_map_from_image,
+    "draw": bench_draw,
+    "populate": bench_populate,
+}
+
+
+def build_cases(names, sizes):
+    """Lista przypadkow (slownikow) dla wybranych benchmarkow."""
+    cases = []
+    for name in names:
+        for width, height in sizes:
+            if name == "load_map_from_image":
+                variants = [(0.0, "cold"), (0.0, "cached")]
+            elif name == "get_neighbors":
+                variants = [(DENSITIES[0], "ground")]
+            else:
+                variants = [(density, terrain) for density in DENSITIES for terrain in TERRAIN_MIXES]
+            for density, terrain in variants:
+                cases.append({"benchmark": name, "width": width, "height": height,
+                              "density": density, "terrain": terrain})
+    return cases
+
+
+def case_key(case):
+    return f"{case['benchmark']}/{case['width']}x{case['height']}/d{case['density']}/{case['terrain']}"
+
+
+# --- Pomiar ---
+
+def measure(func, repeat=5, min_time=0.2, slow_call=1.0):
+    """
+    Najlepszy czas jednego wywolania: autorange dobiera liczbe wywolan na
+    pomiar (>= min_time), potem `repeat` pomiarow. Wywolania dluzsze niz
+    slow_call mierzone sa raz.
+    """
+    timer = timeit.Timer(func)
+    number, total = _autorange(timer, min_time)
+    if total / number >= slow_call:
+        return total / number
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def _autorange(timer, min_time):
+    number = 1
+    while True:
+        total = timer.timeit(number)
+        if total >= min_time:
+            return number, total
+        number *= 2
+
+
+def run_cases(cases, repeat, min_time, log=sys.stderr):
+    results = {}
+    for case in cases:
+        key = case_key(case)
+        func, operations = BENCHMARKS[case["benchmark"]](case)
+        seconds = measure(func, repeat=repeat, min_time=min_time) / operations
+        results[key] = dict(case, seconds=seconds)
+        print(f"{key:55s} {seconds * 1e3:12.4f} ms", file=log, flush=True)
+    return results
+
+
+# --- Analiza ---
+
+def _slope(x, y):
+    if len(x) < 2 or len(set(x)) < 2:
+        return None
+    return float(np.polyfit(np.log(x), np.log(y), 1)[0])
+
+
+def scaling_exponents(results):
+    """
+    Wykladniki skalowania dla kazdego benchmarku:
+    cells - nachylenie po rozmiarach siatki (stala gestosc i teren),
+    agents - nachylenie po liczbie agentow (staly rozmiar i teren).
+    Zwraca {benchmark: {"cells": [...], "agents": [...]}} (po jednym na grupe).
+    """
+    by_cells, by_agents = {}, {}
+    for entry in results.values():
+        cells = entry["width"] * entry["height"]
+        agents = entry["density"] * cells
+        by_cells.setdefault((entry["benchmark"], entry["density"], entry["terrain"]), []).append(
+            (cells, entry["seconds"]))
+        if agents > 0:
+            by_agents.setdefault((entry["benchmark"], cells, entry["terrain"]), []).append(
+                (agents, entry["seconds"]))
+
+    exponents = {}
+    for kind, groups in (("cells", by_cells), ("agents", by_agents)):
+        for (name, *_), points in groups.items():
+            slope = _slope(*zip(*points))
+            if slope is not None:
+                exponents.setdefault(name, {"cells": [], "agents": []})[kind].append(slope)
+    return exponents
+
+
+def find_regressions(results, baseline, tolerance):
+    """Przypadki wolniejsze niz baseline o wiecej niz tolerance: [(klucz, stosunek)]."""
+    regressions = []
+    for key, entry in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        ratio = entry["seconds"] / reference["seconds"]
+        if ratio > 1.0 + tolerance:
+            regressions.append((key, ratio))
+    return regressions
+
+
+def environment():
+    return {"python": platform.python_version(), "numpy": np.__version__,
+            "platform": platform.platform(), "processor": platform.processor(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarki symulacji zombie")
+    parser.add_argument("--quick", action="store_true", help="tylko male siatki (do 500x375)")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), default=sorted(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimalny czas jednego pomiaru [s]")
+    parser.add_argument("--baseline", default=None, help="plik JSON z wynikami do porownania")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="dopuszczalne spowolnienie wzgledem baseline (0.15 = 15%%)")
+    parser.add_argument("--save", default=None, help="zapis wynikow jako nowy baseline (JSON)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = QUICK_SIZES if args.quick else SIZES
+    results = run_cases(build_cases(args.only, sizes), args.repeat, args.min_time)
+
+    exponents = scaling_exponents(results)
+    print("\nWykladniki skalowania (czas ~ N^k):", file=sys.stderr)
+    for name, kinds in sorted(exponents.items()):
+        parts = []
+        for kind in ("cells", "agents"):
+            values = kinds[kind]
+            if values:
+                parts.append(f"{kind}: k={np.median(values):.2f} ({min(values):.2f}..{max(values):.2f})")
+        print(f"  {name:22s} " + " | ".join(parts), file=sys.stderr)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"environment": environment(), "results": results, "exponents": exponents}, f, indent=2)
+
+    if args.baseline:
+        if not os.path.exists(args.baseline):
+            print(f"Brak pliku baseline: {args.baseline}", file=sys.stderr)
+            return 2
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = find_regressions(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\nRegresje (> {args.tolerance:.0%} wolniej niz baseline):", file=sys.stderr)
+            for key, ratio in regressions:
+                print(f"  {key:55s} x{ratio:.2f}", file=sys.stderr)
+            return 1
+        print(f"\nBrak regresji wzgledem {args.baseline}.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
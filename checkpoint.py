@@ -0,0 +1,140 @@
+# checkpoint.py
+"""
+Pelny zapis stanu symulacji do kontynuacji bit w bit.
+
+Checkpoint obejmuje: tablice siatki (state, terrain, liczniki inkubacji
+i kompostowania), numer kroku, laczna liczbe zgonow, liczebnosci stanow,
+historie statystyk, parametry, reguly modelu (gdy inne niz domyslne) oraz stan
+NumPy Generatora silnika - jedynego zrodla losowan kroku (infekcja, szum ruchu,
+kolizje), wiec to on wystarcza do kontynuacji bit w bit. Zapisywany jest tez
+stan globalnego modulu random, z ktorego korzysta juz tylko rozmieszczanie
+agentow (Grid._place_agents) i skalarne reguly referencyjne w rules.py.
+
+Plik to archiwum .npz bez pickle - odczyt to kilka ciaglych tablic.
+Jeden checkpoint mozna odtworzyc wiele razy (rozgalezienia "co jesli"):
+
+    base = Checkpoint.load("rozgrzewka.npz")
+    for prob in (0.2, 0.4, 0.6):
+        engine = base.restore(params=base.params.replace(infection_probability=prob))
+        engine.run(1000)
+"""
+import json
+import random
+
+import numpy as np
+
+from engine import SimulationEngine
+from grid import Grid
+from params import SimulationParams
+from rule_tables import RuleSet, is_default_rules
+from stats import STATS_DTYPE
+
+FORMAT_VERSION = 1
+GRID_ARRAYS = ("state", "terrain", "incubation_counter", "compost_counter")
+
+
+class Checkpoint:
+    """Migawka stanu SimulationEngine (kopie tablic + metadane)."""
+    def __init__(self, arrays, meta):
+        self.arrays = arrays
+        self.meta = meta
+
+    @classmethod
+    def capture(cls, engine):
+        """Zapamietuje biezacy stan silnika (i globalnego random - nie wplywa na krok)."""
+        engine.sync_counters()
+        arrays = {name: getattr(engine.grid, name).copy() for name in GRID_ARRAYS}
+        arrays["counts"] = engine.counts.copy()
+        arrays["history"] = engine.history.view().copy()
+
+        version, internal_state, gauss_next = random.getstate()
+        arrays["random_state"] = np.array(internal_state, dtype=np.int64)
+        meta = {
+            "version": FORMAT_VERSION,
+            "step_count": engine.step_count,
+            "total_deaths": engine.total_deaths,
+            "history_size": engine.history.capacity,
+            "has_last_stats": engine.last_stats is not None,
+            "params": engine.params.__getstate__(),
+            "rng_state": engine.rng.bit_generator.state,
+            "random_version": version,
+            "random_gauss_next": gauss_next,
+            "rules": None if is_default_rules(engine.rules) else engine.rules.to_dict(),
+        }
+        if engine.last_stats is not None:
+            arrays["last_stats"] = np.asarray(engine.last_stats, dtype=STATS_DTYPE)
+        return cls(arrays, meta)
+
+    @property
+    def step_count(self):
+        return self.meta["step_count"]
+
+    @property
+    def params(self):
+        state = dict(self.meta["params"])
+        # JSON zamienia klucze slownika na napisy - przywracamy wartosci terenu
+        state["movement_modifiers"] = {int(k): v for k, v in state["movement_modifiers"].items()}
+        params = SimulationParams.__new__(SimulationParams)
+        params.__setstate__(state)
+        return params
+
+    def _make_rng(self):
+        state = self.meta["rng_state"]
+        bit_generator = getattr(np.random, state["bit_generator"])()
+        bit_generator.state = state
+        return np.random.Generator(bit_generator)
+
+    def restore(self, params=None, restore_global_random=True, engine_class=SimulationEngine):
+        """
+        Nowy silnik w stanie z chwili capture(). Tablice sa kopiowane,
+        wiec checkpoint mozna odtwarzac wielokrotnie. Przy restore_global_random
+        ustawiany jest tez stan modulu random (tylko dla kodu spoza kroku, np.
+        rozmieszczania agentow - kontynuacja silnika zalezy wylacznie od jego rng).
+        params - opcjonalnie inne parametry dla rozgalezienia.
+        engine_class - SimulationEngine albo np. sparse.SparseEngine (wynik ten sam).
+        """
+        meta = self.meta
+        grid = Grid.from_arrays(*(self.arrays[name].copy() for name in GRID_ARRAYS))
+        # Reguly zapisywane sa tylko, gdy rozne od domyslnych
+        extra = {"rules": RuleSet.from_dict(meta["rules"])} if meta.get("rules") else {}
+        engine = engine_class(grid, rng=self._make_rng(),
+                              params=params if params is not None else self.params,
+                              history_size=meta["history_size"], **extra)
+        engine.step_count = meta["step_count"]
+        engine.total_deaths = meta["total_deaths"]
+        engine.counts = self.arrays["counts"].astype(np.int64)
+        engine.history.extend(self.arrays["history"])
+        if meta["has_last_stats"]:
+            engine.last_stats = self.arrays["last_stats"][()].copy()
+
+        if restore_global_random:
+            internal_state = tuple(int(value) for value in self.arrays["random_state"])
+            random.setstate((meta["random_version"], internal_state, meta["random_gauss_next"]))
+        return engine
+
+    def save(self, path, compress=False):
+        """Zapis do pliku .npz (compress=True - mniejszy plik, wolniejszy odczyt)."""
+        meta = np.frombuffer(json.dumps(self.meta).encode("utf-8"), dtype=np.uint8)
+        save = np.savez_compressed if compress else np.savez
+        with open(path, "wb") as f:
+            save(f, meta=meta, **self.arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files if name != "meta"}
+            meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Nieobslugiwana wersja checkpointu: {path}")
+        return cls(arrays, meta)
+
+
+def save_checkpoint(engine, path, compress=False):
+    """Skrot: Checkpoint.capture(engine).save(path)."""
+    Checkpoint.capture(engine).save(path, compress=compress)
+
+
+def load_checkpoint(path, params=None, restore_global_random=True, engine_class=SimulationEngine):
+    """Skrot: silnik odtworzony z pliku checkpointu."""
+    return Checkpoint.load(path).restore(params=params, restore_global_random=restore_global_random,
+                                         engine_class=engine_class)
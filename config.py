@@ -5,6 +5,8 @@ from enum import Enum
 
 
 MAPA_TERENU_PLIK = "mapa.png" 
+TERRAIN_CACHE_DIR = ".terrain_cache"  # Cache sklasyfikowanych map terenu (None - wylaczony)
+MAPA_TERENU_ORIGIN = (0, 0)  # Lewy gorny rog (wiersz, kolumna) fragmentu mapy z magazynu terenu (.zct)
 class CellState(Enum):
     # Stany dynamiczne 
     GROUND = 0      # wolne pole
@@ -40,6 +42,7 @@ BASE_ZOMBIE_SPEED = 1
 WIND_VECTOR = (0, 0) 
 WIND_STRENGTH = 0.0
 NOISE_STRENGTH = 0.3
+SEARCH_RANGE = None     # Promien szukania celu (torusowy Manhattan); None - cala mapa
 
 MOVEMENT_MODIFIERS = {
     CellState.GROUND.value: 1.0, 
@@ -0,0 +1,195 @@
+# distance_field.py
+import numpy as np
+
+# Odleglosc i indeks celu sa pakowane w jeden klucz int64:
+#   klucz = odleglosc * (H * W) + indeks_plaski_celu
+# Minimum po kluczach daje najblizszy cel, a przy remisie cel pierwszy
+# w kolejnosci wierszowej - tak samo jak pelne skanowanie w Grid.find_nearest_agent.
+NO_TARGET_KEY = np.int64(2 ** 62)
+NO_TARGET = -1
+
+# Limit elementow tablic tymczasowych w jednym bloku przeciagania
+_BLOCK_ELEMENTS = 1 << 22
+
+
+def _torus_sweep_axis0(keys, step):
+    """
+    Transformata odleglosci 1D wzdluz osi 0 na torusie (w miejscu):
+    keys[i] = min_j (keys[j] + d(i, j) * step), gdzie d to odleglosc torusowa.
+    Przejscie w przod i w tyl liczone jako np.minimum.accumulate na podwojonej tablicy.
+    """
+    n = keys.shape[0]
+    if n <= 1:
+        return keys
+    offsets = (np.arange(2 * n, dtype=np.int64) * step)[:, None]
+    block = max(1, _BLOCK_ELEMENTS // (2 * n))
+    for start in range(0, keys.shape[1], block):
+        part = keys[:, start:start + block]
+        doubled = np.concatenate((part, part))
+
+        forward = np.minimum.accumulate(doubled - offsets, axis=0) + offsets
+        backward = np.minimum.accumulate(doubled[::-1] - offsets, axis=0) + offsets
+
+        np.minimum(part, forward[n:], out=part)
+        np.minimum(part, backward[n:][::-1], out=part)
+    return keys
+
+
+def nearest_target_keys(target_mask):
+    """
+    Zwraca tablice kluczy (odleglosc, cel) dla wszystkich komorek naraz.
+    target_mask ma ksztalt (..., H, W); wiodace osie (np. repliki) sa niezalezne,
+    a indeks celu jest plaskim indeksem w obrebie swojej siatki H x W.
+    """
+    *lead, height, width = target_mask.shape
+    cells = height * width
+    keys = np.where(
+        target_mask,
+        np.arange(cells, dtype=np.int64).reshape(height, width),
+        NO_TARGET_KEY,
+    )
+
+    # Separowalnosc metryki Manhattan: najpierw w obrebie wierszy, potem kolumnami
+    keys_w = np.ascontiguousarray(np.moveaxis(keys, -1, 0)).reshape(width, -1)
+    _torus_sweep_axis0(keys_w, cells)
+    keys = np.moveaxis(keys_w.reshape(width, *lead, height), 0, -1)
+
+    keys_h = np.ascontiguousarray(np.moveaxis(keys, -2, 0)).reshape(height, -1)
+    _torus_sweep_axis0(keys_h, cells)
+    keys = np.moveaxis(keys_h.reshape(height, *lead, width), 0, -2)
+    return np.ascontiguousarray(keys)
+
+
+class NearestTargetField:
+    """
+    Pole najblizszego celu liczone raz na krok dla calej siatki
+    (wieloźródłowa torusowa odleglosc Manhattan).
+
+    distance[r, c]  - odleglosc do najblizszego celu (NO_TARGET, gdy brak)
+    target_r/target_c - wspolrzedne celu; gdy brak celu - wlasne (r, c),
+                        czyli agent pozostaje w miejscu.
+    search_range - opcjonalny promien; cele dalej niz search_range sa pomijane.
+    """
+    def __init__(self, state, target_states, search_range=None):
+        height, width = state.shape
+        cells = height * width
+        target_mask = np.isin(state, [s.value for s in target_states])
+        keys = nearest_target_keys(target_mask)
+
+        found = keys < NO_TARGET_KEY
+        distance = keys // cells
+        if search_range is not None:
+            found &= distance <= search_range
+
+        rows, cols = np.indices((height, width))
+        target_idx = keys % cells
+        self.distance = np.where(found, distance, NO_TARGET).astype(np.int32)
+        self.target_r = np.where(found, target_idx // width, rows).astype(np.int32)
+        self.target_c = np.where(found, target_idx % width, cols).astype(np.int32)
+
+    def target_of(self, r, c):
+        """Wspolrzedne najblizszego celu dla komorki (r, c) w czasie O(1)."""
+        return int(self.target_r[r, c]), int(self.target_c[r, c])
+
+
+# Budzet par (agent, cel) dla wyszukiwania bez kubelkow
+_PAIR_BUDGET = 1 << 21
+# Srednia liczba celow w kubelku przy doborze boku kubelka
+_TARGETS_PER_BUCKET = 4
+
+
+def _torus_keys(query_r, query_c, target_flat, height, width):
+    """Klucze (odleglosc, cel) dla par zapytanie-cel (tablice tej samej dlugosci)."""
+    target_r = target_flat // width
+    target_c = target_flat - target_r * width
+    dist_r = np.abs(query_r - target_r)
+    dist_r = np.minimum(dist_r, height - dist_r)
+    dist_c = np.abs(query_c - target_c)
+    dist_c = np.minimum(dist_c, width - dist_c)
+    return (dist_r + dist_c) * (height * width) + target_flat
+
+
+def _bucket_lower_bound(ring, bucket):
+    """Dolne ograniczenie odleglosci do celow w kubelkach odleglych o `ring` (z kubelkiem niepelnym na brzegu)."""
+    if ring <= 1:
+        return ring
+    return (ring - 2) * bucket + 2
+
+
+def nearest_target_keys_at(query_flat, target_flat, height, width, bucket=None):
+    """
+    Klucze najblizszych celow tylko dla wskazanych komorek (indeksy plaskie H x W).
+    Wynik jest identyczny z nearest_target_keys(maska).reshape(-1)[query_flat],
+    ale koszt zalezy od liczby zapytan i celow, a nie od rozmiaru mapy:
+    przy malej liczbie par - porownanie kazdy z kazdym, inaczej - przeszukiwanie
+    pierscieni kubelkow (bucket x bucket komorek) az do pewnego minimum.
+    Domyslny bok kubelka daje okolo _TARGETS_PER_BUCKET celow na kubelek.
+    """
+    query_flat = np.asarray(query_flat, dtype=np.int64)
+    target_flat = np.asarray(target_flat, dtype=np.int64)
+    keys = np.full(query_flat.size, NO_TARGET_KEY, dtype=np.int64)
+    if query_flat.size == 0 or target_flat.size == 0:
+        return keys
+    query_r = query_flat // width
+    query_c = query_flat - query_r * width
+
+    if query_flat.size * target_flat.size <= _PAIR_BUDGET:
+        chunk = max(1, _PAIR_BUDGET // target_flat.size)
+        for start in range(0, query_flat.size, chunk):
+            part = slice(start, start + chunk)
+            pair_keys = _torus_keys(query_r[part, None], query_c[part, None], target_flat[None, :],
+                                    height, width)
+            keys[part] = pair_keys.min(axis=1)
+        return keys
+
+    cells = height * width
+    if bucket is None:
+        bucket = int(np.clip(np.sqrt(_TARGETS_PER_BUCKET * cells / target_flat.size), 4, 256))
+    buckets_r = -(-height // bucket)
+    buckets_c = -(-width // bucket)
+    target_bucket = (target_flat // width // bucket) * buckets_c + (target_flat % width) // bucket
+    order = np.argsort(target_bucket, kind="stable")
+    sorted_targets = target_flat[order]
+    bucket_count = np.bincount(target_bucket, minlength=buckets_r * buckets_c)
+    bucket_start = np.concatenate(([0], np.cumsum(bucket_count)[:-1]))
+
+    query_br = query_r // bucket
+    query_bc = query_c // bucket
+    pending = np.arange(query_flat.size)
+    visited = set()
+    max_ring = max(buckets_r, buckets_c) // 2 + 1
+    for ring in range(max_ring + 1):
+        # Przesuniecia kubelkow pierscienia; na torusie rozne przesuniecia moga
+        # wskazywac ten sam kubelek - kazdy jest odwiedzany raz
+        offsets = []
+        for dbr in range(-ring, ring + 1):
+            for dbc in range(-ring, ring + 1):
+                if max(abs(dbr), abs(dbc)) != ring:
+                    continue
+                residue = (dbr % buckets_r, dbc % buckets_c)
+                if residue not in visited:
+                    visited.add(residue)
+                    offsets.append(residue)
+        if offsets and pending.size:
+            dbr, dbc = np.array(offsets, dtype=np.int64).T
+            ring_buckets = (((query_br[pending, None] + dbr) % buckets_r) * buckets_c
+                            + (query_bc[pending, None] + dbc) % buckets_c)
+            counts = bucket_count[ring_buckets].reshape(-1)
+            total = int(counts.sum())
+            if total:
+                owner = np.repeat(np.repeat(pending, len(offsets)), counts)
+                first = np.repeat(bucket_start[ring_buckets].reshape(-1), counts)
+                within = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+                candidates = sorted_targets[first + within]
+                pair_keys = _torus_keys(query_r[owner], query_c[owner], candidates, height, width)
+                # Pary sa pogrupowane wedlug zapytania - minimum segmentami
+                segment = np.flatnonzero(np.concatenate(([True], owner[1:] != owner[:-1])))
+                np.minimum.at(keys, owner[segment], np.minimum.reduceat(pair_keys, segment))
+
+        if len(visited) == buckets_r * buckets_c:
+            break
+        bound = _bucket_lower_bound(ring + 1, bucket)
+        pending = pending[keys[pending] >= bound * cells]
+        if pending.size == 0:
+            break
+    return keys
@@ -0,0 +1,113 @@
+# engine.py
+import numpy as np
+
+from config import CellState
+from metrics import MetricsAggregator, StepMetrics
+from params import SimulationParams
+from rule_tables import DEFAULT_RULES
+from simulation import step_into, _default_rng
+from stats import STATS_DTYPE, COUNT_STATES, StatsHistory
+from terrain_field import TerrainField
+
+
+class SimulationEngine:
+    """
+    Silnik krokow z dwoma prealokowanymi buforami siatki.
+    Kazdy krok zapisuje wynik do bufora tylnego i zamienia bufory miejscami,
+    wiec dlugi przebieg nie alokuje nowych siatek. Teren jest wspolny dla obu buforow.
+    params (SimulationParams) mozna podmienic w trakcie przebiegu - zmiana
+    obowiazuje od nastepnego kroku.
+
+    Liczebnosci stanow (counts) sa aktualizowane przyrostowo z liczby przejsc
+    w kroku, a rekordy statystyk trafiaja do bufora cyklicznego history.
+
+    Po enable_metrics() kazdy krok mierzy czasy faz i liczniki operacji
+    (last_metrics - ostatni krok, metrics - suma przebiegu); domyslnie wylaczone.
+
+    Pola pochodne terenu (terrain_field) liczone sa raz; zmiany terenu z zewnatrz
+    nalezy robic przez paint_terrain(), ktore naprawia tylko zmieniona komorke.
+
+    rules (rule_tables.RuleSet) - reguly przejsc modelu, domyslnie DEFAULT_RULES.
+    """
+    def __init__(self, grid, rng=None, params=None, history_size=4096, rules=None):
+        self.grid = grid
+        self._back = grid.empty_like(share_terrain=True)
+        self.rng = rng if rng is not None else _default_rng
+        self.params = params if params is not None else SimulationParams.from_config()
+        self.rules = rules if rules is not None else DEFAULT_RULES
+        self.step_count = 0
+        self.total_deaths = 0
+        self.history = StatsHistory(history_size)
+        self.last_stats = None
+        self._transitions = {}
+        self.metrics = None
+        self.last_metrics = None
+        self.terrain_field = TerrainField(grid.terrain, self.params.terrain_modifier)
+        self.resync_counts()
+
+    def enable_metrics(self):
+        """Wlacza pomiar faz kroku (nowy agregator)."""
+        self.metrics = MetricsAggregator()
+        self.last_metrics = StepMetrics()
+
+    def disable_metrics(self):
+        self.metrics = None
+        self.last_metrics = None
+
+    def resync_counts(self):
+        """Przelicza liczebnosci stanow z siatki (po zmianach stanu z zewnatrz silnika)."""
+        counts = self.grid.count_states()
+        self.counts = np.array([counts[state] for state in COUNT_STATES], dtype=np.int64)
+
+    def sync_counters(self):
+        """Uzupelnia liczniki inkubacji i kompostu w siatce (tu zawsze aktualne; patrz SparseEngine)."""
+
+    def paint_terrain(self, r, c, terrain_value):
+        """Zmienia teren pustej komorki (r, c); zwraca False, gdy stoi na niej agent lub cialo."""
+        if self.grid.state[r, c] != CellState.GROUND.value:
+            return False
+        self.terrain_field.set_terrain((r, c), terrain_value)
+        return True
+
+    def counts_by_state(self):
+        """Biezace liczebnosci jako slownik {CellState: liczba} - bez skanowania siatki."""
+        return {state: int(count) for state, count in zip(COUNT_STATES, self.counts)}
+
+    def step(self):
+        """Wykonuje jeden krok i zwraca liczbe zgonow w tym kroku."""
+        transitions = self._transitions
+        step_metrics = self.last_metrics
+        deaths = step_into(self.grid, self._back, self.rng, self.params, transitions, step_metrics,
+                           self.terrain_field, self.rules)
+        self.grid, self._back = self._back, self.grid
+        self.step_count += 1
+        self.total_deaths += deaths
+        self._update_counts(transitions)
+        if step_metrics is not None:
+            self.metrics.add(step_metrics)
+        return deaths
+
+    def _update_counts(self, transitions):
+        deaths = transitions["deaths"]
+        infections = transitions["infections"]
+        turnings = transitions["turnings"]
+        composts = transitions["composts"]
+
+        counts = self.counts
+        counts[CellState.GROUND.value] += composts
+        counts[CellState.HUMAN.value] -= deaths + infections
+        counts[CellState.INFECTED.value] += infections - turnings
+        counts[CellState.ZOMBIE.value] += turnings
+        counts[CellState.DEAD.value] += deaths - composts
+
+        record = (self.step_count, *counts.tolist(),
+                  deaths, infections, turnings, composts, transitions["moves"])
+        self.history.append(record)
+        self.last_stats = np.array(record, dtype=STATS_DTYPE)[()]
+
+    def run(self, steps):
+        """Wykonuje podana liczbe krokow; zwraca laczna liczbe zgonow w nich."""
+        deaths = 0
+        for _ in range(steps):
+            deaths += self.step()
+        return deaths
@@ -0,0 +1,121 @@
+# ensemble.py
+"""
+Zespol (ensemble) niezaleznych replik symulacji uruchamianych w puli procesow.
+
+Kazda replika dostaje wlasny strumien losowy wyprowadzony z pary
+(master_seed, indeks repliki), wiec wynik nie zalezy od liczby procesow.
+Procesy zwracaja tylko tablice statystyk krok po kroku - nigdy cale siatki.
+"""
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from engine import SimulationEngine
+from grid import Grid
+from map_loader import load_map_from_image
+from params import SimulationParams
+
+ENSEMBLE_FIELDS = ("humans", "infected", "zombies", "dead", "deaths")
+DEFAULT_QUANTILES = (0.05, 0.5, 0.95)
+
+
+class Scenario:
+    """
+    Opis scenariusza startowego wspolny dla wszystkich replik.
+    params - SimulationParams scenariusza (domyslnie biezace wartosci config).
+    """
+    def __init__(self, width, height, initial_humans, initial_zombies, terrain_map=None, params=None):
+        self.width = width
+        self.height = height
+        self.initial_humans = initial_humans
+        self.initial_zombies = initial_zombies
+        self.terrain_map = None if terrain_map is None else np.array(terrain_map, dtype=np.uint8)
+        self.params = params if params is not None else SimulationParams.from_config()
+
+    @classmethod
+    def from_image(cls, image_path, width, height, initial_humans, initial_zombies, params=None):
+        return cls(width, height, initial_humans, initial_zombies,
+                   load_map_from_image(image_path, width, height), params)
+
+
+class EnsembleResult:
+    """
+    Zagregowane wyniki zespolu.
+    mean[krok, pole] i quantiles[q][krok, pole] dla pol ENSEMBLE_FIELDS;
+    trajectories[replika, krok, pole] - surowe statystyki (gdy keep_trajectories=True).
+    """
+    def __init__(self, trajectories, quantiles, keep_trajectories):
+        self.fields = ENSEMBLE_FIELDS
+        self.replicas = trajectories.shape[0]
+        self.mean = trajectories.mean(axis=0)
+        self.quantiles = {
+            q: values for q, values in zip(quantiles, np.quantile(trajectories, quantiles, axis=0))
+        }
+        self.trajectories = trajectories if keep_trajectories else None
+
+    def field(self, name):
+        """Indeks pola w tablicach wynikowych."""
+        return self.fields.index(name)
+
+
+def replica_seed_sequence(master_seed, replica_index):
+    """Strumien losowy repliki zalezy tylko od (master_seed, replica_index)."""
+    return np.random.SeedSequence(master_seed, spawn_key=(replica_index,))
+
+
+def run_replica(scenario, steps, master_seed, replica_index):
+    """Uruchamia jedna replike i zwraca tablice statystyk (steps x len(ENSEMBLE_FIELDS))."""
+    numpy_seq, python_seq = replica_seed_sequence(master_seed, replica_index).spawn(2)
+    # Rozmieszczenie agentow (Grid._place_agents) korzysta z modulu random,
+    # caly krok (infekcja, szum ruchu, kolizje) - z generatora NumPy
+    random.seed(int(python_seq.generate_state(1, dtype=np.uint64)[0]))
+    rng = np.random.default_rng(numpy_seq)
+
+    grid = Grid(scenario.width, scenario.height, scenario.initial_humans,
+                scenario.initial_zombies, terrain_map=scenario.terrain_map)
+    engine = SimulationEngine(grid, rng=rng, params=scenario.params)
+
+    stats = np.zeros((steps, len(ENSEMBLE_FIELDS)), dtype=np.int32)
+    for step in range(steps):
+        engine.step()
+        record = engine.last_stats
+        stats[step] = [record[name] for name in ENSEMBLE_FIELDS]
+    return stats
+
+
+# Scenariusz przekazywany raz do kazdego procesu roboczego (initializer puli)
+_worker_scenario = None
+
+
+def _init_worker(scenario):
+    global _worker_scenario
+    _worker_scenario = scenario
+
+
+def _run_worker_replica(args):
+    steps, master_seed, replica_index = args
+    return run_replica(_worker_scenario, steps, master_seed, replica_index)
+
+
+def run_ensemble(scenario, steps, replicas, master_seed, workers=None,
+                 quantiles=DEFAULT_QUANTILES, keep_trajectories=False):
+    """
+    Uruchamia `replicas` niezaleznych replik po `steps` krokow.
+    workers - liczba procesow (None - liczba rdzeni, 1 - bez puli, w biezacym procesie).
+    """
+    if replicas < 1:
+        raise ValueError("Zespol musi miec co najmniej jedna replike")
+    jobs = [(steps, master_seed, index) for index in range(replicas)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        results = [run_replica(scenario, *job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(scenario,)) as pool:
+            chunksize = max(1, replicas // (4 * workers))
+            results = list(pool.map(_run_worker_replica, jobs, chunksize=chunksize))
+
+    trajectories = np.stack(results)
+    return EnsembleResult(trajectories, quantiles, keep_trajectories)
@@ -1,30 +1,127 @@
 # grid.py
 import random
+import numpy as np
 from config import CellState, INCUBATION_TIME, MAPA_TERENU_PLIK
 
+# Typy tablic siatki (struct-of-arrays)
+STATE_DTYPE = np.uint8
+COUNTER_DTYPE = np.int16
+
+VALID_TERRAIN_VALUES = np.array([s.value for s in CellState], dtype=STATE_DTYPE)
+DYNAMIC_STATES = (CellState.GROUND, CellState.HUMAN, CellState.INFECTED, CellState.ZOMBIE, CellState.DEAD)
+BLOCKED_TERRAIN_VALUES = np.array([CellState.WATER.value, CellState.BUILDING.value], dtype=STATE_DTYPE)
+
 class Cell:
     """Reprezentuje pojedynczą komórkę na siatce z jej stanem dynamicznym, terenem i zmiennymi lokalnymi."""
     def __init__(self, terrain_type=CellState.GROUND):
         # Stan statyczny/teren
-        self.terrain_type = terrain_type 
+        self.terrain_type = terrain_type
         # Stan dynamiczny (domyślnie GROUND, jeśli nie ma agenta)
         self.state = CellState.GROUND
         # Zmienne lokalne (dla agentów i specjalnych stanów)
         self.local_vars = {}
 
+class CellView:
+    """
+    Widok jednej komórki Grid w starym stylu (state, terrain_type, local_vars).
+    Nie przechowuje danych - czyta i zapisuje bezpośrednio tablice siatki.
+    """
+    __slots__ = ("_grid", "r", "c")
+
+    def __init__(self, grid, r, c):
+        self._grid = grid
+        self.r = r
+        self.c = c
+
+    @property
+    def state(self):
+        return CellState(int(self._grid.state[self.r, self.c]))
+
+    @state.setter
+    def state(self, value):
+        self._grid.state[self.r, self.c] = value.value
+
+    @property
+    def terrain_type(self):
+        return CellState(int(self._grid.terrain[self.r, self.c]))
+
+    @terrain_type.setter
+    def terrain_type(self, value):
+        self._grid.terrain[self.r, self.c] = value.value
+
+    @property
+    def local_vars(self):
+        state = self._grid.state[self.r, self.c]
+        if state == CellState.INFECTED.value:
+            return {"incubation_counter": int(self._grid.incubation_counter[self.r, self.c])}
+        if state == CellState.DEAD.value:
+            return {"compost_counter": int(self._grid.compost_counter[self.r, self.c])}
+        return {}
+
+    @local_vars.setter
+    def local_vars(self, value):
+        self._grid.incubation_counter[self.r, self.c] = value.get("incubation_counter", 0)
+        self._grid.compost_counter[self.r, self.c] = value.get("compost_counter", 0)
+
+class _CellRow:
+    """Wiersz widoków komórek - pozwala na zapis grid.cells[r][c] jak w starej liście list."""
+    __slots__ = ("_grid", "_r")
+
+    def __init__(self, grid, r):
+        self._grid = grid
+        self._r = r
+
+    def __len__(self):
+        return self._grid.width
+
+    def __getitem__(self, c):
+        return CellView(self._grid, self._r, c % self._grid.width)
+
+    def __setitem__(self, c, cell):
+        view = self[c]
+        view.terrain_type = cell.terrain_type
+        view.state = cell.state
+        view.local_vars = cell.local_vars
+
+    def __iter__(self):
+        return (self[c] for c in range(self._grid.width))
+
+class _CellRows:
+    __slots__ = ("_grid",)
+
+    def __init__(self, grid):
+        self._grid = grid
+
+    def __len__(self):
+        return self._grid.height
+
+    def __getitem__(self, r):
+        return _CellRow(self._grid, r % self._grid.height)
+
+    def __iter__(self):
+        return (self[r] for r in range(self._grid.height))
+
 def calculate_torus_dist_1d(val1, val2, size):
     """Oblicza torusową odległość (minimum z bezpośredniej lub zawijanej)."""
     diff = abs(val1 - val2)
     return min(diff, size - diff)
 
 class Grid:
-    """Reprezentuje całą mapę (siatkę Automatu Komórkowego)."""
+    """
+    Reprezentuje całą mapę (siatkę Automatu Komórkowego).
+    Dane trzymane są jako ciągłe tablice NumPy (H x W):
+    state i terrain (uint8, wartości CellState) oraz liczniki
+    incubation_counter i compost_counter (int16).
+    """
     def __init__(self, width, height, initial_humans, initial_zombies, terrain_map=None):
         self.width = width
         self.height = height
 
-        # Tworzymy pustą siatkę komórek
-        self.cells = [[Cell() for _ in range(width)] for _ in range(height)]
+        shape = (height, width)
+        self.state = np.zeros(shape, dtype=STATE_DTYPE)
+        self.terrain = np.zeros(shape, dtype=STATE_DTYPE)
+        self.incubation_counter = np.zeros(shape, dtype=COUNTER_DTYPE)
+        self.compost_counter = np.zeros(shape, dtype=COUNTER_DTYPE)
 
         # Inicjalizacja terenu
         self._initialize_terrain(terrain_map)
@@ -32,30 +129,85 @@ class Grid:
         # Rozmieszczenie ludzi i zombie
         self._place_agents(initial_humans, initial_zombies)
 
+    @property
+    def cells(self):
+        """Dostęp zgodnościowy: grid.cells[r][c] zwraca CellView."""
+        return _CellRows(self)
+
+    @classmethod
+    def from_arrays(cls, state, terrain, incubation_counter, compost_counter):
+        """Tworzy siatkę na istniejących tablicach (bez kopiowania)."""
+        new_grid = cls.__new__(cls)
+        new_grid.height, new_grid.width = state.shape
+        new_grid.state = state
+        new_grid.terrain = terrain
+        new_grid.incubation_counter = incubation_counter
+        new_grid.compost_counter = compost_counter
+        return new_grid
+
+    def copy(self):
+        """Zwraca niezależną kopię siatki (kopiowanie całych tablic)."""
+        new_grid = Grid.__new__(Grid)
+        new_grid.width = self.width
+        new_grid.height = self.height
+        new_grid.state = self.state.copy()
+        new_grid.terrain = self.terrain.copy()
+        new_grid.incubation_counter = self.incubation_counter.copy()
+        new_grid.compost_counter = self.compost_counter.copy()
+        return new_grid
+
+    def empty_like(self, share_terrain=False):
+        """
+        Zwraca siatkę o tych samych wymiarach z niezainicjalizowanymi tablicami
+        (bufor do nadpisania). Przy share_terrain=True teren jest wspólny (ta sama tablica).
+        """
+        new_grid = Grid.__new__(Grid)
+        new_grid.width = self.width
+        new_grid.height = self.height
+        new_grid.state = np.empty_like(self.state)
+        new_grid.terrain = self.terrain if share_terrain else self.terrain.copy()
+        new_grid.incubation_counter = np.empty_like(self.incubation_counter)
+        new_grid.compost_counter = np.empty_like(self.compost_counter)
+        return new_grid
+
+    def copy_into(self, other):
+        """Kopiuje stan i liczniki do istniejącej siatki bez alokacji (teren tylko, gdy nie jest wspólny)."""
+        np.copyto(other.state, self.state)
+        np.copyto(other.incubation_counter, self.incubation_counter)
+        np.copyto(other.compost_counter, self.compost_counter)
+        if other.terrain is not self.terrain:
+            np.copyto(other.terrain, self.terrain)
+
     def _initialize_terrain(self, terrain_map=None):
-     for r in range(self.height):
-        for c in range(self.width):
-            if terrain_map is None:
-                self.cells[r][c].terrain_type = CellState.GROUND
-            else:
-                # Konwertujemy liczby z mapy na CellState
-                self.cells[r][c].terrain_type = CellState(terrain_map[r][c])
+        if terrain_map is None:
+            self.terrain.fill(CellState.GROUND.value)
+            return
+        terrain = np.asarray(terrain_map)
+        if terrain.shape != self.terrain.shape:
+            raise ValueError(f"Mapa terenu ma wymiary {terrain.shape}, oczekiwano {self.terrain.shape}")
+        if not np.isin(terrain, VALID_TERRAIN_VALUES).all():
+            raise ValueError("Mapa terenu zawiera wartości spoza CellState")
+        self.terrain[...] = terrain
+
     def _place_agents(self, num_humans, num_zombies):
         """Losowo rozmieszcza początkową liczbę ludzi i zombie."""
-        available_cells = [(r, c) for r in range(self.height) for c in range(self.width) 
-                           if self.cells[r][c].terrain_type not in [CellState.WATER, CellState.BUILDING]]
-        random.shuffle(available_cells)
-        
-        # Umieść ludzi
-        for i in range(min(num_humans, len(available_cells))):
-            r, c = available_cells.pop(0)
-            self.cells[r][c].state = CellState.HUMAN
+        if num_humans <= 0 and num_zombies <= 0:
+            return
+        available_cells = np.flatnonzero(~np.isin(self.terrain, BLOCKED_TERRAIN_VALUES))
+        num_humans = min(num_humans, len(available_cells))
+        num_zombies = min(num_zombies, len(available_cells) - num_humans)
+        chosen = available_cells[random.sample(range(len(available_cells)), num_humans + num_zombies)]
 
+        flat_state = self.state.reshape(-1)
+        # Umieść ludzi
+        flat_state[chosen[:num_humans]] = CellState.HUMAN.value
         # Umieść zombie
-        for i in range(min(num_zombies, len(available_cells))):
-            r, c = available_cells.pop(0)
-            self.cells[r][c].state = CellState.ZOMBIE
+        flat_state[chosen[num_humans:]] = CellState.ZOMBIE.value
 
+    def count_states(self):
+        """Zwraca liczbę komórek w stanach dynamicznych: {CellState: liczba}."""
+        counts = np.bincount(self.state.reshape(-1), minlength=len(DYNAMIC_STATES))
+        return {state: int(counts[state.value]) for state in DYNAMIC_STATES}
 
     def get_neighbors(self, r, c):
         neighbors = []
@@ -63,47 +215,37 @@ class Grid:
             for dc in [-1, 0, 1]:
                 if dr == 0 and dc == 0:
                     continue
-                    
+
                 nr = r + dr
                 nc = c + dc
-                
+
                 nr = nr % self.height
                 nc = nc % self.width
-                
-                neighbors.append(self.cells[nr][nc])
+
+                neighbors.append(CellView(self, nr, nc))
         return neighbors
 
-    def find_nearest_agent(self, r, c, target_states):
-        """Znajduje najbliższego agenta o danym stanie, używając torusowej odległości Manhattan."""
-        
-        # SEARCH_RANGE może pozostać, jeśli chcesz zoptymalizować prędkość.
-        # W przeciwnym razie usuń ograniczenie, aby szukać na całej mapie (bezpieczniej dla logiki, ale wolniej).
-        SEARCH_RANGE = 20 
-        
-        min_dist = float('inf')
-        nearest_coords = (r, c)
-        
-        # Przy wyszukiwaniu torusowym, start/end pętli musi być ograniczony,
-        # lub po prostu przeszukujemy całą mapę, by nie komplikować pętli z modulo.
-        
-        # Wracamy do przeszukiwania całej mapy, aby mieć pewność, że znajdziemy cel.
-        for tr in range(self.height):
-            for tc in range(self.width):
-                if self.cells[tr][tc].state in target_states:
-                    
-                    # ⚠️ KLUCZOWA ZMIANA: Torusowa odległość Manhattan
-                    dist_r = calculate_torus_dist_1d(r, tr, self.height)
-                    dist_c = calculate_torus_dist_1d(c, tc, self.width)
-                    
-                    # Odległość Torusowa Manhattan
-                    dist = dist_r + dist_c
-                    
-                    if dist < min_dist:
-                        min_dist = dist
-                        nearest_coords = (tr, tc)
-                        
+    def find_nearest_agent(self, r, c, target_states, search_range=None):
+        """
+        Znajduje najbliższego agenta o danym stanie, używając torusowej odległości Manhattan.
+        search_range - opcjonalny promień; cele dalej są pomijane.
+        """
+        target_values = [s.value for s in target_states]
+        target_r, target_c = np.nonzero(np.isin(self.state, target_values))
+
         # Jeśli nie znaleziono celu, agent pozostaje w miejscu
-        if min_dist == float('inf'):
+        if len(target_r) == 0:
+            return r, c
+
+        # Torusowa odległość Manhattan do wszystkich celów naraz
+        dist_r = np.abs(target_r - r)
+        dist_r = np.minimum(dist_r, self.height - dist_r)
+        dist_c = np.abs(target_c - c)
+        dist_c = np.minimum(dist_c, self.width - dist_c)
+
+        # argmin zwraca pierwszy cel w kolejności wierszowej - tak jak pętla po całej mapie
+        dist = dist_r + dist_c
+        nearest = int(np.argmin(dist))
+        if search_range is not None and dist[nearest] > search_range:
             return r, c
-            
-        return nearest_coords
\ No newline at end of file
+        return int(target_r[nearest]), int(target_c[nearest])
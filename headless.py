@@ -0,0 +1,234 @@
+# headless.py
+"""
+Uruchamianie symulacji bez GUI (serwery bez X).
+
+Przyklad:
+    python headless.py --steps 1000 --seed 42 --format csv > wynik.csv
+
+Statystyki kazdego kroku trafiaja na stdout (lub --output) jako CSV albo
+JSON lines, a podsumowanie wydajnosci (kroki/s, komorki/s) na stderr.
+Z --record caly przebieg zapisywany jest do pliku nagrania (recording.py),
+ktory mozna potem przegladac w GUI. --checkpoint zapisuje pelny stan po
+ostatnim kroku, a --resume kontynuuje przebieg z takiego pliku.
+--metrics wypisuje na stderr czasy faz kroku, a --profile PLIK wykonuje
+przebieg pod cProfile i zapisuje statystyki (format pstats).
+--sparse liczy krok tylko na aktywnych komorkach (ten sam wynik, szybciej
+na duzych mapach z nielicznymi agentami). --tiles N dzieli mape na N kafelkow
+liczonych w osobnych procesach (parallel.py; wynik zalezy od ziarna, nie od N).
+--map moze wskazywac plik magazynu terenu (.zct, terrain_store.py) - wtedy
+symulowany jest fragment width x height od --origin, bez wczytywania calej mapy.
+--density, --outbreak i --terrain-weight rozmieszczaja populacje startowa
+wektorowo (population.py; zalezy tylko od --seed) zamiast losowania jednorodnego.
+--rules PLIK.json podmienia reguly przejsc modelu (rule_tables.py).
+--serve PORT rozsyla klatki i statystyki przebiegu do klientow stream_server.py
+(wielu widzow jednego przebiegu; sterowanie jak w GUI).
+"""
+import argparse
+import csv
+import json
+import random
+import sys
+import time
+
+import numpy as np
+
+from config import CellState, GRID_W, GRID_H, MAPA_TERENU_PLIK
+from checkpoint import load_checkpoint, save_checkpoint
+from engine import SimulationEngine
+from sparse import SparseEngine
+from parallel import ParallelEngine
+from grid import Grid
+from terrain_store import TERRAIN_STORE_SUFFIX, TerrainStore, load_terrain
+from metrics import profile_call
+from population import Outbreak, load_density_raster, populate
+from recording import TrajectoryRecorder
+from rule_tables import load_rule_set
+from stream_server import run_server
+from stats import STATS_FIELDS
+
+STAT_FIELDS = list(STATS_FIELDS) + ["total_deaths"]
+
+
+def build_grid(map_path, width, height, humans, zombies, origin=(0, 0)):
+    """Buduje siatke startowa; map_path=None oznacza sama ziemie."""
+    terrain_map = None
+    if map_path:
+        terrain_map = load_terrain(map_path, width, height, origin)
+    return Grid(width, height, initial_humans=humans, initial_zombies=zombies, terrain_map=terrain_map)
+
+
+def build_population_grid(args):
+    """Siatka z populacja z population.populate (mapa gestosci, ogniska, wagi terenu)."""
+    terrain_map = load_terrain(args.map, args.width, args.height, args.origin) if args.map else None
+    grid = Grid(args.width, args.height, initial_humans=0, initial_zombies=0, terrain_map=terrain_map)
+    density = None
+    if args.density:
+        # Fragment magazynu terenu - raster gestosci przycinany do tego samego obszaru
+        map_shape = None
+        if args.map and args.map.endswith(TERRAIN_STORE_SUFFIX):
+            with TerrainStore(args.map) as store:
+                map_shape = store.shape
+        density = load_density_raster(args.density, args.width, args.height, args.origin, map_shape)
+    outbreaks = [Outbreak(row, col, count, args.outbreak_radius) for row, col, count in args.outbreak]
+    terrain_weights = {}
+    for item in args.terrain_weight:
+        name, _, weight = item.partition("=")
+        terrain_weights[CellState[name.upper()]] = float(weight)
+    # Z ogniskami Zombie pochodza tylko z nich
+    zombies = 0 if outbreaks else args.zombies
+    populate(grid, args.humans, zombies, seed=args.seed, density=density,
+             terrain_weights=terrain_weights, outbreaks=outbreaks)
+    return grid
+
+
+def step_record(engine):
+    """Rekord statystyk ostatniego kroku (zgodny z STAT_FIELDS)."""
+    record = {name: int(engine.last_stats[name]) for name in STATS_FIELDS}
+    record["total_deaths"] = engine.total_deaths
+    return record
+
+
+class _CsvWriter:
+    def __init__(self, stream):
+        self._writer = csv.DictWriter(stream, fieldnames=STAT_FIELDS)
+        self._writer.writeheader()
+
+    def write(self, record):
+        self._writer.writerow(record)
+
+
+class _JsonLinesWriter:
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, record):
+        self._stream.write(json.dumps(record) + "\n")
+
+
+WRITERS = {"csv": _CsvWriter, "jsonl": _JsonLinesWriter}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Symulacja zombie bez GUI")
+    parser.add_argument("--map", default=MAPA_TERENU_PLIK,
+                        help="obraz mapy terenu (pusty napis - sama ziemia)")
+    parser.add_argument("--width", type=int, default=GRID_W)
+    parser.add_argument("--height", type=int, default=GRID_H)
+    parser.add_argument("--origin", type=int, nargs=2, default=(0, 0), metavar=("ROW", "COL"),
+                        help="lewy gorny rog fragmentu mapy z magazynu terenu (.zct)")
+    parser.add_argument("--humans", type=int, default=300)
+    parser.add_argument("--zombies", type=int, default=30)
+    parser.add_argument("--density", default=None, help="raster gestosci ludzi (obraz, jasnosc = gestosc)")
+    parser.add_argument("--outbreak", type=int, nargs=3, action="append", default=[],
+                        metavar=("ROW", "COL", "ZOMBIES"), help="ognisko Zombie (mozna powtarzac)")
+    parser.add_argument("--outbreak-radius", type=float, default=3.0, help="rozrzut ognisk [komorki]")
+    parser.add_argument("--terrain-weight", action="append", default=[], metavar="TEREN=WAGA",
+                        help="waga typu terenu przy rozmieszczaniu, np. STREET=2 (mozna powtarzac)")
+    parser.add_argument("--rules", default=None, help="plik JSON z regulami przejsc (rule_tables.py)")
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--format", choices=sorted(WRITERS), default="csv")
+    parser.add_argument("--output", default="-", help="plik wynikowy ('-' - stdout)")
+    parser.add_argument("--record", default=None, help="plik nagrania przebiegu")
+    parser.add_argument("--keyframe-interval", type=int, default=100,
+                        help="co ile klatek nagrania pelna klatka kluczowa")
+    parser.add_argument("--resume", default=None, help="kontynuacja z pliku checkpointu")
+    parser.add_argument("--checkpoint", default=None, help="zapis checkpointu po ostatnim kroku")
+    parser.add_argument("--metrics", action="store_true", help="pomiar czasow faz kroku")
+    parser.add_argument("--sparse", action="store_true", help="silnik rzadki (tylko aktywne komorki)")
+    parser.add_argument("--profile", default=None, help="przebieg pod cProfile, statystyki do pliku")
+    parser.add_argument("--serve", type=int, default=None, metavar="PORT",
+                        help="serwer strumienia klatek na 127.0.0.1:PORT (0 - wolny port)")
+    parser.add_argument("--tiles", type=int, default=None,
+                        help="liczba kafelkow liczonych rownolegle w procesach")
+    args = parser.parse_args(argv)
+    if args.tiles is not None and (args.resume or args.checkpoint or args.sparse or args.metrics):
+        parser.error("--tiles nie laczy sie z --resume, --checkpoint, --sparse ani --metrics")
+    if args.rules and (args.resume or args.sparse or args.tiles is not None):
+        parser.error("--rules nie laczy sie z --resume (reguly sa w checkpoincie), --sparse ani --tiles")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    engine_class = SparseEngine if args.sparse else SimulationEngine
+    if args.resume:
+        # Checkpoint odtwarza tez stan generatorow - ziarno nie jest uzywane
+        try:
+            engine = load_checkpoint(args.resume, engine_class=engine_class)
+        except ValueError as exc:
+            # np. checkpoint z wlasnymi regulami a --sparse
+            sys.exit(f"headless.py: error: {exc}")
+        args.height, args.width = engine.grid.state.shape
+    else:
+        # Ziarno dla rozmieszczenia agentow (random) oraz losowan kroku - infekcji,
+        # szumu ruchu i kolizji (NumPy)
+        random.seed(args.seed)
+        rng = np.random.default_rng(args.seed)
+
+        if args.density or args.outbreak or args.terrain_weight:
+            grid = build_population_grid(args)
+        else:
+            grid = build_grid(args.map, args.width, args.height, args.humans, args.zombies, args.origin)
+        if args.tiles is not None:
+            engine = ParallelEngine(grid, tiles=args.tiles, seed=args.seed or 0)
+        elif args.rules:
+            engine = SimulationEngine(grid, rng=rng, rules=load_rule_set(args.rules))
+        else:
+            engine = engine_class(grid, rng=rng)
+    if args.metrics:
+        engine.enable_metrics()
+
+    recorder = None
+    if args.record:
+        recorder = TrajectoryRecorder(args.record, args.width, args.height, args.keyframe_interval)
+        recorder.record_engine(engine)
+
+    stream = sys.stdout if args.output == "-" else open(args.output, "w", newline="")
+    try:
+        writer = WRITERS[args.format](stream)
+
+        def after_step():
+            writer.write(step_record(engine))
+            if recorder is not None:
+                recorder.record_engine(engine)
+
+        def run_steps():
+            if args.serve is not None:
+                run_server(engine, port=args.serve, steps=engine.step_count + args.steps, on_step=after_step)
+                return
+            for _ in range(args.steps):
+                engine.step()
+                after_step()
+
+        start = time.perf_counter()
+        if args.profile:
+            report = profile_call(run_steps, args.profile)
+        else:
+            run_steps()
+        elapsed = time.perf_counter() - start
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+        if recorder is not None:
+            recorder.close()
+        if args.tiles is not None:
+            engine.close()
+
+    if args.checkpoint:
+        save_checkpoint(engine, args.checkpoint)
+
+    steps_per_s = args.steps / elapsed if elapsed > 0 else float("inf")
+    cells_per_s = steps_per_s * args.width * args.height
+    print(f"Krokow: {args.steps} | Czas: {elapsed:.3f}s | "
+          f"{steps_per_s:.1f} krokow/s | {cells_per_s:.3e} komorek/s", file=sys.stderr)
+    if engine.metrics is not None:
+        print(engine.metrics.summary(), file=sys.stderr)
+    if args.profile:
+        print(report, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,36 @@
+import hashlib
+import os
+import tempfile
+
 import cv2
 import numpy as np
-from config import CellState
+from config import CellState, TERRAIN_CACHE_DIR
+
 
+# Wersja regul kolor -> teren; zmiana progow w color_to_terrain / classify_terrain
+# wymaga podbicia wersji, zeby uniewaznic zapisane pliki cache.
+TERRAIN_RULES_VERSION = 1
 
-def load_map_from_image(image_path, target_width, target_height):
+
+def load_map_from_image(image_path, target_width, target_height, cache_dir=TERRAIN_CACHE_DIR):
     """
     Wczytuje mapę z obrazu i konwertuje kolory na typy terenu.
-    Zwraca tablicę 2D z wartościami CellState (tereny statyczne).
+    Zwraca tablicę 2D (uint8) z wartościami CellState (tereny statyczne).
+    Wynik jest zapisywany w cache_dir jako plik .npy (klucz: hash zawartości
+    obrazu, rozmiar docelowy i wersja reguł); cache_dir=None wyłącza cache.
     """
+    cache_path = None
+    if cache_dir is not None:
+        try:
+            with open(image_path, "rb") as f:
+                image_hash = hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            raise FileNotFoundError(f"Nie można wczytać obrazu: {image_path}")
+        cache_name = f"{image_hash[:32]}_{target_width}x{target_height}_v{TERRAIN_RULES_VERSION}.npy"
+        cache_path = os.path.join(cache_dir, cache_name)
+        if os.path.exists(cache_path):
+            return np.load(cache_path, mmap_mode="r")
+
     # Wczytaj obraz
     img = cv2.imread(image_path)
     if img is None:
@@ -17,18 +40,55 @@ def load_map_from_image(image_path, target_width, target_height):
     img = cv2.resize(img, (target_width, target_height), interpolation=cv2.INTER_NEAREST)
     img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
     
-    # Utwórz siatkę terenów
-    terrain_map = np.zeros((target_height, target_width), dtype=int)
-    
-    # Dla każdego pixela określ typ terenu
-    for i in range(target_height):
-        for j in range(target_width):
-            r, g, b = img_rgb[i, j]
-            terrain_map[i, j] = color_to_terrain(r, g, b)
-    
+    # Utwórz siatkę terenów - klasyfikacja całej tablicy naraz
+    terrain_map = classify_terrain(img_rgb)
+
+    if cache_path is not None:
+        _save_atomic(cache_path, terrain_map)
     return terrain_map
 
 
+def _save_atomic(path, array):
+    """Zapis .npy przez plik tymczasowy, aby równoległe procesy nie czytały połowy pliku."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def classify_terrain(img_rgb):
+    """
+    Wektorowa wersja color_to_terrain dla całego obrazu RGB (H x W x 3).
+    Warunki sprawdzane w tej samej kolejności - pierwszy pasujący wygrywa.
+    """
+    r = img_rgb[..., 0]
+    g = img_rgb[..., 1]
+    b = img_rgb[..., 2]
+    conditions = [
+        (b > 150) & (r < 100) & (g < 150),   # NIEBIESKI → WATER
+        (r > 150) & (g < 120) & (b < 120),   # CZERWONY/RÓŻOWY → BUILDING
+        (g > 150) & (r < 150) & (b < 150),   # JASNA ZIELEŃ → GREEN_AREA
+        (r > 180) & (g > 180) & (b > 180),   # BIAŁY/JASNY SZARY → STREET
+        (r > 180) & (g > 140) & (b < 100),   # ŻÓŁTY/BEŻOWY → BUILDING
+        (r < 100) & (g < 100) & (b < 100),   # CIEMNY SZARY → STREET
+    ]
+    choices = [
+        CellState.WATER.value,
+        CellState.BUILDING.value,
+        CellState.GREEN_AREA.value,
+        CellState.STREET.value,
+        CellState.BUILDING.value,
+        CellState.STREET.value,
+    ]
+    return np.select(conditions, choices, default=CellState.GROUND.value).astype(np.uint8)
+
+
 def color_to_terrain(r, g, b):
     """
     Mapuje kolor RGB na typ terenu (CellState).
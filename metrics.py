@@ -0,0 +1,111 @@
+# metrics.py
+"""
+Pomiary czasu faz kroku i liczniki operacji.
+
+Instrumentacja jest opcjonalna: step_into(..., metrics=StepMetrics()) zapisuje
+czas kazdej fazy i liczniki; bez obiektu metrics krok wykonuje tylko kilka
+porownan z None. MetricsAggregator sumuje kolejne kroki przebiegu,
+a profile_steps() uruchamia N krokow pod cProfile.
+"""
+import cProfile
+import io
+import pstats
+import time
+
+# Fazy kroku w kolejnosci wykonania
+PHASES = ("copy", "rules", "targets", "movement", "collisions", "apply")
+# Liczniki operacji jednego kroku
+COUNTERS = ("cells", "agents", "target_searches", "collisions", "moves")
+
+
+class StepMetrics:
+    """Czasy faz [s] i liczniki operacji jednego kroku."""
+    __slots__ = ("times", "counts")
+
+    def __init__(self):
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.counts = dict.fromkeys(COUNTERS, 0)
+
+    def reset(self):
+        for phase in PHASES:
+            self.times[phase] = 0.0
+        for name in COUNTERS:
+            self.counts[name] = 0
+
+    def lap(self, phase, start):
+        """Dolicza czas od `start` do fazy i zwraca biezacy czas (poczatek nastepnej fazy)."""
+        now = time.perf_counter()
+        self.times[phase] += now - start
+        return now
+
+    @property
+    def total(self):
+        return sum(self.times.values())
+
+    def as_dict(self):
+        return {"times": dict(self.times), "counts": dict(self.counts), "total": self.total}
+
+
+class MetricsAggregator:
+    """Sumy i srednie metryk z wielu krokow."""
+    def __init__(self):
+        self.steps = 0
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self.max_total = 0.0
+
+    def add(self, step_metrics):
+        self.steps += 1
+        for phase, seconds in step_metrics.times.items():
+            self.times[phase] += seconds
+        for name, value in step_metrics.counts.items():
+            self.counts[name] += value
+        self.max_total = max(self.max_total, step_metrics.total)
+
+    def mean_times(self):
+        """Sredni czas fazy na krok [s]."""
+        steps = max(self.steps, 1)
+        return {phase: seconds / steps for phase, seconds in self.times.items()}
+
+    def shares(self):
+        """Udzial fazy w calkowitym czasie krokow (0..1)."""
+        total = sum(self.times.values())
+        return {phase: (seconds / total if total > 0 else 0.0) for phase, seconds in self.times.items()}
+
+    def as_dict(self):
+        return {"steps": self.steps, "times": dict(self.times), "counts": dict(self.counts),
+                "mean_times": self.mean_times(), "max_step_time": self.max_total}
+
+    def summary(self):
+        """Tabela tekstowa: sredni czas i udzial kazdej fazy oraz sumy licznikow."""
+        lines = [f"Krokow: {self.steps} | najdluzszy krok: {self.max_total * 1e3:.2f} ms"]
+        means = self.mean_times()
+        shares = self.shares()
+        for phase in PHASES:
+            lines.append(f"  {phase:11s} {means[phase] * 1e3:9.3f} ms/krok  {shares[phase]:6.1%}")
+        lines.append("  " + "  ".join(f"{name}={value}" for name, value in self.counts.items()))
+        return "\n".join(lines)
+
+
+def profile_steps(engine, steps, path=None, sort="cumulative", limit=30):
+    """
+    Wykonuje `steps` krokow silnika pod cProfile. Statystyki trafiaja do pliku
+    `path` (format pstats, np. do snakeviz), a zwracany jest tekst z `limit`
+    najdrozszymi funkcjami.
+    """
+    return profile_call(lambda: engine.run(steps), path, sort, limit)
+
+
+def profile_call(func, path=None, sort="cumulative", limit=30):
+    """Jak profile_steps, ale dla dowolnej funkcji bez argumentow."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        func()
+    finally:
+        profiler.disable()
+    if path is not None:
+        profiler.dump_stats(path)
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
@@ -0,0 +1,162 @@
+# movement.py
+"""
+Wektorowy ruch agentow (ETAP B kroku) dla tablic (K, H, W).
+
+Wszyscy agenci jednej klasy oceniaja swoich kandydatow naraz (tablica
+agent x przesuniecie), wedlug tych samych skladnikow co calculate_movement:
+zmiana odleglosci do celu razy modyfikator terenu, wiatr (Zombie) i szum.
+Kolizje rozstrzyga losowy klucz priorytetu - pole dostaje agent z najmniejszym
+kluczem, niezaleznie od kolejnosci skanowania. Przegrani zostaja na miejscu.
+
+Ten sam kod obsluguje pojedyncza siatke (K = 1, simulation.step_into)
+i silnik wsadowy (batched.BatchedEngine).
+"""
+import numpy as np
+
+from config import CellState
+from distance_field import nearest_target_keys, NO_TARGET_KEY
+
+# Agenci oceniani sa porcjami, zeby tablice kandydatow nie rosly bez ograniczen.
+# Losowania z generatora sa ciagle, wiec wynik nie zalezy od rozmiaru porcji.
+AGENT_CHUNK = 1 << 16
+
+
+class MovementTables:
+    """
+    Parametry ruchu jako tablice indeksowane numerem repliki.
+    Predkosci (przesuniecia kandydatow) i search_range sa wspolne dla wszystkich replik.
+    """
+    def __init__(self, params):
+        params = list(params)
+        replicas = len(params)
+        self.noise_strength = np.array([p.noise_strength for p in params], dtype=np.float64)
+        self.wind_vector = np.array([p.wind_vector for p in params], dtype=np.float64).reshape(replicas, 2)
+        self.wind_strength = np.array([p.wind_strength for p in params], dtype=np.float64)
+        self.modifier_lut = np.stack([p.terrain_modifier for p in params])
+        self.search_range = params[0].search_range
+        self.human_offsets = params[0].human_move_offsets
+        self.zombie_offsets = params[0].zombie_move_offsets
+
+
+def target_keys(state, origin):
+    """
+    Klucz najblizszego celu (distance_field) dla kazdego agenta z `origin`:
+    Zombie - najblizszy czlowiek lub zarazony, czlowiek - najblizszy Zombie.
+    """
+    zombie_keys = nearest_target_keys((state == CellState.HUMAN.value) | (state == CellState.INFECTED.value))
+    human_keys = nearest_target_keys(state == CellState.ZOMBIE.value)
+    is_zombie = state.reshape(-1)[origin] == CellState.ZOMBIE.value
+    return np.where(is_zombie, zombie_keys.reshape(-1)[origin], human_keys.reshape(-1)[origin])
+
+
+def choose_destinations(state, modifier, origin, keys, tables, rng, uniform=None):
+    """
+    Docelowe pole (indeks plaski w (K, H, W)) kazdego agenta z `origin`.
+    modifier - modyfikatory ruchu komorek (TerrainField.modifier, ksztalt stanu),
+    keys - klucze najblizszych celow agentow (jak z target_keys).
+    uniform - opcjonalne zrodlo szumu: funkcja (origin, liczba kandydatow)
+    -> tablica U[0, 1); domyslnie kolejne losowania z rng.
+    Agent bez wolnego kandydata zostaje na miejscu.
+    """
+    destination = origin.copy()
+    agent_state = state.reshape(-1)[origin]
+    classes = (
+        (CellState.ZOMBIE, tables.zombie_offsets, False),
+        (CellState.HUMAN, tables.human_offsets, True),
+    )
+    for agent_class, offsets, is_fleeing in classes:
+        selected = np.flatnonzero(agent_state == agent_class.value)
+        for start in range(0, selected.size, AGENT_CHUNK):
+            chunk = selected[start:start + AGENT_CHUNK]
+            destination[chunk] = _best_moves(state, modifier, origin[chunk], keys[chunk],
+                                             offsets, is_fleeing, agent_class == CellState.ZOMBIE,
+                                             tables, rng, uniform)
+    return destination
+
+
+def _best_moves(state, modifier, origin, key, offsets, is_fleeing, is_zombie, tables, rng, uniform):
+    """Najlepsze pole dla grupy agentow jednej klasy - odpowiednik calculate_movement."""
+    _, height, width = state.shape
+    cells = height * width
+    dr, dc = offsets
+    agent_k = origin // cells
+    agent_r = (origin % cells) // width
+    agent_c = origin % width
+
+    # Cel z pola najblizszych celow; brak celu (lub dalej niz search_range) -> wlasna pozycja
+    found = key < NO_TARGET_KEY
+    if tables.search_range is not None:
+        found &= key // cells <= tables.search_range
+    target_idx = key % cells
+    target_r = np.where(found, target_idx // width, agent_r)
+    target_c = np.where(found, target_idx % width, agent_c)
+
+    k = agent_k[:, None]
+    new_r = (agent_r[:, None] + dr) % height
+    new_c = (agent_c[:, None] + dc) % width
+    valid = state[k, new_r, new_c] == CellState.GROUND.value
+    candidate_modifier = modifier[k, new_r, new_c]
+
+    old_dist = np.abs(agent_r - target_r) + np.abs(agent_c - target_c)
+    new_dist = np.abs(new_r - target_r[:, None]) + np.abs(new_c - target_c[:, None])
+    score = (new_dist - old_dist[:, None]) * candidate_modifier
+
+    if is_zombie:
+        wind = tables.wind_vector[agent_k]
+        score += tables.wind_strength[agent_k, None] * (dr * wind[:, :1] + dc * wind[:, 1:])
+
+    noise = rng.random(score.shape) if uniform is None else uniform(origin, score.shape[1])
+    score += (2.0 * noise - 1.0) * tables.noise_strength[agent_k, None]
+
+    # Pierwszy najlepszy kandydat w kolejnosci petli (jak scisle < / > w calculate_movement)
+    if is_fleeing:
+        best = np.argmax(np.where(valid, score, -np.inf), axis=1)
+    else:
+        best = np.argmin(np.where(valid, score, np.inf), axis=1)
+    has_move = valid.any(axis=1)
+    rows = np.arange(origin.size)
+    dest_r = np.where(has_move, new_r[rows, best], agent_r)
+    dest_c = np.where(has_move, new_c[rows, best], agent_c)
+    return agent_k * cells + dest_r * width + dest_c
+
+
+def resolve_collisions(origin, destination, rng, priority=None):
+    """
+    Rozstrzyga kolizje: z agentow celujacych w to samo pole wygrywa ten
+    z najmniejszym losowym kluczem, pozostali zostaja na swoim polu.
+    priority - opcjonalne gotowe klucze (domyslnie losowane z rng).
+    Zwraca (final, lost) - pozycje koncowe i maske agentow, ktorzy przegrali.
+    """
+    if priority is None:
+        priority = rng.random(origin.size)
+    order = np.lexsort((priority, destination))
+    first_claim = np.ones(order.size, dtype=bool)
+    first_claim[1:] = destination[order[1:]] != destination[order[:-1]]
+    won = np.zeros(origin.size, dtype=bool)
+    won[order[first_claim]] = True
+    return np.where(won, destination, origin), ~won
+
+
+def apply_moves(state, incubation_counter, compost_counter, origin, final):
+    """Przenosi agentow z origin na final (indeksy plaskie), zerujac liczniki pol."""
+    flat_state = state.reshape(-1)
+    flat_incubation = incubation_counter.reshape(-1)
+    flat_compost = compost_counter.reshape(-1)
+    agent_state = flat_state[origin]
+    flat_state[origin] = CellState.GROUND.value
+    flat_state[final] = agent_state
+    flat_incubation[origin] = 0
+    flat_incubation[final] = 0
+    flat_compost[origin] = 0
+    flat_compost[final] = 0
+
+
+def move_agents(state, modifier, incubation_counter, compost_counter, tables, rng):
+    """Caly ETAP B w miejscu na tablicach (K, H, W); zwraca liczbe agentow, ktorzy zmienili pole."""
+    origin = np.flatnonzero((state == CellState.HUMAN.value) | (state == CellState.ZOMBIE.value))
+    if origin.size == 0:
+        return 0
+    destination = choose_destinations(state, modifier, origin, target_keys(state, origin), tables, rng)
+    final, _ = resolve_collisions(origin, destination, rng)
+    apply_moves(state, incubation_counter, compost_counter, origin, final)
+    return int(np.count_nonzero(final != origin))
@@ -0,0 +1,510 @@
+# parallel.py
+"""
+Krok symulacji rownolegle na kafelkach mapy (procesy robocze + pamiec wspoldzielona).
+
+Torus dzielony jest na pasy wierszy (kafelki); kazdy proces liczy swoj
+kafelek na tablicach w multiprocessing.shared_memory, a fazy kroku oddziela
+bariera. Sasiednie wiersze (halo) sa czytane bezposrednio z pamieci
+wspoldzielonej po barierze, wiec wymiana halo nie wymaga kopiowania:
+    reguly     - halo 1 wiersz (sasiedztwo Moore'a), stan z bufora biezacego,
+    cele       - pole odleglosci rozbite na przejscie wierszami (wlasne wiersze)
+                 i kolumnami (wlasny blok kolumn) - cele szukane sa na calej mapie,
+    ruch       - halo 2 x predkosc: kafelek liczy wybor pola takze dla agentow
+                 z sasiednich pasow, wiec zna wszystkie roszczenia do swoich pol
+                 i rozstrzyga kolizje na granicy tak samo jak sasiad,
+    zapis      - kazdy kafelek zapisuje tylko swoje wiersze bufora nastepnego.
+
+Losowania nie pochodza z generatora sekwencyjnego, tylko z funkcji
+mieszajacej (ziarno, krok, strumien, indeks komorki) - counter_uniform.
+Kazda decyzja zalezy wiec tylko od stanu mapy i ziarna, a wynik nie zalezy
+od liczby kafelkow ani od tego, czy kafelki liczone sa w procesach, czy po kolei
+w jednym procesie (processes=False). Strumien losowy jest inny niz
+w SimulationEngine, wiec wyniki obu silnikow nie sa identyczne.
+"""
+import os
+import threading
+import weakref
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from config import CellState
+from distance_field import NO_TARGET_KEY, _torus_sweep_axis0
+from engine import SimulationEngine
+from grid import Grid
+from movement import MovementTables, choose_destinations, resolve_collisions
+from rule_tables import is_default_rules
+
+# Strumienie losowan counter_uniform
+STREAM_INFECTION = 1
+STREAM_NOISE = 2
+STREAM_PRIORITY = 3
+
+TILE_COUNTS = ("deaths", "infections", "turnings", "composts", "moves")
+
+_MASK64 = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15
+_MIX1 = 0xBF58476D1CE4E5B9
+_MIX2 = 0x94D049BB133111EB
+
+_RUN = 0
+_STOP = 1
+# Czas [s] na uruchomienie procesow roboczych
+_STARTUP_TIMEOUT = 60
+
+
+def _mix64_int(x):
+    """splitmix64 na liczbie Pythona."""
+    x &= _MASK64
+    x = ((x ^ (x >> 30)) * _MIX1) & _MASK64
+    x = ((x ^ (x >> 27)) * _MIX2) & _MASK64
+    return x ^ (x >> 31)
+
+
+def _mix64(x):
+    """splitmix64 na tablicy uint64 (mnozenie modulo 2^64)."""
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(_MIX1)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(_MIX2)
+    return x ^ (x >> np.uint64(31))
+
+
+def counter_hash(seed, step, stream, counter):
+    """64-bitowy skrot (ziarno, krok, strumien, licznik) dla tablicy licznikow."""
+    key = _mix64_int(_mix64_int(seed) ^ ((step * _GOLDEN + stream) & _MASK64))
+    counter = np.asarray(counter).astype(np.uint64)
+    return _mix64(counter * np.uint64(_GOLDEN) + np.uint64(key))
+
+
+def counter_uniform(seed, step, stream, counter):
+    """Liczby U[0, 1) wyznaczone przez (ziarno, krok, strumien, licznik) - bez stanu generatora."""
+    return (counter_hash(seed, step, stream, counter) >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+
+
+def _bounds(size, parts):
+    """Granice rownego podzialu [0, size) na `parts` przedzialow."""
+    return [size * i // parts for i in range(parts + 1)]
+
+
+class TileStepper:
+    """
+    Fazy kroku dla pojedynczego kafelka na tablicach calej mapy.
+    arrays - slownik tablic (state, incubation, compost: (2, H, W) - bufory
+    biezacy i nastepny; terrain, modifier, zombie_keys, human_keys:
+    (H, W); counts: (liczba kafelkow, len(TILE_COUNTS))).
+    """
+    def __init__(self, arrays, tiles, params, seed):
+        self.arrays = arrays
+        self.state = arrays["state"]
+        self.incubation = arrays["incubation"]
+        self.compost = arrays["compost"]
+        self.terrain = arrays["terrain"]
+        self.modifier = arrays["modifier"]
+        self.zombie_keys = arrays["zombie_keys"]
+        self.human_keys = arrays["human_keys"]
+        self.counts = arrays["counts"]
+        _, self.height, self.width = self.state.shape
+        self.tiles = tiles
+        self.row_bounds = _bounds(self.height, tiles)
+        self.col_bounds = _bounds(self.width, tiles)
+        self.seed = seed
+        self.set_params(params)
+
+    def set_params(self, params):
+        self.params = params
+        self.tables = MovementTables([params])
+        # Halo ruchu: roszczenia do pol kafelka moga przyjsc z odleglosci predkosci,
+        # a wybor pola tych agentow zalezy od komorek o kolejna predkosc dalej
+        self.halo = 2 * max(params.base_human_speed, params.base_zombie_speed)
+        self._extended_rows = [self._rows_with_halo(tile, self.halo) for tile in range(self.tiles)]
+
+    def _rows_with_halo(self, tile, halo):
+        r0, r1 = self.row_bounds[tile], self.row_bounds[tile + 1]
+        if r1 - r0 + 2 * halo >= self.height:
+            return np.arange(self.height)
+        return np.arange(r0 - halo, r1 + halo) % self.height
+
+    def tile_step(self, tile, step, cur):
+        """
+        Generator faz kroku kafelka; po kazdej fazie (yield) wszystkie kafelki
+        musza dojsc do bariery, zanim ktorykolwiek zacznie nastepna.
+        """
+        nxt = 1 - cur
+        counts = self.counts[tile]
+        counts[:4] = self._rules(tile, step, cur, nxt)
+        yield
+        self._targets_rows(tile, nxt)
+        yield
+        self._targets_columns(tile)
+        yield
+        plan = self._plan_moves(tile, step, nxt)
+        yield
+        counts[4] = self._apply_moves(tile, nxt, plan)
+        yield
+
+    def _rules(self, tile, step, cur, nxt):
+        """Reguly infekcji, inkubacji i kompostu dla wierszy kafelka (bufor cur -> nxt)."""
+        params = self.params
+        height, width = self.height, self.width
+        r0, r1 = self.row_bounds[tile], self.row_bounds[tile + 1]
+        state = self.state[cur, r0:r1]
+        incubation = self.incubation[cur, r0:r1]
+        compost = self.compost[cur, r0:r1]
+        next_state = self.state[nxt, r0:r1]
+        next_incubation = self.incubation[nxt, r0:r1]
+        next_compost = self.compost[nxt, r0:r1]
+        np.copyto(next_state, state)
+        np.copyto(next_incubation, incubation)
+        np.copyto(next_compost, compost)
+
+        # Liczba sasiadow Zombie z halo jednego wiersza z kazdej strony
+        window = (self.state[cur][np.arange(r0 - 1, r1 + 1) % height] == CellState.ZOMBIE.value).astype(np.uint8)
+        rows = window + np.roll(window, 1, axis=1) + np.roll(window, -1, axis=1)
+        zombie_neighbors_count = rows[:-2] + rows[1:-1] + rows[2:] - window[1:-1]
+
+        humans = state == CellState.HUMAN.value
+        dies = humans & (zombie_neighbors_count >= params.zombie_death_threshold)
+        exposed = humans & ~dies & params.infection_range_lut[zombie_neighbors_count]
+        base = r0 * width
+        exposed_idx = np.flatnonzero(exposed)
+        rolls = counter_uniform(self.seed, step, STREAM_INFECTION, exposed_idx + base)
+        infected_idx = exposed_idx[rolls < params.infection_probability]
+
+        infected = state == CellState.INFECTED.value
+        next_incubation_value = incubation - 1
+        turns = infected & (next_incubation_value <= 0)
+        dead = state == CellState.DEAD.value
+        next_compost_value = compost + 1
+        composts = dead & (next_compost_value >= params.compost_time)
+
+        next_incubation[infected] = next_incubation_value[infected]
+        next_compost[dead] = next_compost_value[dead]
+
+        next_state[dies] = CellState.DEAD.value
+        next_compost[dies] = 0
+        next_incubation[dies] = 0
+
+        next_state.reshape(-1)[infected_idx] = CellState.INFECTED.value
+        next_incubation.reshape(-1)[infected_idx] = params.incubation_time
+        next_compost.reshape(-1)[infected_idx] = 0
+
+        next_state[turns] = CellState.ZOMBIE.value
+        next_incubation[turns] = 0
+
+        # Kompost -> Ziemia (teren i modyfikator ruchu tylko we wlasnych wierszach)
+        next_state[composts] = CellState.GROUND.value
+        next_compost[composts] = 0
+        self.terrain[r0:r1][composts] = CellState.GROUND.value
+        self.modifier[r0:r1][composts] = params.terrain_modifier[CellState.GROUND.value]
+
+        return (np.count_nonzero(dies), infected_idx.size, np.count_nonzero(turns), np.count_nonzero(composts))
+
+    def _targets_rows(self, tile, nxt):
+        """Pierwsze przejscie pola odleglosci: wzdluz wierszy kafelka (pelna szerokosc torusa)."""
+        r0, r1 = self.row_bounds[tile], self.row_bounds[tile + 1]
+        cells = self.height * self.width
+        state = self.state[nxt, r0:r1]
+        flat = np.arange(r0 * self.width, r1 * self.width, dtype=np.int64).reshape(r1 - r0, self.width)
+        masks = (
+            (self.zombie_keys, (state == CellState.HUMAN.value) | (state == CellState.INFECTED.value)),
+            (self.human_keys, state == CellState.ZOMBIE.value),
+        )
+        for keys, mask in masks:
+            keys_w = np.ascontiguousarray(np.where(mask, flat, NO_TARGET_KEY).T)
+            _torus_sweep_axis0(keys_w, cells)
+            keys[r0:r1] = keys_w.T
+
+    def _targets_columns(self, tile):
+        """Drugie przejscie: wzdluz kolumn z bloku kafelka (wszystkie wiersze mapy)."""
+        c0, c1 = self.col_bounds[tile], self.col_bounds[tile + 1]
+        if c0 == c1:
+            return
+        cells = self.height * self.width
+        for keys in (self.zombie_keys, self.human_keys):
+            keys_h = np.ascontiguousarray(keys[:, c0:c1])
+            _torus_sweep_axis0(keys_h, cells)
+            keys[:, c0:c1] = keys_h
+
+    def _plan_moves(self, tile, step, nxt):
+        """Wybor pol i kolizje dla agentow kafelka i jego halo; zwraca (origin, final, agent_state)."""
+        width = self.width
+        rows = self._extended_rows[tile]
+        state = self.state[nxt]
+        window = state[rows]
+        agent_r, agent_c = np.nonzero((window == CellState.HUMAN.value) | (window == CellState.ZOMBIE.value))
+        origin = rows[agent_r].astype(np.int64) * width + agent_c
+        if origin.size == 0:
+            return None
+
+        agent_state = state.reshape(-1)[origin]
+        keys = np.where(agent_state == CellState.ZOMBIE.value,
+                        self.zombie_keys.reshape(-1)[origin], self.human_keys.reshape(-1)[origin])
+        seed = self.seed
+
+        def noise(agents, candidates):
+            counter = agents[:, None] * candidates + np.arange(candidates)
+            return counter_uniform(seed, step, STREAM_NOISE, counter)
+
+        destination = choose_destinations(state[None], self.modifier[None], origin, keys,
+                                          self.tables, None, uniform=noise)
+        # Klucz priorytetu: skrot w starszych bitach, indeks pola w mlodszych - bez remisow
+        index_bits = np.uint64(int(self.height * self.width).bit_length())
+        priority = ((counter_hash(seed, step, STREAM_PRIORITY, origin) >> index_bits) << index_bits) \
+            | origin.astype(np.uint64)
+        final, _ = resolve_collisions(origin, destination, None, priority)
+        return origin, final, agent_state
+
+    def _apply_moves(self, tile, nxt, plan):
+        """Zapis ruchow dotyczacych wierszy kafelka; zwraca liczbe ruchow agentow kafelka."""
+        if plan is None:
+            return 0
+        origin, final, agent_state = plan
+        lo = self.row_bounds[tile] * self.width
+        hi = self.row_bounds[tile + 1] * self.width
+        flat_state = self.state[nxt].reshape(-1)
+        flat_incubation = self.incubation[nxt].reshape(-1)
+        flat_compost = self.compost[nxt].reshape(-1)
+
+        leaving = origin[(origin >= lo) & (origin < hi)]
+        flat_state[leaving] = CellState.GROUND.value
+        flat_incubation[leaving] = 0
+        flat_compost[leaving] = 0
+
+        landing = (final >= lo) & (final < hi)
+        arriving = final[landing]
+        flat_state[arriving] = agent_state[landing]
+        flat_incubation[arriving] = 0
+        flat_compost[arriving] = 0
+        own = (origin >= lo) & (origin < hi)
+        return int(np.count_nonzero(own & (final != origin)))
+
+
+_ARRAY_SPECS = (
+    ("state", 2, np.uint8),
+    ("incubation", 2, np.int16),
+    ("compost", 2, np.int16),
+    ("terrain", None, np.uint8),
+    ("modifier", None, np.float64),
+    ("zombie_keys", None, np.int64),
+    ("human_keys", None, np.int64),
+)
+
+
+def _attach(handles):
+    """Dolacza do blokow pamieci wspoldzielonej; zwraca (bloki, slownik tablic)."""
+    blocks = []
+    arrays = {}
+    for name, (block_name, shape, dtype) in handles.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    return blocks, arrays
+
+
+def _close_blocks(blocks):
+    for block in blocks:
+        try:
+            block.close()
+        except BufferError:
+            # Zyja jeszcze widoki tablic - pamiec zostanie zwolniona razem z nimi
+            pass
+
+
+def _tile_worker(tile, tiles, handles, params, seed, start_barrier, phase_barrier, param_queue):
+    """Petla procesu roboczego: jeden kafelek, krok po kroku na sygnal z bariery startu."""
+    blocks, arrays = _attach(handles)
+    stepper = TileStepper(arrays, tiles, params, seed)
+    control = arrays["control"]
+    params_version = 0
+    try:
+        # Gotowosc procesu
+        start_barrier.wait()
+        while True:
+            start_barrier.wait()
+            if control[0] == _STOP:
+                break
+            # Kolejka oddaje element z opoznieniem (watek zapisu) - czekamy
+            # na wersje parametrow ogloszona w control, zeby wszystkie kafelki
+            # liczyly krok z tymi samymi parametrami
+            while params_version < control[3]:
+                params_version, params = param_queue.get()
+                stepper.set_params(params)
+            try:
+                for _ in stepper.tile_step(tile, int(control[1]), int(control[2])):
+                    phase_barrier.wait()
+            except Exception:
+                phase_barrier.abort()
+                start_barrier.abort()
+                raise
+            start_barrier.wait()
+    except threading.BrokenBarrierError:
+        pass
+    finally:
+        del stepper, arrays, control
+        _close_blocks(blocks)
+
+
+def _shutdown(processes, control, start_barrier, blocks):
+    """Zatrzymuje procesy robocze i zwalnia pamiec wspoldzielona."""
+    if processes:
+        control[0] = _STOP
+        try:
+            start_barrier.wait(timeout=10)
+        except threading.BrokenBarrierError:
+            pass
+        for process in processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+    _close_blocks(blocks)
+    for block in blocks:
+        block.unlink()
+
+
+class ParallelEngine(SimulationEngine):
+    """
+    SimulationEngine liczacy krok na `tiles` kafelkach (pasach wierszy).
+    processes=True - jeden proces roboczy na kafelek (przy tiles > 1),
+    processes=False - kafelki liczone po kolei w biezacym procesie (ten sam wynik).
+    seed - ziarno losowan counter_uniform; rng nie jest uzywany.
+    Siatka (grid) to widok na pamiec wspoldzielona - zmiany z zewnatrz
+    (jak w SimulationEngine) tylko miedzy krokami. Po zakonczeniu nalezy
+    wywolac close() (albo uzyc silnika jako menedzera kontekstu).
+    Pomiar faz kroku (enable_metrics) nie jest obslugiwany; reguly przejsc sa
+    wbudowane (DEFAULT_RULES) - inny RuleSet jest odrzucany.
+    """
+    def __init__(self, grid, tiles=None, seed=0, rng=None, params=None, history_size=4096, processes=True,
+                 rules=None):
+        if not is_default_rules(rules):
+            raise ValueError("ParallelEngine obsluguje tylko domyslne reguly (DEFAULT_RULES)")
+        height, width = grid.state.shape
+        tiles = tiles if tiles is not None else os.cpu_count() or 1
+        if not 1 <= tiles <= height:
+            raise ValueError(f"Liczba kafelkow musi byc z przedzialu 1..{height}, podano {tiles}")
+
+        self._blocks = []
+        handles = {}
+        arrays = {}
+        specs = _ARRAY_SPECS + (("counts", (tiles, len(TILE_COUNTS)), np.int64), ("control", (4,), np.int64))
+        for name, lead, dtype in specs:
+            if isinstance(lead, tuple):
+                shape = lead
+            else:
+                shape = (height, width) if lead is None else (lead, height, width)
+            size = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+            block = shared_memory.SharedMemory(create=True, size=size)
+            self._blocks.append(block)
+            handles[name] = (block.name, shape, dtype)
+            arrays[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        arrays["state"][0] = grid.state
+        arrays["incubation"][0] = grid.incubation_counter
+        arrays["compost"][0] = grid.compost_counter
+        arrays["terrain"][...] = grid.terrain
+        arrays["control"][...] = 0
+        self._arrays = arrays
+        self._buffers = [Grid.from_arrays(arrays["state"][i], arrays["terrain"],
+                                          arrays["incubation"][i], arrays["compost"][i]) for i in range(2)]
+        self._cur = 0
+
+        super().__init__(self._buffers[0], rng=rng, params=params, history_size=history_size)
+        self._back = None
+        # Modyfikator ruchu w pamieci wspoldzielonej - kafelki naprawiaja je przy kompoście
+        field = self.terrain_field
+        field.modifier = arrays["modifier"]
+        field.rebuild()
+
+        self.seed = seed
+        self.tiles = tiles
+        self._stepper = TileStepper(arrays, tiles, self.params, seed)
+        self._sent_params = self.params
+        self._params_version = 0
+        self._processes = []
+        self._param_queues = []
+        self._start_barrier = None
+        if processes and tiles > 1:
+            try:
+                self._start_workers(handles)
+            except BaseException:
+                # Finalizator jeszcze nie istnieje - bloki trzeba zwolnic tutaj
+                _close_blocks(self._blocks)
+                for block in self._blocks:
+                    block.unlink()
+                raise
+        self._finalizer = weakref.finalize(self, _shutdown, self._processes, arrays["control"],
+                                           self._start_barrier, self._blocks)
+
+    def _start_workers(self, handles):
+        context = mp.get_context("spawn")
+        self._start_barrier = context.Barrier(self.tiles + 1)
+        phase_barrier = context.Barrier(self.tiles)
+        for tile in range(self.tiles):
+            param_queue = context.Queue()
+            process = context.Process(target=_tile_worker, daemon=True,
+                                      args=(tile, self.tiles, handles, self.params, self.seed,
+                                            self._start_barrier, phase_barrier, param_queue))
+            process.start()
+            self._processes.append(process)
+            self._param_queues.append(param_queue)
+        try:
+            self._start_barrier.wait(timeout=_STARTUP_TIMEOUT)
+        except threading.BrokenBarrierError:
+            for process in self._processes:
+                process.terminate()
+            self._processes.clear()
+            raise RuntimeError("Procesy kafelkow nie wystartowaly") from None
+
+    def close(self):
+        """Zatrzymuje procesy robocze i zwalnia pamiec wspoldzielona (siatka przestaje byc wazna)."""
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def step(self):
+        """Wykonuje jeden krok i zwraca liczbe zgonow w tym kroku."""
+        if not self._finalizer.alive:
+            raise RuntimeError("Silnik zostal zamkniety")
+        self.terrain_field.set_modifier_lut(self.params.terrain_modifier)
+        if self.params is not self._sent_params:
+            self._stepper.set_params(self.params)
+            self._params_version += 1
+            for param_queue in self._param_queues:
+                param_queue.put((self._params_version, self.params))
+            self._sent_params = self.params
+            self._arrays["control"][3] = self._params_version
+
+        cur = self._cur
+        control = self._arrays["control"]
+        control[0] = _RUN
+        control[1] = self.step_count
+        control[2] = cur
+        if self._processes:
+            try:
+                self._start_barrier.wait()
+                self._start_barrier.wait()
+            except threading.BrokenBarrierError:
+                self.close()
+                raise RuntimeError("Proces kafelka zakonczyl sie bledem") from None
+        else:
+            stepper = self._stepper
+            # zip przesuwa generatory kafelkow faza po fazie - jak bariera
+            for _ in zip(*(stepper.tile_step(tile, self.step_count, cur) for tile in range(self.tiles))):
+                pass
+
+        totals = self._arrays["counts"].sum(axis=0)
+        transitions = self._transitions
+        for name, value in zip(TILE_COUNTS, totals.tolist()):
+            transitions[name] = value
+
+        self._cur = 1 - cur
+        self.grid = self._buffers[self._cur]
+        deaths = transitions["deaths"]
+        self.step_count += 1
+        self.total_deaths += deaths
+        self._update_counts(transitions)
+        return deaths
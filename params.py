@@ -0,0 +1,127 @@
+# params.py
+from dataclasses import dataclass, field, replace
+from functools import cached_property
+from types import MappingProxyType
+
+import numpy as np
+
+import config
+from config import CellState
+
+MAX_NEIGHBORS = 8
+TERRAIN_LUT_SIZE = 256
+
+
+def _read_only(array):
+    array.flags.writeable = False
+    return array
+
+
+@dataclass(frozen=True)
+class SimulationParams:
+    """
+    Niezmienny zestaw parametrow symulacji przekazywany jawnie do silnika.
+    Wartosci domyslne to wartosci z config.py w chwili importu;
+    SimulationParams.from_config() czyta biezace wartosci modulu config.
+    Tablice pochodne (modyfikatory terenu, przesuniecia ruchu, zakres infekcji)
+    liczone sa raz na instancje.
+    Zmiana parametru = nowa instancja: params.replace(infection_probability=0.3).
+    """
+    incubation_time: int = config.INCUBATION_TIME
+    compost_time: int = config.COMPOST_TIME
+    infection_probability: float = config.INFECTION_PROBABILITY
+    zombie_infection_range: tuple = tuple(config.ZOMBIE_INFECTION_RANGE)
+    zombie_death_threshold: int = config.ZOMBIE_DEATH_THRESHOLD
+    base_human_speed: int = config.BASE_HUMAN_SPEED
+    base_zombie_speed: int = config.BASE_ZOMBIE_SPEED
+    wind_vector: tuple = tuple(config.WIND_VECTOR)
+    wind_strength: float = config.WIND_STRENGTH
+    noise_strength: float = config.NOISE_STRENGTH
+    movement_modifiers: MappingProxyType = field(
+        default_factory=lambda: MappingProxyType(dict(config.MOVEMENT_MODIFIERS)))
+    search_range: int = config.SEARCH_RANGE
+
+    def __post_init__(self):
+        # Normalizacja typow zmiennych na niezmienne odpowiedniki
+        object.__setattr__(self, "zombie_infection_range", tuple(self.zombie_infection_range))
+        object.__setattr__(self, "wind_vector", tuple(self.wind_vector))
+        object.__setattr__(self, "movement_modifiers", MappingProxyType(dict(self.movement_modifiers)))
+
+    @classmethod
+    def from_config(cls, **overrides):
+        """Parametry z biezacych wartosci modulu config (z opcjonalnymi nadpisaniami)."""
+        values = dict(
+            incubation_time=config.INCUBATION_TIME,
+            compost_time=config.COMPOST_TIME,
+            infection_probability=config.INFECTION_PROBABILITY,
+            zombie_infection_range=config.ZOMBIE_INFECTION_RANGE,
+            zombie_death_threshold=config.ZOMBIE_DEATH_THRESHOLD,
+            base_human_speed=config.BASE_HUMAN_SPEED,
+            base_zombie_speed=config.BASE_ZOMBIE_SPEED,
+            wind_vector=config.WIND_VECTOR,
+            wind_strength=config.WIND_STRENGTH,
+            noise_strength=config.NOISE_STRENGTH,
+            movement_modifiers=config.MOVEMENT_MODIFIERS,
+            search_range=config.SEARCH_RANGE,
+        )
+        values.update(overrides)
+        return cls(**values)
+
+    def replace(self, **changes):
+        """Nowa instancja z podmienionymi polami."""
+        return replace(self, **changes)
+
+    def __getstate__(self):
+        # MappingProxyType nie jest serializowalny - zapisujemy zwykly slownik
+        state = {name: getattr(self, name) for name in self.__dataclass_fields__}
+        state["movement_modifiers"] = dict(self.movement_modifiers)
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+        self.__post_init__()
+
+    # --- Tablice pochodne ---
+
+    @cached_property
+    def terrain_modifier(self):
+        """Modyfikator ruchu indeksowany wartoscia terenu (domyslnie 1.0)."""
+        lut = np.ones(TERRAIN_LUT_SIZE, dtype=np.float64)
+        for terrain_value, modifier in self.movement_modifiers.items():
+            lut[terrain_value] = modifier
+        return _read_only(lut)
+
+    @cached_property
+    def infection_range_lut(self):
+        """infection_range_lut[n] - czy n sasiadow Zombie miesci sie w zombie_infection_range."""
+        lut = np.zeros(MAX_NEIGHBORS + 1, dtype=bool)
+        for count in self.zombie_infection_range:
+            if 0 <= count <= MAX_NEIGHBORS:
+                lut[count] = True
+        return _read_only(lut)
+
+    @cached_property
+    def human_move_offsets(self):
+        return _movement_offsets(self.base_human_speed)
+
+    @cached_property
+    def zombie_move_offsets(self):
+        return _movement_offsets(self.base_zombie_speed)
+
+    def move_offsets(self, agent_state):
+        """Przesuniecia kandydatow (dr, dc) dla klasy agenta."""
+        if agent_state == CellState.ZOMBIE:
+            return self.zombie_move_offsets
+        return self.human_move_offsets
+
+
+def _movement_offsets(speed):
+    """Przesuniecia kandydatow w kolejnosci petli z calculate_movement (bez (0, 0))."""
+    offsets = [(dr, dc)
+               for dr in range(-speed, speed + 1)
+               for dc in range(-speed, speed + 1)
+               if not (dr == 0 and dc == 0)]
+    dr = np.array([o[0] for o in offsets], dtype=np.int64)
+    dc = np.array([o[1] for o in offsets], dtype=np.int64)
+    return _read_only(dr), _read_only(dc)
@@ -0,0 +1,178 @@
+# population.py
+"""
+Wektorowe rozmieszczanie duzych populacji startowych.
+
+populate() obsadza puste pola istniejacej siatki (np. Grid(w, h, 0, 0, mapa)):
+    - ludzi z wagami: mapa gestosci (raster populacji dopasowany do mapy,
+      przeskalowany do siatki) razy waga typu terenu,
+    - ogniska Zombie (Outbreak) rozrzucone normalnie wokol zadanych punktow,
+    - dodatkowych Zombie z wagami terenu.
+Losowanie bez zwracania odbywa sie naraz dla wszystkich agentow (klucze
+wykladnicze E / waga, k najmniejszych przez argpartition), wiec miliony
+agentow rozmieszczane sa w czasie rzedu jednego przejscia po mapie.
+Wynik zalezy tylko od ziarna (np.random.Generator), nie od modulu random.
+"""
+import cv2
+import numpy as np
+
+from config import CellState
+from grid import BLOCKED_TERRAIN_VALUES
+
+# Ile razy ognisko losuje brakujace pozycje (z coraz wiekszym promieniem)
+OUTBREAK_ROUNDS = 8
+OUTBREAK_RADIUS_GROWTH = 1.5
+
+
+class Outbreak:
+    """Ognisko: `zombies` Zombie wokol (row, col), odchylenie standardowe radius [komorki]."""
+    def __init__(self, row, col, zombies, radius=3.0):
+        self.row = row
+        self.col = col
+        self.zombies = zombies
+        self.radius = radius
+
+    def __repr__(self):
+        return f"Outbreak({self.row}, {self.col}, {self.zombies}, radius={self.radius})"
+
+
+def terrain_weight_lut(terrain_weights=None):
+    """
+    Waga kazdej wartosci terenu (tablica 256): domyslnie 1, woda i budynki zawsze 0.
+    terrain_weights - slownik {CellState: waga} nadpisujacy wartosci domyslne.
+    """
+    lut = np.ones(256, dtype=np.float64)
+    for state, weight in (terrain_weights or {}).items():
+        if weight < 0:
+            raise ValueError(f"Ujemna waga terenu {state.name}: {weight}")
+        lut[state.value] = weight
+    lut[BLOCKED_TERRAIN_VALUES] = 0.0
+    return lut
+
+
+def resample_density(density, width, height):
+    """Mapa gestosci jako float64 (H x W); inna rozdzielczosc jest usredniana do siatki."""
+    density = np.asarray(density, dtype=np.float64)
+    if density.ndim != 2:
+        raise ValueError(f"Mapa gestosci musi byc dwuwymiarowa, ma wymiary {density.shape}")
+    if (density < 0).any():
+        raise ValueError("Mapa gestosci zawiera ujemne wartosci")
+    if density.shape != (height, width):
+        density = cv2.resize(density, (width, height), interpolation=cv2.INTER_AREA)
+    return density
+
+
+def crop_density(density, origin, height, width, map_shape):
+    """
+    Fragment rastra gestosci pokrywajacy obszar height x width od origin
+    mapy o wymiarach map_shape (wiersze, kolumny) - raster obejmuje cala mape
+    i moze miec inna rozdzielczosc niz ona.
+    """
+    scale_r = density.shape[0] / map_shape[0]
+    scale_c = density.shape[1] / map_shape[1]
+    r0 = int(np.floor(origin[0] * scale_r))
+    c0 = int(np.floor(origin[1] * scale_c))
+    r1 = max(int(np.ceil((origin[0] + height) * scale_r)), r0 + 1)
+    c1 = max(int(np.ceil((origin[1] + width) * scale_c)), c0 + 1)
+    return density[r0:r1, c0:c1]
+
+
+def load_density_raster(path, width, height, origin=(0, 0), map_shape=None):
+    """
+    Raster populacji z obrazu (jasnosc = gestosc), przeskalowany do siatki.
+    map_shape - wymiary mapy, gdy siatka to fragment od origin (magazyn terenu,
+    terrain_store.py); raster jest wtedy najpierw przycinany do tego fragmentu.
+    """
+    img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        raise FileNotFoundError(f"Nie można wczytać obrazu: {path}")
+    if map_shape is not None:
+        img = crop_density(img, origin, height, width, map_shape)
+    return resample_density(img, width, height)
+
+
+def placement_weights(grid, density=None, terrain_weights=None):
+    """Wagi rozmieszczenia komorek siatki; zajete pola i teren zablokowany maja wage 0."""
+    weights = terrain_weight_lut(terrain_weights)[grid.terrain]
+    if density is not None:
+        weights *= resample_density(density, grid.width, grid.height)
+    weights[grid.state != CellState.GROUND.value] = 0.0
+    return weights
+
+
+def sample_cells(weights, count, rng):
+    """
+    `count` roznych komorek (indeksy plaskie) losowanych bez zwracania
+    z prawdopodobienstwem proporcjonalnym do wag. Gdy komorek z dodatnia
+    waga jest mniej, zwracane sa wszystkie.
+    """
+    flat = weights.reshape(-1)
+    candidates = np.flatnonzero(flat > 0)
+    count = min(count, candidates.size)
+    if count <= 0:
+        return np.empty(0, dtype=np.int64)
+    keys = rng.exponential(size=candidates.size) / flat[candidates]
+    if count == candidates.size:
+        return candidates[np.argsort(keys)]
+    return candidates[np.argpartition(keys, count - 1)[:count]]
+
+
+def outbreak_cells(available, outbreak, rng):
+    """
+    Pozycje Zombie ogniska: rozklad normalny wokol srodka na torusie, tylko
+    pola z maski available (aktualizowanej w miejscu). Brakujace pozycje sa
+    losowane ponownie z wiekszym promieniem.
+    """
+    height, width = available.shape
+    flat_available = available.reshape(-1)
+    needed = outbreak.zombies
+    radius = outbreak.radius
+    chosen = []
+    for _ in range(OUTBREAK_ROUNDS):
+        if needed <= 0:
+            break
+        draws = 2 * needed + 16
+        rows = np.rint(rng.normal(outbreak.row, radius, draws)).astype(np.int64) % height
+        cols = np.rint(rng.normal(outbreak.col, radius, draws)).astype(np.int64) % width
+        cells = rows * width + cols
+        cells = cells[flat_available[cells]]
+        # Pierwsze wystapienie kazdej komorki, w kolejnosci losowania
+        _, first = np.unique(cells, return_index=True)
+        cells = cells[np.sort(first)][:needed]
+        flat_available[cells] = False
+        chosen.append(cells)
+        needed -= cells.size
+        radius *= OUTBREAK_RADIUS_GROWTH
+    return np.concatenate(chosen) if chosen else np.empty(0, dtype=np.int64)
+
+
+def populate(grid, humans=0, zombies=0, seed=None, density=None, terrain_weights=None, outbreaks=(), rng=None):
+    """
+    Rozmieszcza agentow na pustych polach siatki (w miejscu).
+    humans - liczba ludzi (wagi: density x terrain_weights),
+    zombies - liczba Zombie poza ogniskami (wagi: terrain_weights),
+    outbreaks - ogniska Outbreak, obsadzane jako pierwsze,
+    seed / rng - ziarno albo gotowy np.random.Generator.
+    Zwraca slownik {CellState: liczba rozmieszczonych} (mniej, gdy brakuje miejsca).
+    """
+    rng = rng if rng is not None else np.random.default_rng(seed)
+    flat_state = grid.state.reshape(-1)
+
+    base = placement_weights(grid, terrain_weights=terrain_weights)
+    available = base > 0
+    placed_zombies = 0
+    for outbreak in outbreaks:
+        cells = outbreak_cells(available, outbreak, rng)
+        flat_state[cells] = CellState.ZOMBIE.value
+        placed_zombies += cells.size
+
+    base[~available] = 0.0
+    cells = sample_cells(base, zombies, rng)
+    flat_state[cells] = CellState.ZOMBIE.value
+    placed_zombies += cells.size
+    base.reshape(-1)[cells] = 0.0
+
+    if density is not None:
+        base *= resample_density(density, grid.width, grid.height)
+    cells = sample_cells(base, humans, rng)
+    flat_state[cells] = CellState.HUMAN.value
+    return {CellState.HUMAN: int(cells.size), CellState.ZOMBIE: placed_zombies}
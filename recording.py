@@ -0,0 +1,215 @@
+# recording.py
+"""
+Zapis i odtwarzanie calych przebiegow symulacji.
+
+Format pliku (jeden plik, tylko dopisywanie):
+    naglowek:  FILE_HEADER (magia, wersja, W, H, co ile klatek klatka kluczowa,
+               laczna liczba zgonow w chwili pierwszej klatki - np. po wznowieniu z checkpointu)
+    klatki:    FRAME_HEADER (rodzaj, numer kroku, dlugosc danych)
+               + rekord statystyk STATS_DTYPE + dane skompresowane zlib
+
+Klatka kluczowa zawiera pelne plaszczyzny state i terrain, klatka delta -
+XOR z poprzednia klatka (rzadka siatka zmienia sie powoli, wiec XOR to
+prawie same zera i kompresuje sie do kilkudziesieciu bajtow).
+Odczyt mapuje plik do pamieci (mmap); dostep do dowolnej klatki wymaga
+najwyzej keyframe_interval - 1 delt od najblizszej klatki kluczowej.
+"""
+import mmap
+import struct
+import zlib
+
+import numpy as np
+
+from stats import STATS_DTYPE, COUNT_FIELDS, COUNT_STATES
+
+FILE_MAGIC = b"ZCAREC01"
+FILE_HEADER = struct.Struct("<8sIIIIq")       # magia, wersja, szerokosc, wysokosc, keyframe_interval, zgony
+FILE_HEADER_V1 = struct.Struct("<8sIIII")     # wersja 1 - bez lacznej liczby zgonow
+FRAME_HEADER = struct.Struct("<BxxxqI")       # rodzaj, krok, dlugosc danych
+FORMAT_VERSION = 2
+
+KEYFRAME = 1
+DELTA = 2
+
+
+def grid_stats(step, state):
+    """Rekord STATS_DTYPE z samymi liczebnosciami stanow (bez przejsc kroku)."""
+    stats = np.zeros((), dtype=STATS_DTYPE)
+    counts = np.bincount(state.reshape(-1), minlength=len(COUNT_FIELDS))
+    for value, name in enumerate(COUNT_FIELDS):
+        stats[name] = counts[value]
+    stats["step"] = step
+    return stats
+
+
+def encode_frame(kind, step, stats, raw, compression_level=1):
+    """Klatka w formacie pliku: FRAME_HEADER + rekord statystyk + dane raw (plaszczyzny albo XOR) w zlib."""
+    payload = zlib.compress(raw.tobytes(), compression_level)
+    return FRAME_HEADER.pack(kind, step, len(payload)) + np.asarray(stats, dtype=STATS_DTYPE).tobytes() + payload
+
+
+def decode_frame(data, width, height):
+    """Odwrotnosc encode_frame: (rodzaj, krok, rekord statystyk, tablica (2, H, W))."""
+    kind, step, length = FRAME_HEADER.unpack_from(data, 0)
+    payload_start = FRAME_HEADER.size + STATS_DTYPE.itemsize
+    stats = np.frombuffer(data, dtype=STATS_DTYPE, count=1, offset=FRAME_HEADER.size)[0]
+    raw = zlib.decompress(data[payload_start:payload_start + length])
+    return kind, step, stats, np.frombuffer(raw, dtype=np.uint8).reshape(2, height, width)
+
+
+class TrajectoryRecorder:
+    """Dopisuje klatki przebiegu do pliku (klatka kluczowa co keyframe_interval klatek)."""
+    def __init__(self, path, width, height, keyframe_interval=100, compression_level=1):
+        if keyframe_interval < 1:
+            raise ValueError("keyframe_interval musi byc dodatni")
+        self.path = path
+        self.width = width
+        self.height = height
+        self.keyframe_interval = keyframe_interval
+        self.compression_level = compression_level
+        self.frames = 0
+        self._previous = None
+        self._file = open(path, "wb")
+        self._write_header(0)
+
+    def _write_header(self, total_deaths):
+        position = self._file.tell()
+        self._file.seek(0)
+        self._file.write(FILE_HEADER.pack(FILE_MAGIC, FORMAT_VERSION, self.width, self.height,
+                                          self.keyframe_interval, total_deaths))
+        self._file.seek(max(position, FILE_HEADER.size))
+
+    def record(self, step, grid, stats=None):
+        """
+        Zapisuje stan siatki po kroku `step`. stats - rekord STATS_DTYPE
+        (np. engine.last_stats); bez niego zapisywane sa same liczebnosci stanow.
+        """
+        planes = np.stack((grid.state, grid.terrain))
+        if stats is None:
+            stats = grid_stats(step, grid.state)
+
+        if self._previous is None or self.frames % self.keyframe_interval == 0:
+            kind, raw = KEYFRAME, planes
+        else:
+            kind, raw = DELTA, np.bitwise_xor(planes, self._previous)
+        self._file.write(encode_frame(kind, step, stats, raw, self.compression_level))
+        self._previous = planes
+        self.frames += 1
+
+    def record_engine(self, engine):
+        """Zapis biezacego stanu silnika (SimulationEngine) razem z jego statystykami."""
+        stats = engine.last_stats if engine.step_count > 0 else None
+        if self.frames == 0 and engine.total_deaths:
+            # Przebieg wznowiony - zgony sprzed pierwszej klatki nie sa w statystykach nagrania
+            self._write_header(engine.total_deaths)
+        self.record(engine.step_count, engine.grid, stats)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TrajectoryReader:
+    """
+    Odczyt nagrania przez mmap. Przy otwarciu czytane sa tylko naglowki klatek
+    (indeks przesuniec i statystyki); dane klatek dekodowane sa na zadanie.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, width, height, keyframe_interval = FILE_HEADER_V1.unpack_from(self._map, 0)
+        if magic != FILE_MAGIC or version not in (1, FORMAT_VERSION):
+            raise ValueError(f"Nieobslugiwany plik nagrania: {path}")
+        if version == 1:
+            header_size, start_total_deaths = FILE_HEADER_V1.size, None
+        else:
+            header_size, start_total_deaths = FILE_HEADER.size, FILE_HEADER.unpack_from(self._map, 0)[-1]
+        self.width = width
+        self.height = height
+        self.keyframe_interval = keyframe_interval
+        self._build_index(header_size, start_total_deaths)
+        self._cache_index = None
+        self._cache_planes = None
+
+    def _build_index(self, header_size, start_total_deaths):
+        offsets, lengths, kinds, steps, stats = [], [], [], [], []
+        position = header_size
+        end = len(self._map)
+        record_size = STATS_DTYPE.itemsize
+        while position + FRAME_HEADER.size + record_size <= end:
+            kind, step, length = FRAME_HEADER.unpack_from(self._map, position)
+            payload_start = position + FRAME_HEADER.size + record_size
+            if payload_start + length > end:
+                break  # niedokonczona klatka na koncu pliku (przerwany zapis)
+            offsets.append(payload_start)
+            lengths.append(length)
+            kinds.append(kind)
+            steps.append(step)
+            stats.append(self._map[position + FRAME_HEADER.size:payload_start])
+            position = payload_start + length
+        self._offsets = np.array(offsets, dtype=np.int64)
+        self._lengths = np.array(lengths, dtype=np.int64)
+        self._kinds = np.array(kinds, dtype=np.uint8)
+        self.steps = np.array(steps, dtype=np.int64)
+        self.stats = np.frombuffer(b"".join(stats), dtype=STATS_DTYPE)
+        # Laczna liczba zgonow od poczatku przebiegu; zgony kroku pierwszej klatki
+        # sa juz w start_total_deaths (wersja 1 - przebieg nagrywany od kroku 0)
+        self.total_deaths = np.cumsum(self.stats["deaths"])
+        if start_total_deaths is not None and self.total_deaths.size:
+            self.total_deaths += start_total_deaths - self.total_deaths[0]
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def _decode(self, index):
+        start = self._offsets[index]
+        raw = zlib.decompress(self._map[start:start + self._lengths[index]])
+        return np.frombuffer(raw, dtype=np.uint8).reshape(2, self.height, self.width)
+
+    def frame(self, index):
+        """Plaszczyzny (state, terrain) klatki o numerze index."""
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        # Ruch o jedna klatke do przodu korzysta z poprzedniego wyniku
+        if self._cache_index is not None and self._cache_index == index - 1 and self._kinds[index] == DELTA:
+            planes = np.bitwise_xor(self._cache_planes, self._decode(index))
+        else:
+            key = index
+            while self._kinds[key] != KEYFRAME:
+                key -= 1
+            planes = self._decode(key).copy()
+            for delta in range(key + 1, index + 1):
+                np.bitwise_xor(planes, self._decode(delta), out=planes)
+        self._cache_index = index
+        self._cache_planes = planes
+        return planes[0], planes[1]
+
+    def counts_by_state(self, index):
+        """Liczebnosci stanow w klatce jako slownik {CellState: liczba} (jak SimulationEngine)."""
+        record = self.stats[index]
+        return {state: int(record[name]) for state, name in zip(COUNT_STATES, COUNT_FIELDS)}
+
+    def index_of_step(self, step):
+        """Numer klatki dla kroku `step` (ostatnia klatka nie pozniejsza niz step)."""
+        return max(0, int(np.searchsorted(self.steps, step, side="right")) - 1)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,125 @@
+# renderer.py
+import time
+import tkinter as tk
+
+import numpy as np
+
+from config import CellState, COLORS
+
+PALETTE_SIZE = 256
+
+
+def _hex_to_rgb(color):
+    color = color.lstrip("#")
+    return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def build_palette(colors=COLORS):
+    """Tablica (256, 3) uint8: kolor RGB dla wartosci CellState (nieznane -> kolor GROUND)."""
+    palette = np.empty((PALETTE_SIZE, 3), dtype=np.uint8)
+    palette[:] = _hex_to_rgb(colors[CellState.GROUND])
+    for state, color in colors.items():
+        palette[state.value] = _hex_to_rgb(color)
+    return palette
+
+
+def color_index(grid):
+    """
+    Obraz indeksow palety (H x W, uint8) - tak jak w dawnym draw():
+    agent/stan dynamiczny przykrywa teren, wolne pole pokazuje teren.
+    """
+    return np.where(grid.state != CellState.GROUND.value, grid.state, grid.terrain)
+
+
+def ppm_bytes(rgb):
+    """Binarny PPM (P6) z obrazu RGB (H x W x 3, uint8) - format czytany przez tk.PhotoImage."""
+    height, width = rgb.shape[:2]
+    header = f"P6 {width} {height} 255 ".encode("ascii")
+    return header + np.ascontiguousarray(rgb).tobytes()
+
+
+def rasterize(palette, index, cell_size):
+    """Obraz RGB (indeksy -> kolory palety, kazda komorka cell_size x cell_size pikseli)."""
+    rgb = palette[index]
+    if cell_size != 1:
+        rgb = np.repeat(np.repeat(rgb, cell_size, axis=0), cell_size, axis=1)
+    return rgb
+
+
+class GridRenderer:
+    """
+    Renderer rastrowy: cala siatka jako jeden przeskalowany PhotoImage na Canvas
+    zamiast osobnego prostokata na kazda komorke.
+    Gdy zmienilo sie niewiele komorek, aktualizowane sa tylko brudne kafelki
+    (tile x tile komorek); przy wielu zmianach obraz jest wysylany w calosci.
+    """
+    def __init__(self, canvas, width, height, cell_size, colors=COLORS, tile=16,
+                 full_redraw_fraction=0.25, fps_window=30):
+        self.canvas = canvas
+        self.width = width
+        self.height = height
+        self.cell_size = cell_size
+        self.tile = tile
+        self.full_redraw_fraction = full_redraw_fraction
+        self.palette = build_palette(colors)
+
+        self.image = tk.PhotoImage(width=width * cell_size, height=height * cell_size)
+        self.image_item = canvas.create_image(0, 0, image=self.image, anchor="nw")
+        self._last_index = None
+
+        self._frame_times = []
+        self._fps_window = fps_window
+        self.last_dirty_tiles = 0
+
+    @property
+    def fps(self):
+        """Srednia liczba klatek na sekunde z ostatnich fps_window klatek."""
+        if len(self._frame_times) < 2:
+            return 0.0
+        elapsed = self._frame_times[-1] - self._frame_times[0]
+        return (len(self._frame_times) - 1) / elapsed if elapsed > 0 else 0.0
+
+    def render_rgb(self, index):
+        """Obraz RGB w rozdzielczosci ekranu dla obrazu indeksow (lub jego wycinka)."""
+        return rasterize(self.palette, index, self.cell_size)
+
+    def _put(self, index, row, col):
+        """Wysyla wycinek obrazu indeksow (od komorki row, col) do PhotoImage."""
+        data = ppm_bytes(self.render_rgb(index))
+        cs = self.cell_size
+        self.image.tk.call(self.image.name, "put", data, "-format", "ppm",
+                           "-to", col * cs, row * cs)
+
+    def invalidate(self):
+        """Wymusza pelne przerysowanie przy nastepnym draw()."""
+        self._last_index = None
+
+    def draw(self, grid):
+        index = color_index(grid)
+        previous = self._last_index
+        self._last_index = index
+
+        if previous is None:
+            self._put(index, 0, 0)
+            self.last_dirty_tiles = -1
+        else:
+            t = self.tile
+            tiles_h = -(-self.height // t)
+            tiles_w = -(-self.width // t)
+            changed = index != previous
+            padded = np.zeros((tiles_h * t, tiles_w * t), dtype=bool)
+            padded[:self.height, :self.width] = changed
+            dirty = padded.reshape(tiles_h, t, tiles_w, t).any(axis=(1, 3))
+            dirty_count = int(np.count_nonzero(dirty))
+            self.last_dirty_tiles = dirty_count
+
+            if dirty_count > self.full_redraw_fraction * dirty.size:
+                self._put(index, 0, 0)
+            else:
+                for tile_r, tile_c in zip(*np.nonzero(dirty)):
+                    r0, c0 = tile_r * t, tile_c * t
+                    self._put(index[r0:r0 + t, c0:c0 + t], r0, c0)
+
+        self._frame_times.append(time.perf_counter())
+        if len(self._frame_times) > self._fps_window:
+            del self._frame_times[0]
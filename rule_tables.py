@@ -0,0 +1,346 @@
+# rule_tables.py
+"""
+Deklaratywne reguly przejsc kompilowane do tablic przejsc (LUT).
+
+Model to RuleSet z dwoch rodzajow regul:
+    Rule  - przejscie zalezne od stanu komorki, liczby sasiadow Zombie
+            (Moore, 0..8), terenu pod komorka i prawdopodobienstwa;
+            reguly dla tego samego stanu sprawdzane sa po kolei jak if/elif,
+    Timer - przejscie po uplywie licznika (incubation_counter albo
+            compost_counter), opcjonalnie ze zmiana terenu.
+Wartosci liczbowe moga byc nazwami pol SimulationParams (np. "infection_probability"),
+wiec zmiana parametrow w trakcie przebiegu dziala jak dotad.
+
+RuleSet.compile(params) buduje tablice indeksowane kluczem
+(stan, liczba sasiadow Zombie, teren); RuleTable.apply() stosuje je do calej
+siatki jednym wektorowym przejsciem. Dodanie reguly nie zmienia kosztu kroku.
+
+Dozwolone sa tylko przejscia ze statystyk (EVENT_TRANSITIONS), bo z nich
+silnik aktualizuje liczebnosci stanow. Warianty modelu mozna trzymac w plikach
+JSON (load_rule_set, RuleSet.to_dict):
+
+    {"rules": [{"state": "HUMAN", "to": "DEAD", "min_neighbors": 3, "terrain": ["STREET"]}, ...],
+     "timers": [{"state": "INFECTED", "to": "ZOMBIE", "counter": "incubation_counter",
+                 "duration": "incubation_time", "countdown": true}, ...]}
+"""
+import json
+
+import numpy as np
+
+from config import CellState
+from params import MAX_NEIGHBORS, TERRAIN_LUT_SIZE
+from rules import count_zombie_neighbors
+
+NEIGHBOR_COUNTS = MAX_NEIGHBORS + 1
+TIMER_COUNTERS = ("incubation_counter", "compost_counter")
+# Przejscie -> nazwa licznika w statystykach kroku
+EVENT_TRANSITIONS = {
+    (CellState.HUMAN, CellState.DEAD): "deaths",
+    (CellState.HUMAN, CellState.INFECTED): "infections",
+    (CellState.INFECTED, CellState.ZOMBIE): "turnings",
+    (CellState.DEAD, CellState.GROUND): "composts",
+}
+EVENTS = tuple(EVENT_TRANSITIONS.values())
+
+
+def _resolve(value, params):
+    """Wartosc reguly: liczba/lista albo nazwa pola SimulationParams."""
+    if isinstance(value, str):
+        return getattr(params, value)
+    return value
+
+
+def _event(state, to):
+    event = EVENT_TRANSITIONS.get((state, to))
+    if event is None:
+        raise ValueError(f"Nieobslugiwane przejscie {state.name} -> {to.name}")
+    return EVENTS.index(event)
+
+
+def _state_names(states):
+    return [state.name for state in states]
+
+
+class Rule:
+    """
+    Przejscie state -> to, gdy liczba sasiadow Zombie nalezy do neighbors
+    i jest >= min_neighbors, a teren komorki nalezy do terrain (None - dowolny).
+    probability None - przejscie pewne (bez losowania); liczba albo nazwa
+    parametru - losowanie (jedno na komorke, wspolne dla kolejnych regul stanu).
+    """
+    def __init__(self, state, to, neighbors=None, min_neighbors=None, terrain=None, probability=None):
+        self.state = state
+        self.to = to
+        self.neighbors = neighbors
+        self.min_neighbors = min_neighbors
+        self.terrain = None if terrain is None else tuple(terrain)
+        self.probability = probability
+        self.event = _event(state, to)
+
+    def __repr__(self):
+        return (f"Rule({self.state.name} -> {self.to.name}, neighbors={self.neighbors}, "
+                f"min_neighbors={self.min_neighbors}, terrain={self.terrain}, probability={self.probability})")
+
+    def neighbor_mask(self, params):
+        mask = np.ones(NEIGHBOR_COUNTS, dtype=bool)
+        neighbors = _resolve(self.neighbors, params)
+        if neighbors is not None:
+            mask[:] = False
+            for count in neighbors:
+                if 0 <= count <= MAX_NEIGHBORS:
+                    mask[count] = True
+        min_neighbors = _resolve(self.min_neighbors, params)
+        if min_neighbors is not None:
+            mask[:max(min_neighbors, 0)] = False
+        return mask
+
+    def terrain_mask(self):
+        if self.terrain is None:
+            return np.ones(TERRAIN_LUT_SIZE, dtype=bool)
+        mask = np.zeros(TERRAIN_LUT_SIZE, dtype=bool)
+        mask[[terrain.value for terrain in self.terrain]] = True
+        return mask
+
+    def to_dict(self):
+        data = {"state": self.state.name, "to": self.to.name}
+        for name in ("neighbors", "min_neighbors", "probability"):
+            value = getattr(self, name)
+            if value is not None:
+                data[name] = value if isinstance(value, (str, int, float)) else list(value)
+        if self.terrain is not None:
+            data["terrain"] = _state_names(self.terrain)
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        state = CellState[data.pop("state")]
+        to = CellState[data.pop("to")]
+        if "terrain" in data:
+            data["terrain"] = [CellState[name] for name in data["terrain"]]
+        return cls(state, to, **data)
+
+
+class Timer:
+    """
+    Przejscie state -> to po `duration` krokach w stanie state, liczonych
+    w liczniku siatki `counter`. countdown=True - licznik ustawiany na duration
+    przy wejsciu w stan i zmniejszany (przejscie przy <= 0); inaczej liczony
+    od 0 w gore (przejscie przy >= duration). terrain - nowy teren komorki
+    po przejsciu (None - bez zmiany).
+    """
+    def __init__(self, state, to, counter, duration, countdown=False, terrain=None):
+        if counter not in TIMER_COUNTERS:
+            raise ValueError(f"Nieznany licznik {counter!r} (dozwolone: {', '.join(TIMER_COUNTERS)})")
+        self.state = state
+        self.to = to
+        self.counter = counter
+        self.duration = duration
+        self.countdown = countdown
+        self.terrain = terrain
+        self.event = _event(state, to)
+
+    def __repr__(self):
+        return (f"Timer({self.state.name} -> {self.to.name}, {self.counter}, duration={self.duration}, "
+                f"countdown={self.countdown}, terrain={self.terrain})")
+
+    def to_dict(self):
+        data = {"state": self.state.name, "to": self.to.name, "counter": self.counter,
+                "duration": self.duration, "countdown": self.countdown}
+        if self.terrain is not None:
+            data["terrain"] = self.terrain.name
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        state = CellState[data.pop("state")]
+        to = CellState[data.pop("to")]
+        if "terrain" in data:
+            data["terrain"] = CellState[data["terrain"]]
+        return cls(state, to, **data)
+
+
+class RuleSet:
+    """Zestaw regul modelu; compile(params) zwraca (i pamieta) tablice dla danych parametrow."""
+    def __init__(self, rules=(), timers=()):
+        self.rules = tuple(rules)
+        self.timers = tuple(timers)
+        states = [timer.state for timer in self.timers]
+        if len(set(states)) != len(states):
+            raise ValueError("Stan moze miec co najwyzej jeden licznik czasu")
+        self._compiled = None
+
+    def __repr__(self):
+        return f"RuleSet(rules={list(self.rules)}, timers={list(self.timers)})"
+
+    def compile(self, params):
+        compiled = self._compiled
+        if compiled is None or compiled[0] is not params:
+            compiled = (params, RuleTable(self, params))
+            self._compiled = compiled
+        return compiled[1]
+
+    def to_dict(self):
+        return {"rules": [rule.to_dict() for rule in self.rules],
+                "timers": [timer.to_dict() for timer in self.timers]}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls([Rule.from_dict(rule) for rule in data.get("rules", ())],
+                   [Timer.from_dict(timer) for timer in data.get("timers", ())])
+
+
+def load_rule_set(path):
+    """RuleSet z pliku JSON (format RuleSet.to_dict)."""
+    with open(path, encoding="utf-8") as f:
+        return RuleSet.from_dict(json.load(f))
+
+
+class RuleTable:
+    """
+    Reguly skompilowane dla konkretnych SimulationParams.
+    Klucz komorki: (stan * NEIGHBOR_COUNTS + sasiedzi Zombie) * TERRAIN_LUT_SIZE + teren.
+    Dla klucza: depth - liczba regul, random - czy komorka losuje,
+    threshold[:, k] - prog losowania k-tej reguly (u < prog), to/event - jej wynik.
+    """
+    def __init__(self, rule_set, params):
+        rules = rule_set.rules
+        state_count = max((rule.state.value for rule in rules), default=-1) + 1
+        keys = state_count * NEIGHBOR_COUNTS * TERRAIN_LUT_SIZE
+        shape = (state_count, NEIGHBOR_COUNTS, TERRAIN_LUT_SIZE)
+
+        self.rule_states = np.zeros(TERRAIN_LUT_SIZE, dtype=bool)
+        depth = np.zeros(keys, dtype=np.intp)
+        random = np.zeros(keys, dtype=bool)
+        # Prawdopodobienstwo, ze zadna wczesniejsza regula klucza nie zadzialala
+        cumulative = np.zeros(keys, dtype=np.float64)
+        slots = []
+        for rule in rules:
+            match = np.zeros(shape, dtype=bool)
+            match[rule.state.value] = rule.neighbor_mask(params)[:, None] & rule.terrain_mask()[None, :]
+            # Klucze zamkniete przez wczesniejsza regule pewna sa pomijane
+            match = match.reshape(-1) & (cumulative < 1.0)
+            if not match.any():
+                continue
+            self.rule_states[rule.state.value] = True
+            probability = _resolve(rule.probability, params)
+            if probability is None:
+                new_cumulative = np.ones(keys)
+            else:
+                random |= match
+                new_cumulative = cumulative + (1.0 - cumulative) * min(max(float(probability), 0.0), 1.0)
+            slot = depth[match]
+            slots.append((np.flatnonzero(match), slot, new_cumulative[match], rule))
+            cumulative[match] = new_cumulative[match]
+            depth[match] += 1
+
+        self.rule_state_values = np.flatnonzero(self.rule_states).tolist()
+        width = max(int(depth.max(initial=0)), 1)
+        self.depth = depth
+        self.random = random
+        self.threshold = np.full((keys, width), -1.0)
+        self.to = np.zeros((keys, width), dtype=np.uint8)
+        self.event = np.zeros((keys, width), dtype=np.intp)
+        for key, slot, threshold, rule in slots:
+            self.threshold[key, slot] = threshold
+            self.to[key, slot] = rule.to.value
+            self.event[key, slot] = rule.event
+
+        self.timers = [(timer, int(_resolve(timer.duration, params))) for timer in rule_set.timers]
+        self.entry_counters = [(timer.state.value, timer.counter, duration)
+                               for timer, duration in self.timers if timer.countdown]
+
+    def apply(self, current_grid, next_grid, rng, terrain_field=None):
+        """
+        Reguly dla calej siatki: czyta current_grid, zapisuje do next_grid
+        (kopii current_grid). Losowania (rng.random) - jedno na komorke
+        z kluczem losujacym, w kolejnosci wierszowej.
+        Zwraca slownik liczby przejsc w kroku (EVENTS).
+        """
+        state = current_grid.state
+        flat_state = state.reshape(-1)
+        events = np.zeros(len(EVENTS), dtype=np.int64)
+        changed = np.zeros(flat_state.size, dtype=bool)
+        new_cells = []
+
+        # --- Reguly sasiedztwa ---
+        # Porownania ze stanami regul sa szybsze niz indeksowanie LUT calej siatki
+        has_rules = np.zeros(flat_state.size, dtype=bool)
+        for state_value in self.rule_state_values:
+            has_rules |= flat_state == state_value
+        cells = np.flatnonzero(has_rules)
+        if cells.size:
+            neighbors = count_zombie_neighbors(state).reshape(-1)[cells]
+            keys = ((flat_state[cells].astype(np.intp) * NEIGHBOR_COUNTS + neighbors)
+                    * TERRAIN_LUT_SIZE + current_grid.terrain.reshape(-1)[cells])
+            matched = self.depth[keys] > 0
+            cells = cells[matched]
+            keys = keys[matched]
+            draws = np.zeros(cells.size)
+            random = self.random[keys]
+            draws[random] = rng.random(int(np.count_nonzero(random)))
+            if self.threshold.shape[1] == 1:
+                hit = draws < self.threshold[:, 0][keys]
+                slot = np.zeros(cells.size, dtype=np.intp)
+            else:
+                fired = draws[:, None] < self.threshold[keys]
+                slot = fired.argmax(axis=1)
+                hit = fired[np.arange(cells.size), slot]
+            cells = cells[hit]
+            keys = keys[hit]
+            slot = slot[hit]
+            next_grid.state.reshape(-1)[cells] = self.to[keys, slot]
+            events += np.bincount(self.event[keys, slot], minlength=len(EVENTS))
+            changed[cells] = True
+            new_cells.append(cells)
+
+        # --- Liczniki czasu ---
+        changed = changed.reshape(state.shape)
+        for timer, duration in self.timers:
+            in_state = (state == timer.state.value) & ~changed
+            counter = getattr(current_grid, timer.counter)
+            if timer.countdown:
+                counter = counter - 1
+                fires = in_state & (counter <= 0)
+            else:
+                counter = counter + 1
+                fires = in_state & (counter >= duration)
+            getattr(next_grid, timer.counter)[in_state] = counter[in_state]
+            next_grid.state[fires] = timer.to.value
+            fired_count = int(np.count_nonzero(fires))
+            events[timer.event] += fired_count
+            if timer.terrain is not None and fired_count:
+                next_grid.terrain[fires] = timer.terrain.value
+                if terrain_field is not None:
+                    terrain_field.invalidate_mask(fires)
+            new_cells.append(np.flatnonzero(fires))
+
+        # Wejscie w nowy stan: liczniki od zera, odliczanie od pelnego czasu
+        if new_cells:
+            cells = np.concatenate(new_cells)
+            next_grid.incubation_counter.reshape(-1)[cells] = 0
+            next_grid.compost_counter.reshape(-1)[cells] = 0
+            entered = next_grid.state.reshape(-1)[cells]
+            for state_value, counter, duration in self.entry_counters:
+                getattr(next_grid, counter).reshape(-1)[cells[entered == state_value]] = duration
+
+        return dict(zip(EVENTS, events.tolist()))
+
+
+DEFAULT_RULES = RuleSet(
+    rules=[
+        Rule(CellState.HUMAN, CellState.DEAD, min_neighbors="zombie_death_threshold"),
+        Rule(CellState.HUMAN, CellState.INFECTED, neighbors="zombie_infection_range",
+             probability="infection_probability"),
+    ],
+    timers=[
+        Timer(CellState.INFECTED, CellState.ZOMBIE, "incubation_counter", "incubation_time", countdown=True),
+        Timer(CellState.DEAD, CellState.GROUND, "compost_counter", "compost_time", terrain=CellState.GROUND),
+    ],
+)
+
+
+def is_default_rules(rules):
+    """Czy zestaw regul (albo None) opisuje model domyslny - takze wczytany z pliku."""
+    return rules is None or rules is DEFAULT_RULES or rules.to_dict() == DEFAULT_RULES.to_dict()
@@ -1,25 +1,22 @@
 # rules.py
 import random
-from config import (
-    CellState,
-    INCUBATION_TIME,
-    COMPOST_TIME,
-    INFECTION_PROBABILITY,
-    ZOMBIE_INFECTION_RANGE,
-    ZOMBIE_DEATH_THRESHOLD,
-    BASE_HUMAN_SPEED,
-    BASE_ZOMBIE_SPEED,
-    MOVEMENT_MODIFIERS,
-    WIND_VECTOR,
-    WIND_STRENGTH,
-    NOISE_STRENGTH,
-)
-
-def apply_infection_and_time_rules(current_cell, neighbors):
+import numpy as np
+from config import CellState
+from distance_field import NearestTargetField
+from params import SimulationParams
+
+# Klasy celow: Zombie gonia ludzi i zarazonych, ludzie uciekaja od Zombie
+ZOMBIE_TARGET_STATES = [CellState.HUMAN, CellState.INFECTED]
+HUMAN_TARGET_STATES = [CellState.ZOMBIE]
+
+def apply_infection_and_time_rules(current_cell, neighbors, params=None):
     """
     Oblicza nowy stan dla komorki na podstawie stanu wlasnego i sasiadow
     (reguly infekcji, smierci, inkubacji i kompostowania).
+    params - SimulationParams (domyslnie biezace wartosci config).
     """
+    if params is None:
+        params = SimulationParams.from_config()
     new_state = current_cell.state
     new_local_vars = current_cell.local_vars.copy()
 
@@ -30,19 +27,19 @@ def apply_infection_and_time_rules(current_cell, neighbors):
     # --- CZLOWIEK ---
     if current_cell.state == CellState.HUMAN:
 
-        if zombie_neighbors_count >= ZOMBIE_DEATH_THRESHOLD:
+        if zombie_neighbors_count >= params.zombie_death_threshold:
             new_state = CellState.DEAD
             new_local_vars = {"compost_counter": 0}
 
-        elif zombie_neighbors_count in ZOMBIE_INFECTION_RANGE:
-            if random.random() < INFECTION_PROBABILITY:
+        elif zombie_neighbors_count in params.zombie_infection_range:
+            if random.random() < params.infection_probability:
                 new_state = CellState.INFECTED
-                new_local_vars = {"incubation_counter": INCUBATION_TIME}
+                new_local_vars = {"incubation_counter": params.incubation_time}
 
     # --- ZARAZONY ---
     elif current_cell.state == CellState.INFECTED:
         counter = new_local_vars.get(
-            "incubation_counter", INCUBATION_TIME
+            "incubation_counter", params.incubation_time
         )
         counter -= 1
         new_local_vars["incubation_counter"] = counter
@@ -57,33 +54,66 @@ def apply_infection_and_time_rules(current_cell, neighbors):
         counter += 1
         new_local_vars["compost_counter"] = counter
 
-        if counter >= COMPOST_TIME:
+        if counter >= params.compost_time:
             new_state = CellState.GROUND
             new_local_vars = {}
 
     return new_state, new_local_vars
 
 
-def calculate_movement(grid, r, c):
+def count_zombie_neighbors(state):
+    """
+    Zwraca tablice (H x W) z liczba sasiadow Zombie (sasiedztwo Moore'a, torus)
+    dla kazdej komorki. Suma 3x3 liczona separowalnie przesunieciami np.roll.
+    """
+    zombies = (state == CellState.ZOMBIE.value).astype(np.uint8)
+    rows = zombies + np.roll(zombies, 1, axis=0) + np.roll(zombies, -1, axis=0)
+    block = rows + np.roll(rows, 1, axis=1) + np.roll(rows, -1, axis=1)
+    return block - zombies
+
+
+def build_target_fields(grid, search_range=None):
+    """Buduje pola najblizszych celow dla obu klas agentow (raz na krok)."""
+    return {
+        CellState.ZOMBIE: NearestTargetField(grid.state, ZOMBIE_TARGET_STATES, search_range),
+        CellState.HUMAN: NearestTargetField(grid.state, HUMAN_TARGET_STATES, search_range),
+    }
+
+
+def calculate_movement(grid, r, c, target_fields=None, params=None):
     """
     Oblicza optymalny ruch agenta (Czlowiek lub Zombie)
     na podstawie terenu, celu, wiatru i losowego szumu,
     zastosowujac warunek brzegowy typu torus.
+    target_fields - opcjonalny slownik {CellState: NearestTargetField}
+    z polami celow policzonymi raz na krok; bez niego cel jest
+    wyszukiwany skanowaniem calej mapy.
+    params - SimulationParams (domyslnie biezace wartosci config).
+    Wersja dla pojedynczego agenta (szum z modulu random); krok symulacji
+    uzywa wektorowego odpowiednika z movement.py.
     """
+    if params is None:
+        params = SimulationParams.from_config()
     cell = grid.cells[r][c]
 
     if cell.state == CellState.ZOMBIE:
-        base_speed = BASE_ZOMBIE_SPEED
-        target_r, target_c = grid.find_nearest_agent(
-            r, c, [CellState.HUMAN, CellState.INFECTED]
-        )
+        base_speed = params.base_zombie_speed
+        if target_fields is not None:
+            target_r, target_c = target_fields[CellState.ZOMBIE].target_of(r, c)
+        else:
+            target_r, target_c = grid.find_nearest_agent(
+                r, c, ZOMBIE_TARGET_STATES, params.search_range
+            )
         is_fleeing = False
 
     elif cell.state == CellState.HUMAN:
-        base_speed = BASE_HUMAN_SPEED
-        target_r, target_c = grid.find_nearest_agent(
-            r, c, [CellState.ZOMBIE]
-        )
+        base_speed = params.base_human_speed
+        if target_fields is not None:
+            target_r, target_c = target_fields[CellState.HUMAN].target_of(r, c)
+        else:
+            target_r, target_c = grid.find_nearest_agent(
+                r, c, HUMAN_TARGET_STATES, params.search_range
+            )
         is_fleeing = True
 
     else:
@@ -111,7 +141,7 @@ def calculate_movement(grid, r, c):
             if target_cell.state != CellState.GROUND:
                 continue
 
-            modifier = MOVEMENT_MODIFIERS.get(
+            modifier = params.movement_modifiers.get(
                 target_cell.terrain_type.value, 1.0
             )
 
@@ -125,13 +155,13 @@ def calculate_movement(grid, r, c):
 
             wind_influence = 0
             if cell.state == CellState.ZOMBIE:
-                wind_influence = WIND_STRENGTH * (
-                    dr * WIND_VECTOR[0] + dc * WIND_VECTOR[1]
+                wind_influence = params.wind_strength * (
+                    dr * params.wind_vector[0] + dc * params.wind_vector[1]
                 )
 
             # RANDOM NOISE
             noise = random.uniform(
-                -NOISE_STRENGTH, NOISE_STRENGTH
+                -params.noise_strength, params.noise_strength
             )
 
             score = (
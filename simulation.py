@@ -1,78 +1,105 @@
 # simulation.py
-from grid import Grid, Cell
-from rules import apply_infection_and_time_rules, calculate_movement
-from config import GRID_W, GRID_H, CellState
+import time
 
-def run_simulation_step(current_grid):
-    """Wykonuje jeden synchroniczny krok Automatu Komorkowego (Reguly + Ruch)."""
-    
-    # Inicjalizacja statystyk dla tego kroku
-    deaths_in_this_step = 0
-    
-    # Krok 1: Kopiowanie siatki na potrzeby obliczen
-    next_grid_states = Grid(current_grid.width, current_grid.height, 0, 0)
-    for r in range(current_grid.height):
-        for c in range(current_grid.width):
-            original_cell = current_grid.cells[r][c]
-            new_cell = Cell(original_cell.terrain_type)
-            new_cell.state = original_cell.state
-            new_cell.local_vars = original_cell.local_vars.copy()
-            next_grid_states.cells[r][c] = new_cell
+import numpy as np
+from rule_tables import DEFAULT_RULES
+from terrain_field import TerrainField
+from movement import MovementTables, target_keys, choose_destinations, resolve_collisions, apply_moves
+from config import CellState
+from params import SimulationParams
 
-    # ETAP A: ZASTOSOWANIE REGUL (Infekcja, Inkubacja, Kompost)
-    for r in range(current_grid.height):
-        for c in range(current_grid.width):
-            cell = current_grid.cells[r][c]  # Stan przed regulami
-            if cell.state != CellState.GROUND:
-                neighbors = current_grid.get_neighbors(r, c)
-                new_state, new_local_vars = apply_infection_and_time_rules(cell, neighbors)
-                
-                # Zliczenie zgonów
-                if cell.state == CellState.HUMAN and new_state == CellState.DEAD:
-                    deaths_in_this_step += 1
-                
-                cell_to_update = next_grid_states.cells[r][c]
-                cell_to_update.state = new_state
-                cell_to_update.local_vars = new_local_vars
-                
-                # Kompost -> Ziemia
-                if new_state == CellState.GROUND and cell.state == CellState.DEAD:
-                    cell_to_update.terrain_type = CellState.GROUND
+# Domyslny generator dla losowan wektorowych (infekcja)
+_default_rng = np.random.default_rng()
 
-    # Krok 2: Przygotowanie siatki na ruch (usuniecie agentow ruchomych)
-    next_grid_final = Grid(current_grid.width, current_grid.height, 0, 0)
-    for r in range(current_grid.height):
-        for c in range(current_grid.width):
-            cell_copy = next_grid_states.cells[r][c]
-            new_cell = Cell(cell_copy.terrain_type)
-            new_cell.state = cell_copy.state
-            new_cell.local_vars = cell_copy.local_vars.copy()
-            
-            if new_cell.state in [CellState.HUMAN, CellState.ZOMBIE]:
-                # Pole startowe staje się GROUND
-                new_cell.state = CellState.GROUND
-                new_cell.local_vars = {}
-            
-            next_grid_final.cells[r][c] = new_cell
+def run_simulation_step(current_grid, rng=None, params=None, metrics=None, rules=None):
+    """
+    Wykonuje jeden synchroniczny krok Automatu Komorkowego (Reguly + Ruch).
+    rng - opcjonalny np.random.Generator dla losowan infekcji.
+    params - SimulationParams; domyslnie biezace wartosci modulu config.
+    metrics - opcjonalny metrics.StepMetrics (czasy faz i liczniki operacji).
+    rules - rule_tables.RuleSet (domyslnie DEFAULT_RULES).
+    Zwraca nowa siatke; do dlugich przebiegow bez alokacji sluzy engine.SimulationEngine.
+    """
+    next_grid = current_grid.empty_like()
+    deaths_in_this_step = step_into(current_grid, next_grid, rng, params, metrics=metrics, rules=rules)
+    return next_grid, deaths_in_this_step
 
-    # ETAP B: RUCH AGENTOW
-    moves = {}
-    for r in range(current_grid.height):
-        for c in range(current_grid.width):
-            cell = next_grid_states.cells[r][c]
-            if cell.state in [CellState.HUMAN, CellState.ZOMBIE]:
-                new_r, new_c = calculate_movement(next_grid_states, r, c)
-                
-                # Rozwiazanie kolizji
-                if (new_r, new_c) not in moves:
-                    moves[(new_r, new_c)] = cell
-                else:
-                    if (r, c) not in moves:
-                        moves[(r, c)] = cell
+def step_into(current_grid, next_grid, rng=None, params=None, transitions=None, metrics=None,
+              terrain_field=None, rules=None):
+    """
+    Krok symulacji zapisywany do istniejacego bufora next_grid (te same wymiary).
+    current_grid nie jest modyfikowany (poza terenem, jesli oba bufory go wspoldziela).
+    Zwraca liczbe zgonow w tym kroku; jesli podano slownik transitions, dostaje on
+    liczby przejsc (deaths, infections, turnings, composts) i ruchow (moves).
+    Jesli podano metrics (StepMetrics), dostaje czasy faz i liczniki operacji.
+    terrain_field - TerrainField terenu next_grid utrzymywany miedzy krokami
+    (SimulationEngine, gdzie bufory wspoldziela teren); bez niego pole jest
+    liczone od nowa w kazdym kroku.
+    rules - rule_tables.RuleSet z regulami przejsc (domyslnie DEFAULT_RULES).
+    """
+    if rng is None:
+        rng = _default_rng
+    if params is None:
+        params = SimulationParams.from_config()
+    if rules is None:
+        rules = DEFAULT_RULES
+    if metrics is not None:
+        metrics.reset()
+        metrics.counts["cells"] = current_grid.width * current_grid.height
+        start = time.perf_counter()
 
-    # Zastosowanie ruchu
-    for (r, c), cell_data in moves.items():
-        next_grid_final.cells[r][c].state = cell_data.state
-        next_grid_final.cells[r][c].local_vars = cell_data.local_vars
-        
-    return next_grid_final, deaths_in_this_step
+    # Krok 1: Bufor docelowy dostaje stan biezacy (kopiowanie do prealokowanych tablic)
+    current_grid.copy_into(next_grid)
+    if metrics is not None:
+        start = metrics.lap("copy", start)
+
+    # ETAP A: ZASTOSOWANIE REGUL (Infekcja, Inkubacja, Kompost) - tablice przejsc dla calej siatki
+    rule_transitions = rules.compile(params).apply(current_grid, next_grid, rng, terrain_field)
+    deaths_in_this_step = rule_transitions["deaths"]
+    if transitions is not None:
+        transitions.update(rule_transitions)
+        transitions["moves"] = 0
+    if metrics is not None:
+        start = metrics.lap("rules", start)
+
+    # ETAP B: RUCH AGENTOW (wektorowo, siatka jako tablice (1, H, W))
+    # Ruchy liczone sa na stanie po regulach, zanim bufor zostanie zmieniony
+    state = next_grid.state[None]
+    origin = np.flatnonzero((state == CellState.HUMAN.value) | (state == CellState.ZOMBIE.value))
+    if origin.size == 0:
+        return deaths_in_this_step
+
+    # Pola celow liczone raz dla calego kroku zamiast skanowania mapy per agent
+    keys = target_keys(state, origin)
+    if metrics is not None:
+        start = metrics.lap("targets", start)
+
+    if terrain_field is None:
+        terrain_field = TerrainField(next_grid.terrain, params.terrain_modifier)
+    else:
+        terrain_field.set_modifier_lut(params.terrain_modifier)
+    destination = choose_destinations(state, terrain_field.modifier[None], origin, keys,
+                                      MovementTables([params]), rng)
+    if metrics is not None:
+        start = metrics.lap("movement", start)
+
+    # Kolizje rozstrzygane losowym kluczem priorytetu, nie kolejnoscia skanowania
+    final, lost = resolve_collisions(origin, destination, rng)
+    if metrics is not None:
+        start = metrics.lap("collisions", start)
+
+    apply_moves(state, next_grid.incubation_counter[None], next_grid.compost_counter[None], origin, final)
+
+    if transitions is not None or metrics is not None:
+        moved = int(np.count_nonzero(final != origin))
+        if transitions is not None:
+            transitions["moves"] = moved
+        if metrics is not None:
+            metrics.lap("apply", start)
+            counts = metrics.counts
+            counts["agents"] = origin.size
+            counts["target_searches"] = origin.size
+            counts["collisions"] = int(np.count_nonzero(lost & (destination != origin)))
+            counts["moves"] = moved
+
+    return deaths_in_this_step
@@ -0,0 +1,231 @@
+# sparse.py
+"""
+Silnik rzadki: krok liczony tylko na aktywnych komorkach.
+
+Aktywne sa komorki ze stanem innym niz GROUND (ludzie, zarazeni, Zombie,
+martwi z licznikiem kompostu). Ich posortowane indeksy plaskie (active)
+sa aktualizowane z przejsc kazdego kroku, wiec reguly, wybor celow i ruch
+kosztuja O(liczba agentow), a nie O(H x W). Pusta ziemia, woda i budynki
+nie sa w ogole odwiedzane; siatka jest modyfikowana w miejscu (bez kopii bufora).
+
+Przejscia ZARAZONY -> ZOMBIE i MARTWY -> ZIEMIA sa planowane w kolach czasowych
+(timers.TimerWheel) w chwili zarazenia albo smierci, wiec reguly dotykaja tylko
+ludzi i komorek, ktorych termin wypada w danym kroku - liczniki inkubacji
+i kompostu nie sa odliczane co krok. W siatce sa aktualne po sync_counters().
+
+Wynik jest identyczny z SimulationEngine przy tym samym ziarnie: losowania
+odbywaja sie w tej samej kolejnosci (wierszowej), a najblizsze cele maja te
+same klucze co pole odleglosci (distance_field.nearest_target_keys_at).
+"""
+import time
+
+import numpy as np
+
+from config import CellState
+from distance_field import nearest_target_keys_at
+from engine import SimulationEngine
+from movement import MovementTables, target_keys, choose_destinations, resolve_collisions, apply_moves
+from rule_tables import is_default_rules
+from timers import TimerWheel
+
+# Sasiedztwo Moore'a (bez srodka)
+NEIGHBOR_OFFSETS = tuple((dr, dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1) if (dr, dc) != (0, 0))
+# Wyszukiwanie celow wsrod aktywnych komorek oplaca sie, gdy agentow jest
+# mniej niz 1/SPARSE_TARGET_RATIO komorek mapy - inaczej pelne pole odleglosci
+SPARSE_TARGET_RATIO = 32
+
+
+class SparseEngine(SimulationEngine):
+    """
+    SimulationEngine liczacy krok tylko na aktywnych komorkach.
+    Po zmianie grid.state z zewnatrz nalezy wywolac resync_counts(),
+    ktore odbudowuje tez zbior aktywnych komorek i kola czasowe.
+    Reguly przejsc sa wbudowane (DEFAULT_RULES) - inny RuleSet jest odrzucany.
+    """
+    def __init__(self, grid, rng=None, params=None, history_size=4096, rules=None):
+        if not is_default_rules(rules):
+            raise ValueError("SparseEngine obsluguje tylko domyslne reguly (DEFAULT_RULES)")
+        self.incubation_timers = None
+        self.compost_timers = None
+        super().__init__(grid, rng=rng, params=params, history_size=history_size)
+        # Siatka zmieniana w miejscu - drugi bufor nie jest potrzebny
+        self._back = None
+
+    def resync_counts(self):
+        if self.incubation_timers is not None:
+            # Liczniki z kol czasowych, zanim zostana z nich odbudowane
+            self.sync_counters()
+        super().resync_counts()
+        self.active = np.flatnonzero(self.grid.state.reshape(-1) != CellState.GROUND.value)
+        self._rebuild_timers()
+
+    def _rebuild_timers(self):
+        """Planuje przejscia zarazonych i martwych z licznikow w siatce."""
+        grid = self.grid
+        active = self.active
+        values = grid.state.reshape(-1)[active]
+        infected = active[values == CellState.INFECTED.value]
+        dead = active[values == CellState.DEAD.value]
+        compost_time = self.params.compost_time
+
+        # Jak w regulach: zarazony zmienia sie, gdy licznik po odjeciu 1 spada do 0,
+        # martwy - gdy licznik po dodaniu 1 osiaga compost_time
+        self.incubation_timers = TimerWheel()
+        self.incubation_timers.schedule(infected, np.maximum(grid.incubation_counter.reshape(-1)[infected], 1))
+        self.compost_timers = TimerWheel()
+        self.compost_timers.schedule(dead, np.maximum(compost_time - grid.compost_counter.reshape(-1)[dead], 1))
+        self._compost_time = compost_time
+
+    def sync_counters(self):
+        """Zapisuje do siatki liczniki inkubacji i kompostu wynikajace z kol czasowych."""
+        grid = self.grid
+        flat_state = grid.state.reshape(-1)
+        cells, remaining = self.incubation_timers.pending()
+        keep = flat_state[cells] == CellState.INFECTED.value
+        grid.incubation_counter.reshape(-1)[cells[keep]] = remaining[keep]
+        cells, remaining = self.compost_timers.pending()
+        keep = flat_state[cells] == CellState.DEAD.value
+        grid.compost_counter.reshape(-1)[cells[keep]] = self._compost_time - remaining[keep]
+
+    def step(self):
+        """Wykonuje jeden krok i zwraca liczbe zgonow w tym kroku."""
+        transitions = self._transitions
+        step_metrics = self.last_metrics
+        start = 0.0
+        if step_metrics is not None:
+            step_metrics.reset()
+            step_metrics.counts["cells"] = int(self.active.size)
+            start = time.perf_counter()
+
+        self.terrain_field.set_modifier_lut(self.params.terrain_modifier)
+        if self.params.compost_time != self._compost_time:
+            # Nowy czas kompostu dotyczy tez cial juz lezacych
+            self.sync_counters()
+            self._rebuild_timers()
+        active = self._apply_rules(transitions)
+        if step_metrics is not None:
+            start = step_metrics.lap("rules", start)
+
+        self.active = self._move_agents(active, transitions, step_metrics, start)
+
+        deaths = transitions["deaths"]
+        self.step_count += 1
+        self.total_deaths += deaths
+        self._update_counts(transitions)
+        if step_metrics is not None:
+            self.metrics.add(step_metrics)
+        return deaths
+
+    def _apply_rules(self, transitions):
+        """Reguly infekcji, inkubacji i kompostu na aktywnych komorkach; zwraca aktywne po regulach."""
+        grid = self.grid
+        params = self.params
+        height, width = grid.height, grid.width
+        flat_state = grid.state.reshape(-1)
+        flat_incubation = grid.incubation_counter.reshape(-1)
+        flat_compost = grid.compost_counter.reshape(-1)
+
+        active = self.active
+        values = flat_state[active]
+        humans = active[values == CellState.HUMAN.value]
+
+        # Liczba sasiadow Zombie tylko dla ludzi (stan sprzed zmian)
+        human_r = humans // width
+        human_c = humans - human_r * width
+        zombie_neighbors_count = np.zeros(humans.size, dtype=np.int64)
+        for dr, dc in NEIGHBOR_OFFSETS:
+            neighbor = ((human_r + dr) % height) * width + (human_c + dc) % width
+            zombie_neighbors_count += flat_state[neighbor] == CellState.ZOMBIE.value
+
+        dies = zombie_neighbors_count >= params.zombie_death_threshold
+        exposed = ~dies & params.infection_range_lut[zombie_neighbors_count]
+        # Ludzie sa posortowani, wiec losowania ida w kolejnosci wierszowej jak w wersji pelnej
+        exposed_idx = humans[exposed]
+        infected_idx = exposed_idx[self.rng.random(exposed_idx.size) < params.infection_probability]
+        died = humans[dies]
+
+        # Tylko komorki, ktorych termin wypada w tym kroku
+        turned = self.incubation_timers.advance()
+        turned = turned[flat_state[turned] == CellState.INFECTED.value]
+        composted = self.compost_timers.advance()
+        composted = composted[flat_state[composted] == CellState.DEAD.value]
+
+        flat_state[died] = CellState.DEAD.value
+        flat_compost[died] = 0
+        flat_incubation[died] = 0
+        self.compost_timers.schedule(died, max(params.compost_time, 1))
+
+        flat_state[infected_idx] = CellState.INFECTED.value
+        flat_incubation[infected_idx] = params.incubation_time
+        flat_compost[infected_idx] = 0
+        self.incubation_timers.schedule(infected_idx, max(params.incubation_time, 1))
+
+        flat_state[turned] = CellState.ZOMBIE.value
+        flat_incubation[turned] = 0
+
+        # Kompost -> Ziemia (razem z terenem); komorka przestaje byc aktywna
+        flat_state[composted] = CellState.GROUND.value
+        grid.terrain.reshape(-1)[composted] = CellState.GROUND.value
+        flat_compost[composted] = 0
+        if composted.size:
+            self.terrain_field.invalidate(composted)
+            active = np.delete(active, np.searchsorted(active, composted))
+
+        transitions["deaths"] = int(died.size)
+        transitions["infections"] = int(infected_idx.size)
+        transitions["turnings"] = int(turned.size)
+        transitions["composts"] = int(composted.size)
+        transitions["moves"] = 0
+        return active
+
+    def _agent_target_keys(self, active, values, origin):
+        """Klucze najblizszych celow agentow - wsrod aktywnych komorek albo z pelnego pola."""
+        grid = self.grid
+        cells = grid.height * grid.width
+        if active.size * SPARSE_TARGET_RATIO >= cells:
+            return target_keys(grid.state[None], origin)
+
+        is_zombie = grid.state.reshape(-1)[origin] == CellState.ZOMBIE.value
+        human_targets = active[values == CellState.ZOMBIE.value]
+        zombie_targets = active[(values == CellState.HUMAN.value) | (values == CellState.INFECTED.value)]
+        keys = np.empty(origin.size, dtype=np.int64)
+        keys[is_zombie] = nearest_target_keys_at(origin[is_zombie], zombie_targets, grid.height, grid.width)
+        keys[~is_zombie] = nearest_target_keys_at(origin[~is_zombie], human_targets, grid.height, grid.width)
+        return keys
+
+    def _move_agents(self, active, transitions, step_metrics, start):
+        """Ruch agentow (movement.py) na aktywnych komorkach; zwraca nowy zbior aktywnych."""
+        grid = self.grid
+        values = grid.state.reshape(-1)[active]
+        origin = active[(values == CellState.HUMAN.value) | (values == CellState.ZOMBIE.value)]
+        if origin.size == 0:
+            return active
+
+        keys = self._agent_target_keys(active, values, origin)
+        if step_metrics is not None:
+            start = step_metrics.lap("targets", start)
+
+        state = grid.state[None]
+        destination = choose_destinations(state, self.terrain_field.modifier[None], origin, keys,
+                                          MovementTables([self.params]), self.rng)
+        if step_metrics is not None:
+            start = step_metrics.lap("movement", start)
+
+        final, lost = resolve_collisions(origin, destination, self.rng)
+        if step_metrics is not None:
+            start = step_metrics.lap("collisions", start)
+
+        apply_moves(state, grid.incubation_counter[None], grid.compost_counter[None], origin, final)
+        moved = final != origin
+        transitions["moves"] = int(np.count_nonzero(moved))
+        # Pola opuszczone wypadaja ze zbioru aktywnych, nowe pola do niego wchodza
+        active = np.union1d(np.setdiff1d(active, origin[moved], assume_unique=True), final[moved])
+
+        if step_metrics is not None:
+            step_metrics.lap("apply", start)
+            counts = step_metrics.counts
+            counts["agents"] = int(origin.size)
+            counts["target_searches"] = int(origin.size)
+            counts["collisions"] = int(np.count_nonzero(lost & (destination != origin)))
+            counts["moves"] = transitions["moves"]
+        return active
@@ -0,0 +1,74 @@
+# stats.py
+import numpy as np
+
+from config import CellState
+
+# Rekord statystyk jednego kroku: liczebnosci stanow po kroku oraz przejscia w kroku
+STATS_FIELDS = (
+    "step",
+    "ground", "humans", "infected", "zombies", "dead",
+    "deaths", "infections", "turnings", "composts", "moves",
+)
+STATS_DTYPE = np.dtype([(name, np.int64) for name in STATS_FIELDS])
+
+# Kolejnosc pol liczebnosci odpowiada wartosciom CellState 0..4
+COUNT_FIELDS = ("ground", "humans", "infected", "zombies", "dead")
+COUNT_STATES = (CellState.GROUND, CellState.HUMAN, CellState.INFECTED, CellState.ZOMBIE, CellState.DEAD)
+
+
+class StatsHistory:
+    """
+    Bufor cykliczny ostatnich `capacity` rekordow STATS_DTYPE.
+    Kazdy rekord zapisywany jest dwa razy (pod i oraz i + capacity), dzieki czemu
+    historia w kolejnosci chronologicznej jest zawsze ciaglym wycinkiem -
+    view() i field() zwracaja widoki bez kopiowania.
+    """
+    def __init__(self, capacity=4096):
+        if capacity < 1:
+            raise ValueError("Pojemnosc historii musi byc dodatnia")
+        self.capacity = capacity
+        self._buffer = np.zeros(2 * capacity, dtype=STATS_DTYPE)
+        self._next = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, record):
+        self._buffer[self._next] = record
+        self._buffer[self._next + self.capacity] = record
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def extend(self, records):
+        """Dopisuje tablice rekordow naraz (np. przy odtwarzaniu z checkpointu)."""
+        records = np.asarray(records, dtype=STATS_DTYPE)[-self.capacity:]
+        count = len(records)
+        if count == 0:
+            return
+        positions = (self._next + np.arange(count)) % self.capacity
+        self._buffer[positions] = records
+        self._buffer[positions + self.capacity] = records
+        self._next = (self._next + count) % self.capacity
+        self._size = min(self._size + count, self.capacity)
+
+    def clear(self):
+        self._next = 0
+        self._size = 0
+
+    def view(self):
+        """Rekordy od najstarszego do najnowszego (widok tylko do odczytu)."""
+        start = (self._next - self._size) % self.capacity
+        view = self._buffer[start:start + self._size]
+        view.flags.writeable = False
+        return view
+
+    def field(self, name):
+        """Jedna kolumna historii (np. 'zombies') jako widok."""
+        return self.view()[name]
+
+    def latest(self):
+        """Najnowszy rekord (kopia) albo None."""
+        if self._size == 0:
+            return None
+        return self._buffer[(self._next - 1) % self.capacity].copy()
@@ -0,0 +1,401 @@
+# stream_server.py
+"""
+Lokalny serwer strumieniujacy jeden przebieg symulacji do wielu widzow.
+
+Serwer (asyncio, TCP) liczy kroki silnika i rozsyla kazda klatke wszystkim
+klientom. Klatki maja format pliku nagrania (recording.encode_frame): rekord
+statystyk kroku + XOR z poprzednia klatka (delta) albo pelne plaszczyzny
+(klatka kluczowa co keyframe_interval krokow). Klatka jest kodowana raz,
+niezaleznie od liczby klientow.
+
+Wiadomosci w obie strony: MESSAGE_HEADER (rodzaj, dlugosc) + dane.
+    HELLO    serwer -> klient, JSON: width, height, keyframe_interval,
+    FRAME    serwer -> klient, klatka (recording.decode_frame),
+    STATUS   serwer -> klient, JSON: stan biegu i parametry (odpowiedz na sterowanie),
+    CONTROL  klient -> serwer, JSON {"cmd": ...} - jak przyciski ZombieCA_GUI:
+             run, pause, step, infection_probability (value), paint (r, c, terrain).
+
+Przeciazenie: kazdy klient ma ograniczona kolejke wyjsciowa. Gdy sie zapelni,
+klient traci czekajace delty i dostaje klatke kluczowa biezacego kroku -
+wolny widz przeskakuje do najnowszego stanu, a symulacja na niego nie czeka.
+
+Test lokalny w jednym procesie:
+    server = SimulationServer(engine); await server.start()
+    client = await StreamClient.connect(port=server.port)
+    frame = await client.receive_frame()
+"""
+import asyncio
+import json
+import struct
+import sys
+
+import numpy as np
+
+from config import CellState
+from recording import KEYFRAME, DELTA, encode_frame, decode_frame, grid_stats
+
+MESSAGE_HEADER = struct.Struct("<BI")        # rodzaj, dlugosc danych
+HELLO = 1
+FRAME = 2
+STATUS = 3
+CONTROL = 4
+
+# Wiadomosci sterujace sa male - dluzsza oznacza blad protokolu
+MAX_CONTROL_SIZE = 1 << 16
+# Teren, ktory klient moze malowac (typy z legendy GUI) - bez stanow agentow
+PAINTABLE_TERRAIN = {state.name: state for state in (
+    CellState.GROUND, CellState.STREET, CellState.GREEN_AREA,
+    CellState.BUILDING, CellState.WATER, CellState.HILL)}
+
+
+def _message(kind, payload):
+    return MESSAGE_HEADER.pack(kind, len(payload)) + payload
+
+
+def _json_message(kind, data):
+    return _message(kind, json.dumps(data).encode("utf-8"))
+
+
+async def read_message(reader, max_size=None):
+    """Nastepna wiadomosc (rodzaj, dane) ze strumienia; None na koncu polaczenia."""
+    try:
+        header = await reader.readexactly(MESSAGE_HEADER.size)
+        kind, length = MESSAGE_HEADER.unpack(header)
+        if max_size is not None and length > max_size:
+            raise ValueError(f"Za dluga wiadomosc: {length} B")
+        return kind, await reader.readexactly(length)
+    except asyncio.IncompleteReadError:
+        return None
+
+
+class _Client:
+    """Polaczony widz: kolejka wiadomosci do wyslania i flaga ponownej synchronizacji."""
+    def __init__(self, writer, queue_size):
+        self.writer = writer
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.needs_keyframe = True
+        self.skipped = 0
+        self.task = asyncio.current_task()
+
+    def offer(self, message):
+        """Dodaje wiadomosc; przy pelnej kolejce odrzuca czekajace klatki i wymaga klatki kluczowej."""
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+                self.skipped += 1
+            self.needs_keyframe = True
+            return False
+
+
+class SimulationServer:
+    """
+    Serwer krokow silnika (SimulationEngine lub pochodne) dla wielu klientow.
+    step_interval - przerwa miedzy krokami [s] w trybie biegu,
+    max_steps - po tylu krokach bieg sie zatrzymuje (None - bez limitu),
+    on_step - opcjonalna funkcja wywolywana po kazdym kroku (np. zapis statystyk).
+    Silnik jest zmieniany tylko przez serwer (kroki w watku puli, sterowanie
+    miedzy krokami), wiec klienci nie musza nic liczyc.
+    """
+    def __init__(self, engine, host="127.0.0.1", port=0, step_interval=0.0, keyframe_interval=50,
+                 client_queue_size=8, compression_level=1, running=True, max_steps=None, on_step=None):
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.step_interval = step_interval
+        self.keyframe_interval = keyframe_interval
+        self.client_queue_size = client_queue_size
+        self.compression_level = compression_level
+        self.running = running
+        self.max_steps = max_steps
+        self.on_step = on_step
+        self.clients = set()
+        self.frames_sent = 0
+        self._server = None
+        self._loop_task = None
+        self._wake = None
+        self._finished = None
+        self._lock = None
+        # Ostatnio rozeslany stan (plaszczyzny, krok, statystyki) - z niego powstaje
+        # klatka kluczowa dla nowych klientow, takze gdy silnik liczy juz nastepny krok
+        self._previous = None
+        self._previous_step = 0
+        self._previous_stats = None
+        self._frames = 0
+        self._keyframe = None
+
+    async def start(self):
+        """Otwiera gniazdo (port=0 - wolny port, zapisany w self.port) i uruchamia petle krokow."""
+        self._wake = asyncio.Event()
+        self._finished = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._broadcast()
+        self._loop_task = asyncio.create_task(self._run())
+        return self
+
+    async def stop(self):
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+            self._loop_task = None
+        if self._server is not None:
+            self._server.close()
+            tasks = [client.task for client in self.clients]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def wait_finished(self):
+        """Czeka, az bieg wykona max_steps krokow."""
+        await self._finished.wait()
+
+    # --- Petla krokow ---
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if self.max_steps is not None and self.engine.step_count >= self.max_steps:
+                self.running = False
+                self._finished.set()
+            if not self.running:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            await self._step(loop)
+            # Oddanie petli klientom nawet przy step_interval = 0
+            await asyncio.sleep(self.step_interval)
+
+    async def _step(self, loop=None):
+        loop = loop or asyncio.get_running_loop()
+        # Krok liczony w watku puli; sterowanie czeka na jego koniec
+        async with self._lock:
+            await loop.run_in_executor(None, self.engine.step)
+            if self.on_step is not None:
+                self.on_step()
+            self._broadcast()
+
+    def _stats(self):
+        engine = self.engine
+        if engine.step_count > 0 and engine.last_stats is not None:
+            return engine.last_stats
+        return grid_stats(engine.step_count, engine.grid.state)
+
+    def _broadcast(self):
+        """Koduje biezacy stan raz i rozsyla go wszystkim klientom."""
+        grid = self.engine.grid
+        planes = np.stack((grid.state, grid.terrain))
+        stats = self._stats()
+        step = self.engine.step_count
+        if self._previous is None or self._frames % self.keyframe_interval == 0:
+            message = _message(FRAME, encode_frame(KEYFRAME, step, stats, planes, self.compression_level))
+            self._keyframe = message
+        else:
+            message = _message(FRAME, encode_frame(DELTA, step, stats, np.bitwise_xor(planes, self._previous),
+                                                   self.compression_level))
+            self._keyframe = None
+        self._previous = planes
+        self._previous_step = step
+        self._previous_stats = stats
+        self._frames += 1
+
+        for client in self.clients:
+            if client.needs_keyframe:
+                self._resync(client)
+            elif not client.offer(message):
+                # Klient nie nadaza - zamiast kolejnych delt dostaje stan biezacy
+                self._resync(client)
+
+    def _resync(self, client):
+        """Klatka kluczowa biezacego kroku (kodowana raz na krok, wspolna dla klientow)."""
+        if self._keyframe is None:
+            self._keyframe = _message(FRAME, encode_frame(KEYFRAME, self._previous_step, self._previous_stats,
+                                                          self._previous, self.compression_level))
+        if client.offer(self._keyframe):
+            client.needs_keyframe = False
+
+    # --- Klienci ---
+
+    async def _handle_client(self, reader, writer):
+        client = _Client(writer, self.client_queue_size)
+        self.clients.add(client)
+        writer.write(_json_message(HELLO, {"width": self.engine.grid.width, "height": self.engine.grid.height,
+                                           "keyframe_interval": self.keyframe_interval}))
+        writer.write(_json_message(STATUS, self.status()))
+        self._resync(client)
+        sender = asyncio.create_task(self._send_loop(client))
+        try:
+            while True:
+                message = await read_message(reader, MAX_CONTROL_SIZE)
+                if message is None:
+                    break
+                kind, payload = message
+                if kind != CONTROL:
+                    continue
+                try:
+                    reply = await self.apply_control(json.loads(payload))
+                except (ValueError, KeyError, TypeError) as exc:
+                    reply = dict(self.status(), error=str(exc))
+                client.offer(_json_message(STATUS, reply))
+        except (ConnectionError, ValueError, asyncio.CancelledError):
+            # Rozlaczenie klienta albo zatrzymanie serwera
+            pass
+        finally:
+            self.clients.discard(client)
+            sender.cancel()
+            writer.close()
+
+    async def _send_loop(self, client):
+        writer = client.writer
+        try:
+            while True:
+                message = await client.queue.get()
+                writer.write(message)
+                await writer.drain()
+                if message[0] == FRAME:
+                    self.frames_sent += 1
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+    # --- Sterowanie ---
+
+    def status(self):
+        return {"running": self.running, "step": self.engine.step_count,
+                "infection_probability": self.engine.params.infection_probability}
+
+    async def apply_control(self, message):
+        """Wykonuje komende klienta (jak przyciski GUI) miedzy krokami; zwraca status."""
+        cmd = message["cmd"]
+        if cmd == "run":
+            self.running = True
+            self._wake.set()
+        elif cmd == "pause":
+            self.running = False
+        elif cmd == "step":
+            if not self.running:
+                await self._step()
+        else:
+            async with self._lock:
+                self._apply_engine_control(cmd, message)
+        return self.status()
+
+    def _apply_engine_control(self, cmd, message):
+        if cmd == "infection_probability":
+            value = float(message["value"])
+            if not 0.0 <= value <= 1.0:
+                raise ValueError("Prawdopodobienstwo infekcji poza zakresem 0..1")
+            self.engine.params = self.engine.params.replace(infection_probability=value)
+        elif cmd == "paint":
+            r, c = int(message["r"]), int(message["c"])
+            terrain = PAINTABLE_TERRAIN.get(message["terrain"])
+            if terrain is None:
+                raise ValueError(f"Nie mozna malowac terenu {message['terrain']!r} "
+                                 f"(dozwolone: {', '.join(PAINTABLE_TERRAIN)})")
+            if not (0 <= r < self.engine.grid.height and 0 <= c < self.engine.grid.width):
+                raise ValueError(f"Komorka ({r}, {c}) poza siatka")
+            if self.engine.paint_terrain(r, c, terrain.value):
+                self._broadcast()
+        else:
+            raise ValueError(f"Nieznana komenda: {cmd}")
+
+
+class StreamClient:
+    """
+    Klient strumienia: sklada klatki z delt i wysyla komendy sterujace.
+    state/terrain - plaszczyzny ostatniej odebranej klatki.
+    """
+    def __init__(self, reader, writer, hello):
+        self.reader = reader
+        self.writer = writer
+        self.width = hello["width"]
+        self.height = hello["height"]
+        self.keyframe_interval = hello["keyframe_interval"]
+        self.status = None
+        self.step = None
+        self.stats = None
+        self.keyframes = 0
+        self._planes = None
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=0):
+        reader, writer = await asyncio.open_connection(host, port)
+        message = await read_message(reader)
+        if message is None or message[0] != HELLO:
+            writer.close()
+            raise ConnectionError("Serwer nie przyslal powitania")
+        return cls(reader, writer, json.loads(message[1]))
+
+    @property
+    def state(self):
+        return None if self._planes is None else self._planes[0]
+
+    @property
+    def terrain(self):
+        return None if self._planes is None else self._planes[1]
+
+    async def send(self, cmd, **fields):
+        self.writer.write(_json_message(CONTROL, dict(fields, cmd=cmd)))
+        await self.writer.drain()
+
+    async def receive(self):
+        """Nastepna wiadomosc: "frame" albo "status" (slownik); None po rozlaczeniu."""
+        message = await read_message(self.reader)
+        if message is None:
+            return None
+        kind, payload = message
+        if kind == STATUS:
+            self.status = json.loads(payload)
+            return "status"
+        if kind == FRAME:
+            frame_kind, step, stats, raw = decode_frame(payload, self.width, self.height)
+            if frame_kind == KEYFRAME:
+                self._planes = raw.copy()
+                self.keyframes += 1
+            elif self._planes is not None:
+                np.bitwise_xor(self._planes, raw, out=self._planes)
+            else:
+                return await self.receive()
+            self.step = step
+            self.stats = stats
+            return "frame"
+        return await self.receive()
+
+    async def receive_frame(self):
+        """Czeka na nastepna klatke (statusy po drodze sa zapamietywane); zwraca numer kroku."""
+        while True:
+            kind = await self.receive()
+            if kind is None:
+                return None
+            if kind == "frame":
+                return self.step
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+def run_server(engine, host="127.0.0.1", port=0, steps=None, on_step=None, **options):
+    """Blokujacy bieg serwera do wykonania `steps` krokow (None - do przerwania)."""
+    async def main():
+        server = SimulationServer(engine, host, port, max_steps=steps, on_step=on_step, **options)
+        async with server:
+            print(f"Serwer strumienia: {server.host}:{server.port}", file=sys.stderr)
+            await server.wait_finished()
+    asyncio.run(main())
@@ -0,0 +1,66 @@
+# terrain_field.py
+import numpy as np
+
+
+class TerrainField:
+    """
+    Pole pochodne terenu liczone raz na mape:
+        modifier - modyfikator ruchu kazdej komorki (float64).
+    Teren jest tablica (H, W) albo (K, H, W); modifier_lut ma ksztalt (256,)
+    albo (K, 256) - osobna tablica modyfikatorow dla kazdej repliki.
+
+    Zmiany terenu (malowanie w GUI, kompost) zglasza sie przez invalidate() -
+    naprawiane sa tylko podane komorki, bez przeliczania calego pola.
+    """
+    def __init__(self, terrain, modifier_lut):
+        self.terrain = terrain
+        self.modifier_lut = np.asarray(modifier_lut, dtype=np.float64)
+        self.modifier = np.empty(terrain.shape, dtype=np.float64)
+        self.rebuilds = 0
+        self.rebuild()
+
+    def _lut_rows(self, flat_index):
+        """Wiersz modifier_lut (numer repliki) dla plaskich indeksow komorek."""
+        if self.modifier_lut.ndim == 1:
+            return None
+        cells = self.terrain[0].size
+        return flat_index // cells
+
+    def rebuild(self):
+        """Pelne przeliczenie (nowa mapa albo nowe modyfikatory)."""
+        terrain = self.terrain
+        if self.modifier_lut.ndim == 1:
+            np.take(self.modifier_lut, terrain, out=self.modifier)
+        else:
+            replica = np.arange(terrain.shape[0])[:, None, None]
+            self.modifier[...] = self.modifier_lut[replica, terrain]
+        self.rebuilds += 1
+
+    def set_modifier_lut(self, modifier_lut):
+        """Nowe modyfikatory ruchu; pole przeliczane tylko, gdy wartosci sie zmienily."""
+        modifier_lut = np.asarray(modifier_lut, dtype=np.float64)
+        if modifier_lut is self.modifier_lut or np.array_equal(modifier_lut, self.modifier_lut):
+            return
+        self.modifier_lut = modifier_lut
+        self.rebuild()
+
+    def invalidate(self, flat_index):
+        """Naprawia pola dla komorek o podanych plaskich indeksach (po zmianie terenu)."""
+        flat_index = np.asarray(flat_index, dtype=np.int64).reshape(-1)
+        if flat_index.size == 0:
+            return
+        values = self.terrain.reshape(-1)[flat_index]
+        rows = self._lut_rows(flat_index)
+        if rows is None:
+            self.modifier.reshape(-1)[flat_index] = self.modifier_lut[values]
+        else:
+            self.modifier.reshape(-1)[flat_index] = self.modifier_lut[rows, values]
+
+    def invalidate_mask(self, mask):
+        """Jak invalidate(), dla maski logicznej o ksztalcie terenu."""
+        self.invalidate(np.flatnonzero(mask))
+
+    def set_terrain(self, index, value):
+        """Zmienia teren komorki (krotka indeksow, np. (r, c)) i naprawia pola tylko dla niej."""
+        self.terrain[index] = value
+        self.invalidate(np.ravel_multi_index(index, self.terrain.shape))
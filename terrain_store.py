@@ -0,0 +1,237 @@
+# terrain_store.py
+"""
+Kafelkowy magazyn terenu dla map wiekszych niz pamiec.
+
+Mapa zrodlowa jest raz konwertowana do pliku (build_terrain_store):
+    naglowek    STORE_HEADER: magic, wersja, szerokosc, wysokosc, bok kafelka,
+    indeks      int64 na kafelek (wierszami kafelkow): przesuniecie danych
+                kafelka w pliku albo -(wartosc + 1) dla kafelka jednolitego
+                (woda, pusta ziemia) - taki kafelek nie zajmuje miejsca,
+    dane        kafelki bok x bok uint8 (wartosci CellState), brzegowe dopelnione ziemia.
+
+TerrainStore otwiera plik przez mmap i czyta tylko kafelki pokrywajace
+zadany fragment; ostatnio uzywane kafelki trzyma cache LRU. Czas startu
+i pamiec zaleza wiec od symulowanego fragmentu, a nie od calej mapy.
+
+Konwersja z linii polecen:
+    python terrain_store.py miasto.png miasto.zct --chunk 256
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from config import CellState
+from grid import VALID_TERRAIN_VALUES
+from map_loader import classify_terrain, load_map_from_image
+
+STORE_MAGIC = b"ZCATER01"
+FORMAT_VERSION = 1
+# magic, wersja, szerokosc, wysokosc, bok kafelka
+STORE_HEADER = struct.Struct("<8sIIII")
+TERRAIN_STORE_SUFFIX = ".zct"
+DEFAULT_CHUNK_SIZE = 256
+DEFAULT_CACHE_CHUNKS = 64
+
+
+def _read_source(source):
+    """Zrodlo konwersji jako tablica (H, W) terenu albo (H, W, 3) RGB (moze byc memmap)."""
+    if not isinstance(source, (str, os.PathLike)):
+        return source if hasattr(source, "shape") else np.asarray(source)
+    if os.fspath(source).endswith(".npy"):
+        return np.load(source, mmap_mode="r")
+    img = cv2.imread(os.fspath(source))
+    if img is None:
+        raise FileNotFoundError(f"Nie można wczytać obrazu: {source}")
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+
+def build_terrain_store(source, path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Konwertuje mape do pliku magazynu terenu.
+    source - sciezka obrazu (klasyfikacja kolorow jak w load_map_from_image, bez
+    skalowania), plik .npy z terenem albo tablica (H, W) terenu / (H, W, 3) RGB.
+    Zrodlo przetwarzane jest pasami wysokosci kafelka, wiec memmap wiekszy
+    niz pamiec nie jest wczytywany w calosci.
+    """
+    source = _read_source(source)
+    height, width = source.shape[:2]
+    rows = -(-height // chunk_size)
+    cols = -(-width // chunk_size)
+    index = np.empty(rows * cols, dtype=np.int64)
+    data_start = STORE_HEADER.size + index.nbytes
+    chunk_bytes = chunk_size * chunk_size
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(STORE_HEADER.pack(STORE_MAGIC, FORMAT_VERSION, width, height, chunk_size))
+            f.write(index.tobytes())
+            offset = data_start
+            band = np.empty((chunk_size, cols * chunk_size), dtype=np.uint8)
+            for chunk_row in range(rows):
+                r0 = chunk_row * chunk_size
+                r1 = min(r0 + chunk_size, height)
+                part = np.asarray(source[r0:r1])
+                terrain = classify_terrain(part) if part.ndim == 3 else part.astype(np.uint8)
+                if not np.isin(terrain, VALID_TERRAIN_VALUES).all():
+                    raise ValueError("Mapa terenu zawiera wartości spoza CellState")
+                band.fill(CellState.GROUND.value)
+                band[:r1 - r0, :width] = terrain
+                for chunk_col in range(cols):
+                    chunk = band[:, chunk_col * chunk_size:(chunk_col + 1) * chunk_size]
+                    first = chunk[0, 0]
+                    k = chunk_row * cols + chunk_col
+                    if (chunk == first).all():
+                        index[k] = -(int(first) + 1)
+                    else:
+                        index[k] = offset
+                        f.write(np.ascontiguousarray(chunk).tobytes())
+                        offset += chunk_bytes
+            f.seek(STORE_HEADER.size)
+            f.write(index.tobytes())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class TerrainStore:
+    """
+    Odczyt pliku magazynu terenu (build_terrain_store) przez mmap.
+    cache_chunks - liczba kafelkow trzymanych w cache LRU.
+    """
+    def __init__(self, path, cache_chunks=DEFAULT_CACHE_CHUNKS):
+        self.path = path
+        self.cache_chunks = cache_chunks
+        self._mm = None
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"Pusty plik magazynu terenu: {path}")
+        if len(self._mm) < STORE_HEADER.size:
+            self.close()
+            raise ValueError(f"Uszkodzony plik magazynu terenu: {path}")
+        magic, version, self.width, self.height, self.chunk_size = STORE_HEADER.unpack_from(self._mm, 0)
+        if magic != STORE_MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"Nieobslugiwany plik magazynu terenu: {path}")
+        self.chunk_rows = -(-self.height // self.chunk_size)
+        self.chunk_cols = -(-self.width // self.chunk_size)
+        self.index = np.frombuffer(self._mm, dtype=np.int64, count=self.chunk_rows * self.chunk_cols,
+                                   offset=STORE_HEADER.size).copy()
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def shape(self):
+        return self.height, self.width
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self._cache.clear()
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def chunk(self, chunk_row, chunk_col):
+        """Kafelek (bok x bok, tylko do odczytu) - z cache albo z pliku."""
+        key = (chunk_row, chunk_col)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return cached
+        self.misses += 1
+        size = self.chunk_size
+        entry = int(self.index[chunk_row * self.chunk_cols + chunk_col])
+        if entry < 0:
+            chunk = np.full((size, size), -entry - 1, dtype=np.uint8)
+        else:
+            chunk = np.frombuffer(self._mm, dtype=np.uint8, count=size * size, offset=entry)
+            chunk = chunk.reshape(size, size).copy()
+        chunk.flags.writeable = False
+        self._cache[key] = chunk
+        if len(self._cache) > self.cache_chunks:
+            self._cache.popitem(last=False)
+        return chunk
+
+    def read(self, row, col, height, width, out=None):
+        """Fragment mapy [row:row+height, col:col+width] jako tablica uint8."""
+        if row < 0 or col < 0 or height < 0 or width < 0 \
+                or row + height > self.height or col + width > self.width:
+            raise ValueError(f"Fragment ({row}, {col}, {height}x{width}) wychodzi poza mape "
+                             f"{self.height}x{self.width}")
+        if out is None:
+            out = np.empty((height, width), dtype=np.uint8)
+        size = self.chunk_size
+        for chunk_row in range(row // size, -(-(row + height) // size)):
+            r0 = max(row, chunk_row * size)
+            r1 = min(row + height, (chunk_row + 1) * size)
+            for chunk_col in range(col // size, -(-(col + width) // size)):
+                c0 = max(col, chunk_col * size)
+                c1 = min(col + width, (chunk_col + 1) * size)
+                chunk = self.chunk(chunk_row, chunk_col)
+                out[r0 - row:r1 - row, c0 - col:c1 - col] = \
+                    chunk[r0 - chunk_row * size:r1 - chunk_row * size, c0 - chunk_col * size:c1 - chunk_col * size]
+        return out
+
+    def __getitem__(self, key):
+        """store[r0:r1, c0:c1] - fragment mapy (kroki slice'ow nieobslugiwane)."""
+        if not isinstance(key, tuple) or len(key) != 2:
+            raise TypeError("Oczekiwano dwoch indeksow: store[wiersze, kolumny]")
+        rows, cols = key
+        if isinstance(rows, slice) and isinstance(cols, slice):
+            r0, r1, _ = rows.indices(self.height)
+            c0, c1, _ = cols.indices(self.width)
+            return self.read(r0, c0, max(r1 - r0, 0), max(c1 - c0, 0))
+        r, c = int(rows), int(cols)
+        size = self.chunk_size
+        return self.chunk(r // size, c // size)[r % size, c % size]
+
+
+def load_terrain(path, width, height, origin=(0, 0)):
+    """
+    Teren symulowanego obszaru width x height: z pliku magazynu (TERRAIN_STORE_SUFFIX)
+    fragment od origin = (wiersz, kolumna), bez skalowania; z obrazu - cala mapa
+    przeskalowana jak w load_map_from_image.
+    """
+    if os.fspath(path).endswith(TERRAIN_STORE_SUFFIX):
+        with TerrainStore(path) as store:
+            return store.read(origin[0], origin[1], height, width)
+    return load_map_from_image(path, width, height)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Konwersja mapy do kafelkowego magazynu terenu")
+    parser.add_argument("source", help="obraz mapy albo plik .npy z terenem")
+    parser.add_argument("output", help=f"plik magazynu ({TERRAIN_STORE_SUFFIX})")
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK_SIZE, help="bok kafelka")
+    args = parser.parse_args(argv)
+    build_terrain_store(args.source, args.output, args.chunk)
+    with TerrainStore(args.output) as store:
+        uniform = int(np.count_nonzero(store.index < 0))
+        print(f"{store.width}x{store.height}, kafelki {store.chunk_rows}x{store.chunk_cols} "
+              f"(jednolite: {uniform}), {os.path.getsize(args.output)} B", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+# timers.py
+import numpy as np
+
+
+class TimerWheel:
+    """
+    Zdarzenia komorek odlozone o zadana liczbe tikow, trzymane w kubelkach
+    wedlug tiku wykonania. advance() przesuwa zegar o jeden tik i zwraca
+    komorki, ktorych termin wlasnie nadszedl - koszt zalezy od liczby
+    zdarzen w tym tiku, a nie od liczby oczekujacych komorek.
+    """
+    def __init__(self):
+        self.now = 0
+        self._buckets = {}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def schedule(self, cells, delay):
+        """
+        Planuje zdarzenie dla komorek (plaskie indeksy) za `delay` tikow
+        (liczba albo tablica jak cells, wartosci >= 1).
+        """
+        cells = np.asarray(cells, dtype=np.int64).reshape(-1)
+        if cells.size == 0:
+            return
+        delay = np.asarray(delay, dtype=np.int64)
+        if (delay < 1).any():
+            raise ValueError("Opoznienie zdarzenia musi wynosic co najmniej 1 tik")
+        if delay.ndim == 0:
+            self._buckets.setdefault(self.now + int(delay), []).append(cells)
+        else:
+            due = self.now + delay.reshape(-1)
+            order = np.argsort(due, kind="stable")
+            due = due[order]
+            starts = np.flatnonzero(np.r_[True, due[1:] != due[:-1]])
+            ends = np.r_[starts[1:], due.size]
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                self._buckets.setdefault(int(due[start]), []).append(cells[order[start:end]])
+        self._size += cells.size
+
+    def advance(self):
+        """Nastepny tik; zwraca posortowane komorki, ktorych zdarzenie wypada w tym tiku."""
+        self.now += 1
+        parts = self._buckets.pop(self.now, None)
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        cells = parts[0] if len(parts) == 1 else np.concatenate(parts)
+        self._size -= cells.size
+        return np.sort(cells)
+
+    def pending(self):
+        """(komorki, pozostale tiki) wszystkich oczekujacych zdarzen."""
+        if not self._size:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        cells = []
+        remaining = []
+        for due, parts in self._buckets.items():
+            for part in parts:
+                cells.append(part)
+                remaining.append(np.full(part.size, due - self.now, dtype=np.int64))
+        return np.concatenate(cells), np.concatenate(remaining)
+
+    def clear(self):
+        self._buckets.clear()
+        self._size = 0
@@ -0,0 +1,212 @@
+# worker.py
+import queue
+import threading
+import time
+
+import numpy as np
+
+
+
+class Frame:
+    """
+    Niezmienna migawka symulacji do wyswietlenia: kopie tablic state i terrain
+    (tylko do odczytu) oraz statystyki kroku. Ma atrybuty state/terrain jak Grid,
+    wiec renderer moze ja narysowac bezposrednio.
+    """
+    __slots__ = ("step", "state", "terrain", "counts", "deaths", "total_deaths", "steps_per_s", "metrics")
+
+    def __init__(self, engine, deaths, steps_per_s):
+        self.step = engine.step_count
+        self.state = engine.grid.state.copy()
+        self.terrain = engine.grid.terrain.copy()
+        self.state.flags.writeable = False
+        self.terrain.flags.writeable = False
+        self.counts = engine.counts_by_state()
+        self.deaths = deaths
+        self.total_deaths = engine.total_deaths
+        self.steps_per_s = steps_per_s
+        # Metryki faz ostatniego kroku i srednie z przebiegu (gdy pomiar wlaczony)
+        self.metrics = None
+        if engine.metrics is not None:
+            self.metrics = {"last": engine.last_metrics.as_dict(),
+                            "mean_times": engine.metrics.mean_times()}
+
+    @classmethod
+    def from_arrays(cls, step, state, terrain, counts, deaths=0, total_deaths=0, steps_per_s=0.0):
+        """Klatka z gotowych tablic (np. z odtwarzanego nagrania)."""
+        frame = cls.__new__(cls)
+        frame.step = step
+        frame.state = np.array(state, copy=True)
+        frame.terrain = np.array(terrain, copy=True)
+        frame.state.flags.writeable = False
+        frame.terrain.flags.writeable = False
+        frame.counts = counts
+        frame.deaths = deaths
+        frame.total_deaths = total_deaths
+        frame.steps_per_s = steps_per_s
+        frame.metrics = None
+        return frame
+
+
+class SimulationWorker(threading.Thread):
+    """
+    Watek liczacy symulacje niezaleznie od petli Tk.
+    Sterowanie przez kolejke komend (send_*), wyniki jako Frame w ograniczonej
+    kolejce - gdy GUI nie nadaza, najstarsze klatki sa odrzucane.
+    W trybie max_speed kroki nie czekaja na step_interval, a klatki sa
+    publikowane najwyzej co min_frame_interval sekund.
+    """
+    def __init__(self, engine, step_interval=0.1, frame_queue_size=2, min_frame_interval=1 / 60):
+        super().__init__(name="SimulationWorker", daemon=True)
+        self.engine = engine
+        self.step_interval = step_interval
+        self.running = False
+        self.max_speed = False
+        self.min_frame_interval = min_frame_interval
+        self._last_publish = 0.0
+
+        self.frames = queue.Queue(maxsize=frame_queue_size)
+        self._commands = queue.Queue()
+        self._stopped = False
+        self._next_step_time = 0.0
+        self._rate_start = time.perf_counter()
+        self._rate_steps = 0
+        self._steps_per_s = 0.0
+
+    # --- API dla GUI (wywolywane z watku Tk) ---
+
+    def send_running(self, running):
+        self._commands.put(("running", running))
+
+    def send_step(self):
+        self._commands.put(("step",))
+
+    def send_params(self, params):
+        self._commands.put(("params", params))
+
+    def send_paint(self, r, c, terrain_state):
+        self._commands.put(("paint", r, c, terrain_state))
+
+    def send_step_interval(self, seconds):
+        self._commands.put(("interval", seconds))
+
+    def send_max_speed(self, enabled):
+        self._commands.put(("max_speed", enabled))
+
+    def send_metrics(self, enabled):
+        self._commands.put(("metrics", enabled))
+
+    def send_reset(self, engine):
+        self._commands.put(("reset", engine))
+
+    def stop(self, timeout=1.0):
+        self._commands.put(("stop",))
+        if self.is_alive():
+            self.join(timeout)
+
+    def latest_frame(self):
+        """Najnowsza dostepna klatka (starsze sa pomijane) albo None."""
+        frame = None
+        while True:
+            try:
+                frame = self.frames.get_nowait()
+            except queue.Empty:
+                return frame
+
+    # --- Watek roboczy ---
+
+    def run(self):
+        self._publish(0)
+        while not self._stopped:
+            self._handle_commands()
+            if self._stopped:
+                break
+            if not self.running:
+                continue
+
+            now = time.perf_counter()
+            if not self.max_speed and now < self._next_step_time:
+                self._wait_for_command(self._next_step_time - now)
+                continue
+            self._next_step_time = now + self.step_interval
+
+            deaths = self.engine.step()
+            self._count_rate()
+            if not self.max_speed or time.perf_counter() - self._last_publish >= self.min_frame_interval:
+                self._publish(deaths)
+
+    def _handle_commands(self):
+        # Bez biegu symulacji czekamy na komende zamiast aktywnie petlic
+        if not self.running:
+            self._wait_for_command(0.05)
+        while True:
+            try:
+                command = self._commands.get_nowait()
+            except queue.Empty:
+                return
+            self._apply(command)
+
+    def _wait_for_command(self, timeout):
+        try:
+            command = self._commands.get(timeout=timeout)
+        except queue.Empty:
+            return
+        self._apply(command)
+
+    def _apply(self, command):
+        kind = command[0]
+        if kind == "stop":
+            self._stopped = True
+        elif kind == "running":
+            self.running = command[1]
+            self._next_step_time = 0.0
+            self._rate_start = time.perf_counter()
+            self._rate_steps = 0
+        elif kind == "step":
+            deaths = self.engine.step()
+            self._publish(deaths)
+        elif kind == "params":
+            self.engine.params = command[1]
+        elif kind == "paint":
+            _, r, c, terrain_state = command
+            # Silnik naprawia pola terenu tylko dla malowanej komorki
+            if self.engine.paint_terrain(r, c, terrain_state.value):
+                self._publish(0)
+        elif kind == "interval":
+            self.step_interval = command[1]
+        elif kind == "max_speed":
+            self.max_speed = command[1]
+        elif kind == "metrics":
+            if command[1]:
+                self.engine.enable_metrics()
+            else:
+                self.engine.disable_metrics()
+        elif kind == "reset":
+            metrics_enabled = self.engine.metrics is not None
+            self.engine = command[1]
+            if metrics_enabled:
+                self.engine.enable_metrics()
+            self.running = False
+            self._publish(0)
+
+    def _count_rate(self):
+        self._rate_steps += 1
+        elapsed = time.perf_counter() - self._rate_start
+        if elapsed >= 1.0:
+            self._steps_per_s = self._rate_steps / elapsed
+            self._rate_start = time.perf_counter()
+            self._rate_steps = 0
+
+    def _publish(self, deaths):
+        frame = Frame(self.engine, deaths, self._steps_per_s)
+        self._last_publish = time.perf_counter()
+        while True:
+            try:
+                self.frames.put_nowait(frame)
+                return
+            except queue.Full:
+                # Odrzucamy najstarsza klatke - GUI i tak pokaze najnowsza
+                try:
+                    self.frames.get_nowait()
+                except queue.Empty:
+                    pass
@@ -1,14 +1,18 @@
-import tkinter as tk
-from tkinter import ttk
 import time
+import tkinter as tk
+from tkinter import ttk, filedialog
 import numpy as np
 
-import config
 from config import CellState, GRID_H, GRID_W, CELL_SIZE, COLORS
 from grid import Grid
-from simulation import run_simulation_step
-from config import MAPA_TERENU_PLIK, MOVEMENT_MODIFIERS, INFECTION_PROBABILITY
-from map_loader import load_map_from_image
+from engine import SimulationEngine
+from worker import SimulationWorker, Frame
+from params import SimulationParams
+from config import MAPA_TERENU_PLIK, MAPA_TERENU_ORIGIN, MOVEMENT_MODIFIERS, INFECTION_PROBABILITY
+from terrain_store import load_terrain
+from renderer import GridRenderer
+from metrics import PHASES
+from recording import TrajectoryReader
 
 CANVAS_W = GRID_W * CELL_SIZE
 CANVAS_H = GRID_H * CELL_SIZE
@@ -20,8 +24,10 @@ class ZombieCA_GUI:
         self.root = root
         root.title("Apokalipsa Zombie - Automat Komorkowy")
         
-        self.grid_model = self._initialize_grid()
-        self.total_deaths = 0
+        self.params = SimulationParams.from_config()
+        # Symulacja liczona w osobnym watku; GUI rysuje najnowsza klatke z kolejki
+        self.worker = SimulationWorker(SimulationEngine(self._initialize_grid(), params=self.params))
+        self.frame = Frame(self.worker.engine, 0, 0.0)
         
         self.legend_items = [
             (CellState.HUMAN, "Czlowiek"),
@@ -38,14 +44,22 @@ class ZombieCA_GUI:
         
         self.running = False
         self.step_ms = 100
-        self.last_time = 0
-        self.step_count = 0
+        self.max_speed_var = None
         self.current_tool = 'BUILD'
         self._tool_state_map = {}
         self.tool_var = None
+        # Tryb odtwarzania nagrania: klatki z pliku zamiast z watku symulacji
+        self.replay = None
+        self._live_frame = None
+        self.metrics_var = None
+        self.draw_ms = 0.0
 
         self.canvas = tk.Canvas(root, width=CANVAS_W, height=CANVAS_H, bg="#FFFFFF", highlightthickness=0)
         self.canvas.grid(row=0, column=0, columnspan=5, sticky="nsw")
+        self.renderer = GridRenderer(self.canvas, GRID_W, GRID_H, CELL_SIZE)
+        # Nakladka z metrykami faz kroku (ukryta, dopoki pomiar wylaczony)
+        self.metrics_bg = self.canvas.create_rectangle(0, 0, 0, 0, fill="#000000", outline="", state=tk.HIDDEN)
+        self.metrics_text = self.canvas.create_text(6, 6, anchor="nw", fill="#FFFFFF", font=("Consolas", 8), state=tk.HIDDEN)
 
         self.right_panel_frame = tk.Frame(root)
         self.right_panel_frame.grid(row=0, column=5, columnspan=1, sticky="nsw", padx=10)
@@ -78,12 +92,16 @@ class ZombieCA_GUI:
         root.bind("<space>", lambda e: self.toggle_running())
         root.bind("n", lambda e: self.step_once())
 
+        self.worker.send_step_interval(self.step_ms / 1000.0)
+        self.worker.start()
+        root.protocol("WM_DELETE_WINDOW", self.close)
+
         self.draw()
         self.update_info()
         self.root.after(10, self.loop)
 
     def _initialize_grid(self):
-        terrain_map = load_map_from_image(MAPA_TERENU_PLIK, GRID_W, GRID_H)
+        terrain_map = load_terrain(MAPA_TERENU_PLIK, GRID_W, GRID_H, MAPA_TERENU_ORIGIN)
         return Grid(GRID_W, GRID_H, initial_humans=300, initial_zombies=30, terrain_map=terrain_map)
 
     def _draw_legend(self, parent_frame):
@@ -114,11 +132,23 @@ class ZombieCA_GUI:
 
     def _draw_parameters(self, parent_frame):
         tk.Label(parent_frame, text="Kontrola parametrow:", font=("Consolas",9,"bold")).grid(row=0,column=0,columnspan=2,sticky="w", pady=(0,5))
-        self.prob_label = tk.Label(parent_frame, text=f"Prawdopodobienstwo Infekcji (x): {config.INFECTION_PROBABILITY:.2f}", font=("Consolas",8))
+        self.prob_label = tk.Label(parent_frame, text=f"Prawdopodobienstwo Infekcji (x): {self.params.infection_probability:.2f}", font=("Consolas",8))
         self.prob_label.grid(row=1,column=0,sticky="w", pady=(0,2))
         self.prob_scale = tk.Scale(parent_frame, from_=0.0, to=1.0, resolution=0.05, orient=tk.HORIZONTAL, length=200, command=self._update_infection_prob)
-        self.prob_scale.set(config.INFECTION_PROBABILITY)
+        self.prob_scale.set(self.params.infection_probability)
         self.prob_scale.grid(row=2,column=0,sticky="we")
+        self.max_speed_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(parent_frame, text="Maksymalna predkosc", variable=self.max_speed_var, command=self._toggle_max_speed).grid(row=3,column=0,sticky="w", pady=(5,0))
+        self.metrics_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(parent_frame, text="Metryki krokow", variable=self.metrics_var, command=self._toggle_metrics).grid(row=7,column=0,sticky="w", pady=(5,0))
+
+        tk.Label(parent_frame, text="Odtwarzanie nagrania:", font=("Consolas",9,"bold")).grid(row=4,column=0,sticky="w", pady=(10,2))
+        replay_buttons = tk.Frame(parent_frame)
+        replay_buttons.grid(row=5,column=0,sticky="we")
+        ttk.Button(replay_buttons, text="Otworz...", command=self.open_replay).pack(side="left")
+        ttk.Button(replay_buttons, text="Wroc do symulacji", command=self.close_replay).pack(side="left")
+        self.replay_scale = tk.Scale(parent_frame, from_=0, to=0, orient=tk.HORIZONTAL, length=200, state=tk.DISABLED, command=self._seek_replay)
+        self.replay_scale.grid(row=6,column=0,sticky="we")
 
     def _set_current_tool(self, tool_name):
         self.current_tool = tool_name
@@ -126,75 +156,148 @@ class ZombieCA_GUI:
 
     def _update_infection_prob(self, value):
         prob = float(value)
-        config.INFECTION_PROBABILITY = prob
+        # Nowe parametry trafiaja do dzialajacego silnika od nastepnego kroku
+        self.params = self.params.replace(infection_probability=prob)
+        self.worker.send_params(self.params)
         self.prob_label.config(text=f"Prawdopodobienstwo Infekcji (x): {prob:.2f}")
 
     def _handle_click(self, event):
+        if self.replay is not None:
+            self.info.config(text="Blad: Nie mozna zmieniac terenu w trybie odtwarzania.")
+            return
         grid_x = event.x // CELL_SIZE
         grid_y = event.y // CELL_SIZE
         if 0 <= grid_y < GRID_H and 0 <= grid_x < GRID_W:
             tool_state = self._tool_state_map.get(self.current_tool)
             if tool_state is not None:
-                cell_to_change = self.grid_model.cells[grid_y][grid_x]
-                if cell_to_change.state == CellState.GROUND:
-                    cell_to_change.terrain_type = tool_state
+                cell_state = CellState(int(self.frame.state[grid_y, grid_x]))
+                if cell_state == CellState.GROUND:
+                    # Zmiana terenu wykonywana przez watek symulacji (nowa klatka przyjdzie z kolejki)
+                    self.worker.send_paint(grid_y, grid_x, tool_state)
                     self.info.config(text=f"Zmieniono teren w ({grid_y},{grid_x}) na {tool_state.name}")
-                    self.draw()
                 else:
-                    self.info.config(text=f"Blad: Nie mozna zmieniac terenu pod aktywnym agentem ({cell_to_change.state.name}).")
+                    self.info.config(text=f"Blad: Nie mozna zmieniac terenu pod aktywnym agentem ({cell_state.name}).")
             else:
                 self.info.config(text=f"Brak aktywnego narzedzia do zmiany terenu.")
 
     def draw(self):
-        self.canvas.delete("all")
-        for y in range(GRID_H):
-            for x in range(GRID_W):
-                cell = self.grid_model.cells[y][x]
-                x1 = x*CELL_SIZE; y1 = y*CELL_SIZE
-                x2 = x1+CELL_SIZE; y2 = y1+CELL_SIZE
-                if cell.state != CellState.GROUND:
-                    fill_color = COLORS.get(cell.state, COLORS[CellState.DEAD])
-                else:
-                    fill_color = COLORS.get(cell.terrain_type, COLORS[CellState.GROUND])
-                self.canvas.create_rectangle(x1,y1,x2,y2, fill=fill_color, outline=fill_color, tags="cell")
+        start = time.perf_counter()
+        self.renderer.draw(self.frame)
+        self.draw_ms = (time.perf_counter() - start) * 1000
+        self._draw_metrics_overlay()
+
+    def _draw_metrics_overlay(self):
+        metrics = self.frame.metrics
+        if metrics is None or not self.metrics_var.get():
+            self.canvas.itemconfigure(self.metrics_bg, state=tk.HIDDEN)
+            self.canvas.itemconfigure(self.metrics_text, state=tk.HIDDEN)
+            return
+        last = metrics["last"]
+        lines = [f"krok {last['total'] * 1000:7.2f} ms  rysowanie {self.draw_ms:6.2f} ms"]
+        for phase in PHASES:
+            lines.append(f"{phase:10s} {last['times'][phase] * 1000:7.2f} ms  (sr. {metrics['mean_times'][phase] * 1000:7.2f})")
+        lines.append(" ".join(f"{name}={value}" for name, value in last["counts"].items()))
+        self.canvas.itemconfigure(self.metrics_text, text="\n".join(lines), state=tk.NORMAL)
+        x0, y0, x1, y1 = self.canvas.bbox(self.metrics_text)
+        self.canvas.coords(self.metrics_bg, x0 - 4, y0 - 4, x1 + 4, y1 + 4)
+        self.canvas.itemconfigure(self.metrics_bg, state=tk.NORMAL)
+        self.canvas.tag_raise(self.metrics_bg)
+        self.canvas.tag_raise(self.metrics_text)
 
     def update_info(self):
-        human_count = 0
-        zombie_count = 0
-        infected_count = 0
-        for r in range(GRID_H):
-            for c in range(GRID_W):
-                state = self.grid_model.cells[r][c].state
-                if state == CellState.HUMAN: human_count += 1
-                elif state == CellState.ZOMBIE: zombie_count += 1
-                elif state == CellState.INFECTED: infected_count += 1
-        s = f"Krok: {self.step_count} | Ludzie: {human_count} | Zombie: {zombie_count} | Zarazeni: {infected_count} | Martwi: {self.total_deaths} | Opóznienie: {self.step_ms}ms"
+        counts = self.frame.counts
+        human_count = counts[CellState.HUMAN]
+        zombie_count = counts[CellState.ZOMBIE]
+        infected_count = counts[CellState.INFECTED]
+        delay = "max" if self.max_speed_var is not None and self.max_speed_var.get() else f"{self.step_ms}ms"
+        mode = "Odtwarzanie | " if self.replay is not None else ""
+        s = f"{mode}Krok: {self.frame.step} | Ludzie: {human_count} | Zombie: {zombie_count} | Zarazeni: {infected_count} | Martwi: {self.frame.total_deaths} | Opóznienie: {delay} | Kroki/s: {self.frame.steps_per_s:.1f} | FPS: {self.renderer.fps:.1f}"
         self.info.config(text=s)
 
     def toggle_running(self):
+        if self.replay is not None:
+            return
         self.running = not self.running
+        self.worker.send_running(self.running)
         self.update_info()
 
     def step_once(self):
-        new_grid, deaths_in_step = run_simulation_step(self.grid_model)
-        self.grid_model = new_grid
-        self.total_deaths += deaths_in_step
-        self.step_count += 1
-        self.update_info()
-        self.draw()
+        if self.replay is not None:
+            self.replay_scale.set(min(int(self.replay_scale.get()) + 1, len(self.replay) - 1))
+            return
+        self.worker.send_step()
+
+    def _toggle_max_speed(self):
+        self.worker.send_max_speed(self.max_speed_var.get())
+
+    def _toggle_metrics(self):
+        self.worker.send_metrics(self.metrics_var.get())
+        self._draw_metrics_overlay()
 
     def loop(self):
-        if self.running:
-            now = time.time()*1000.0
-            if now - self.last_time >= self.step_ms:
-                self.step_once()
-                self.last_time = now
-        self.root.after(10,self.loop)
+        # Tylko odbior najnowszej klatki - obliczenia nie blokuja watku Tk
+        frame = self.worker.latest_frame()
+        if frame is not None and self.replay is not None:
+            self._live_frame = frame
+        elif frame is not None:
+            self.frame = frame
+            self.draw()
+            self.update_info()
+        self.root.after(15, self.loop)
 
-    def load_new_sim(self):
-        self.grid_model = self._initialize_grid()
-        self.step_count = 0
-        self.total_deaths = 0
+    def open_replay(self):
+        path = filedialog.askopenfilename(title="Otworz nagranie", filetypes=[("Nagranie symulacji", "*.zrec"), ("Wszystkie pliki", "*")])
+        if not path:
+            return
+        try:
+            reader = TrajectoryReader(path)
+        except (OSError, ValueError) as e:
+            self.info.config(text=f"Blad: Nie mozna otworzyc nagrania ({e}).")
+            return
+        if (reader.width, reader.height) != (GRID_W, GRID_H) or len(reader) == 0:
+            reader.close()
+            self.info.config(text="Blad: Nagranie ma inny rozmiar siatki lub jest puste.")
+            return
+        # Symulacja stoi, dopoki ogladamy nagranie
         self.running = False
-        self.update_info()
+        self.worker.send_running(False)
+        if self.replay is None:
+            self._live_frame = self.frame
+        self.close_replay(resume=False)
+        self.replay = reader
+        self.replay_scale.config(state=tk.NORMAL, to=len(reader) - 1)
+        self.replay_scale.set(0)
+        self._seek_replay(0)
+
+    def _seek_replay(self, value):
+        if self.replay is None:
+            return
+        index = int(value)
+        state, terrain = self.replay.frame(index)
+        self.frame = Frame.from_arrays(int(self.replay.steps[index]), state, terrain,
+                                       self.replay.counts_by_state(index),
+                                       deaths=int(self.replay.stats[index]["deaths"]),
+                                       total_deaths=int(self.replay.total_deaths[index]))
         self.draw()
+        self.update_info()
+
+    def close_replay(self, resume=True):
+        if self.replay is None:
+            return
+        self.replay.close()
+        self.replay = None
+        self.replay_scale.config(state=tk.DISABLED)
+        if resume and self._live_frame is not None:
+            self.frame = self._live_frame
+            self.draw()
+            self.update_info()
+
+    def load_new_sim(self):
+        self.close_replay(resume=False)
+        self.running = False
+        self.worker.send_reset(SimulationEngine(self._initialize_grid(), params=self.params))
+
+    def close(self):
+        self.close_replay(resume=False)
+        self.worker.stop()
+        self.root.destroy()